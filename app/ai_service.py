@@ -1,22 +1,54 @@
 import os
 import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.schema import Document
-from typing import List, Dict, Any, Optional
-import chromadb
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable
 from dotenv import load_dotenv
 from os.path import basename
 from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQAWithSourcesChain
 import re
+import numpy as np
+from .pdf_parsing import PDFParsePool, hash_file, chunk_id
+from .pdf_extractors import PDFRejectedError, extraction_config
+from .embedding_cache import CachedEmbeddings
+from .answer_cache import AnswerCache
+from .lexical_index import BM25Index, tokenize
+from .retrieval import HybridRetriever, doc_key
+from .lease_features import key_term_features
+from .context_packer import TokenCounter, pack_context
+from .llm_providers import build_llm
+from .metrics import (
+    INGEST_STAGE_SECONDS, INGESTED_PAGES, INGESTED_CHUNKS, LLM_TOKENS,
+    ANSWER_CACHE_LOOKUPS, ERRORS, observe_ask_stage
+)
+from .lazy_components import LazyComponent
+from .reindex import (
+    ShadowReindexer, configured_index, same_index_config,
+    LEGACY_COLLECTION, DEFAULT_EMBEDDING_MODEL, DEFAULT_SPLITTER_CONFIG
+)
+from .document_registry import DocumentRegistry, DEFAULT_NAMESPACE, document_key, split_document_key, validate_namespace
+from .page_store import PageStore
+from .vector_stores import VectorStore, VectorStoreFactory, ShardedVectorStore, FlatIndexLockedError
+from .reranker import CrossEncoderReranker, DEFAULT_RERANK_MODEL, load_cross_encoder
+from .concurrency import ConcurrencyLimiter, ServiceBusyError
 load_dotenv()
 
+# Chunks retrieved per question when a request does not ask for a number
+DEFAULT_TOP_K = 5
+
+
+def _optional_float(name: str, default: str = "") -> Optional[float]:
+    value = os.getenv(name, default).strip().lower()
+    return float(value) if value not in ("", "none", "off") else None
+
 GROUNDING_PROMPT = PromptTemplate.from_template("""
 You are an expert legal research assistant specializing in residential lease agreements. Your task is to provide comprehensive, well-structured answers based solely on the provided document excerpts.
 
@@ -76,93 +108,308 @@ If key lease information (rent, dates, property details) is missing, clearly sta
 Now provide a comprehensive, well-structured lease analysis following the format requirements above. Ensure proper markdown formatting with clear section separation and consistent citation style.
 """)
 
+class _StreamingAnswerFormatter:
+    """Applies _post_process_answer incrementally to a streamed answer.
+
+    Only complete lines are formatted, and the last formatted line is held back since
+    the formatting rules can still change it once the next line arrives.
+    """
+
+    def __init__(self, service: "LegalAIService", citations: List[Dict[str, Any]]):
+        self.service = service
+        self.citations = citations
+        self.raw_answer = ""
+        self.emitted = ""
+        self._formatted_upto = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self.raw_answer += text
+        complete = self.raw_answer[:self.raw_answer.rfind("\n") + 1]
+        if not complete.strip() or len(complete) == self._formatted_upto:
+            return []
+        self._formatted_upto = len(complete)
+        formatted = self.service._post_process_answer(complete.strip(), self.citations)
+        stable = formatted[:formatted.rfind("\n") + 1]
+        if not stable:
+            return []
+        return self._delta(stable)
+
+    def finish(self, final_answer: str) -> List[Dict[str, Any]]:
+        return self._delta(final_answer)
+
+    def _delta(self, formatted: str) -> List[Dict[str, Any]]:
+        """Events that bring a client showing the emitted text up to date with `formatted`."""
+        emitted, self.emitted = self.emitted, formatted
+        if formatted == emitted:
+            return []
+        if formatted.startswith(emitted):
+            return [{"event": "token", "data": {"text": formatted[len(emitted):]}}]
+        return [{"event": "replace", "data": {"text": formatted}}]
+
+class IndexSwappedError(Exception):
+    """Raised inside an ingest when a reindex swapped the active index under it"""
+
+
 class LegalAIService:
     def __init__(self):
-        # Configure Gemini API
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY environment variable is required")
-        
-        genai.configure(api_key=api_key)
-        
-        # Initialize LLM with improved configuration for better responses
-        self.llm = ChatGoogleGenerativeAI(
-            model="models/gemini-1.5-pro-latest",
-            temperature=0.3,  # Lower temperature for more consistent, factual responses
-            max_output_tokens=4096,  # Increased for more comprehensive responses
-            google_api_key=os.environ.get("GOOGLE_API_KEY"),
-            top_p=0.9,  # Better response diversity while maintaining quality
-            top_k=40,  # Improved token selection
+        # Document tracking, shared with other worker processes
+        self.registry = DocumentRegistry(
+            db_path=os.getenv("DOCUMENT_REGISTRY_PATH", "documents.sqlite3"),
+            legacy_json_path="documents.json"
         )
+        self.uploads_dir = "uploads"
+        # Extracted page text of every upload, so each PDF is only ever parsed once
+        self.page_store = PageStore(os.getenv("PAGE_STORE_DIR", os.path.join(self.uploads_dir, ".pages")))
+        
+        # The active index (collection, embedding model and splitter settings) is recorded in the
+        # registry so queries are always embedded with the model the stored vectors came from.
+        # Changing EMBEDDING_MODEL/CHUNK_SIZE/CHUNK_OVERLAP takes effect through a reindex.
+        self.index = self.registry.active_index()
+        if self.index is None:
+            # An existing store was built with the defaults; an empty one can start on the configured settings
+            has_documents = self.registry.list(limit=1)["total"] > 0
+            config = {"embedding_model": DEFAULT_EMBEDDING_MODEL, "splitter_config": DEFAULT_SPLITTER_CONFIG}
+            self.index = {"collection": LEGACY_COLLECTION, **(config if has_documents else configured_index())}
+            self.registry.set_active_index(self.index)
+        self.index_generation = 0
         
-        # Initialize embeddings
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
+        # Heavy dependencies are built on first use (or by warm_up) so importing the app stays fast
+        self._llm = LazyComponent("llm", build_llm)
+        self._embeddings = LazyComponent("embeddings", self._load_embeddings)
+        self._vector_store = LazyComponent("vector_store", self._load_vector_store)
+        self._token_counter = LazyComponent("tokenizer", self._load_token_counter)
+        self.components = [self._llm, self._embeddings, self._vector_store, self._token_counter]
+        
+        # Optional cross-encoder rerank of a wider candidate set; falls back to _prioritize_documents
+        self.reranker = None
+        self.rerank_candidates = int(os.getenv("RERANK_CANDIDATES", "30"))
+        if os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes"):
+            rerank_model = os.getenv("RERANK_MODEL", DEFAULT_RERANK_MODEL)
+            self._rerank_model = LazyComponent("reranker", lambda: load_cross_encoder(rerank_model))
+            self.components.append(self._rerank_model)
+            self.reranker = CrossEncoderReranker(
+                self._rerank_model,
+                budget_ms=float(os.getenv("RERANK_BUDGET_MS", "300")),
+                batch_size=int(os.getenv("RERANK_BATCH_SIZE", "16")),
+                cache_size=int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+            )
+        
+        # Lexical index fused with vector search at query time; rebuilt when the vector store is opened.
+        # Other worker processes change the corpus too: the registry version and upload time of each
+        # document the index reflects tell which documents to reload into it.
+        self._lexical_index = BM25Index()
+        self._lexical_version: Optional[str] = None
+        self._lexical_documents: Dict[str, str] = {}
+        self._answers_version: Optional[str] = None
+        self.chroma_dir = './chroma_db'
+        # Collections start in an in-process float16 flat index and move to Chroma once they are large
+        self.vector_stores = VectorStoreFactory(
+            self.chroma_dir,
+            os.getenv("FLAT_INDEX_DIR", "./flat_index"),
+            backend=os.getenv("VECTOR_STORE_BACKEND", "auto").lower(),
+            promote_at=int(os.getenv("VECTOR_STORE_PROMOTE_AT", "50000")),
+            processes=int(os.getenv("WEB_CONCURRENCY", "1"))
         )
         
-        # Initialize vector store
-        chroma_dir = './chroma_db'
-        if os.path.exists(chroma_dir) and os.listdir(chroma_dir):
-            try:
-                self.vector_store = Chroma(
-                    embedding_function=self.embeddings,
-                    persist_directory=chroma_dir
-                )
-                print('Loaded existing Chroma vector store from disk.')
-            except Exception as e:
-                print(f'Error loading Chroma vector store: {e}')
-                self.vector_store = None
-        else:
-            self.vector_store = None
-        # Improved text splitting for better context preservation
+        # Prompt context is capped by a token budget. Tokens are estimated with the embedding model's
+        # tokenizer rather than the LLM's, so packing stops a safety margin short of the budget.
+        self.context_token_budget = int(os.getenv(
+            "PROMPT_CONTEXT_TOKEN_ESTIMATE_BUDGET", os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "6000")
+        ))
+        self.token_estimate_margin = float(os.getenv("PROMPT_TOKEN_ESTIMATE_MARGIN", "0.15"))
+        
+        # Adaptive retrieval: weak hits are cut by distance, by a jump in distance or by a low BM25
+        # score, so a simple fact question sends a few chunks rather than top_k. MMR is optional.
+        self.retrieval_config = {
+            "max_distance": _optional_float("RETRIEVAL_MAX_DISTANCE", "1.3"),
+            "score_gap": _optional_float("RETRIEVAL_SCORE_GAP", "0.2"),
+            "min_k": int(os.getenv("RETRIEVAL_MIN_K", "2")),
+            "lexical_min_ratio": float(os.getenv("RETRIEVAL_LEXICAL_MIN_RATIO", "0.3")),
+            "mmr_lambda": _optional_float("RETRIEVAL_MMR_LAMBDA"),
+        }
+        
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,   # Larger chunks for better context
-            chunk_overlap=200,  # More overlap to maintain context continuity
+            chunk_size=self.splitter_config["chunk_size"],
+            chunk_overlap=self.splitter_config["chunk_overlap"],
             length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]  # Better sentence boundary detection
+            separators=self.splitter_config["separators"]
+        )
+        
+        # Process pool that parses and splits PDFs page by page, overlapping with embedding
+        parse_workers = os.getenv("PDF_PARSE_WORKERS")
+        self.parse_pool = PDFParsePool(
+            self.splitter_config,
+            num_workers=int(parse_workers) if parse_workers else None,
+            prefetch=int(os.getenv("PDF_PAGE_PREFETCH", "8")),
+            extraction=extraction_config(),
+            preflight_workers=int(os.getenv("PDF_PREFLIGHT_WORKERS", "2"))
+        )
+        # Chunks are embedded and upserted in fixed-size batches as pages arrive
+        self.embed_batch_size = max(1, int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64")))
+        # Files of one ingest parsed at the same time; defaults to one per parse worker
+        parallel_files = os.getenv("INGEST_PARALLEL_FILES")
+        self.ingest_parallel_files = max(1, int(parallel_files) if parallel_files else self.parse_pool.num_workers)
+        
+        # Answers are cached per question, document selection and corpus version
+        self.answer_cache = AnswerCache(
+            max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+            disk_path=os.getenv("ANSWER_CACHE_PATH") or None
+        )
+        
+        # Bounded executors so /ask never blocks the event loop on the embedding model or the LLM
+        queue_timeout = float(os.getenv("ASK_QUEUE_TIMEOUT", "30"))
+        self.retrieval_limiter = ConcurrencyLimiter(
+            "retrieval", int(os.getenv("ASK_EMBED_CONCURRENCY", "4")), queue_timeout
+        )
+        self.llm_limiter = ConcurrencyLimiter(
+            "llm", int(os.getenv("ASK_LLM_CONCURRENCY", "16")), queue_timeout
         )
+        # LLM slots one /ask/batch request may hold at once, so a batch cannot starve single questions
+        self.batch_llm_concurrency = max(1, int(os.getenv("ASK_BATCH_LLM_CONCURRENCY", "4")))
         
-        # Document tracking
-        self.documents_file = "documents.json"
-        self.load_documents()
+        # Serializes vector store writes across ingest workers; per-file locks keep two
+        # ingests (or an ingest and a delete) of the same filename from interleaving
+        self._write_lock = threading.Lock()
+        self._source_locks: Dict[str, List[Any]] = {}
+        self._source_locks_guard = threading.Lock()
+        
+        # Background rebuilds into a shadow collection for embedding model or chunking changes
+        self.reindexer = ShadowReindexer(
+            self,
+            duty_cycle=float(os.getenv("REINDEX_DUTY_CYCLE", "0.5")),
+            drop_grace_seconds=float(os.getenv("REINDEX_DROP_GRACE_SECONDS", "60"))
+        )
     
-    def load_documents(self):
-        """Load the list of uploaded documents"""
+    @property
+    def embedding_model(self) -> str:
+        return self.index["embedding_model"]
+
+    @property
+    def splitter_config(self) -> Dict[str, Any]:
+        return self.index["splitter_config"]
+
+    @property
+    def llm(self):
+        return self._llm.get()
+
+    @property
+    def embeddings(self) -> CachedEmbeddings:
+        return self._embeddings.get()
+
+    @property
+    def vector_store(self) -> Optional[VectorStore]:
+        return self._vector_store.get()
+
+    @vector_store.setter
+    def vector_store(self, vector_store: VectorStore):
+        self._vector_store.set(vector_store)
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        # The index is only complete once the vector store it is built from has been opened
+        self._vector_store.get()
+        return self._lexical_index
+
+    @property
+    def token_counter(self) -> TokenCounter:
+        return self._token_counter.get()
+
+    def build_embeddings(self, model_name: str) -> CachedEmbeddings:
+        """Embeddings for a model, reusing the loaded one when it matches"""
+        if model_name == self.embedding_model and self._embeddings.ready:
+            return self.embeddings
+        # Persistent cache so unchanged chunks are never re-embedded; entries are keyed by model
+        embeddings = CachedEmbeddings(
+            HuggingFaceEmbeddings(model_name=model_name),
+            model_name=model_name,
+            cache_path=os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3"),
+            max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000")),
+            max_query_entries=int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+        )
+        # One dummy embedding, past the cache, so the model weights are resident before the first question
+        embeddings.embeddings.embed_query("warm-up")
+        return embeddings
+
+    def open_collection(self, collection: str, embeddings: CachedEmbeddings) -> VectorStore:
+        """A collection sharded by document namespace; the default namespace keeps the collection's own name"""
+        def open_shard(namespace: str) -> VectorStore:
+            name = collection if namespace == DEFAULT_NAMESPACE else f"{collection}--{namespace}"
+            return self.vector_stores.open(name, embeddings)
+        return ShardedVectorStore(
+            collection, embeddings, open_shard, lambda source: split_document_key(source)[0], self.registry.namespaces
+        )
+
+    def _load_embeddings(self) -> CachedEmbeddings:
+        return self.build_embeddings(self.embedding_model)
+
+    def _load_vector_store(self) -> Optional[VectorStore]:
+        # Read before the build: anything that changes meanwhile is applied by the next sync
+        version, documents = self.registry.version(), self._registered_uploads()
         try:
-            if os.path.exists(self.documents_file):
-                with open(self.documents_file, 'r') as f:
-                    self.documents = json.load(f)
-            else:
-                self.documents = []
+            if not self.vector_stores.exists(self.index["collection"]) and not self.registry.namespaces():
+                return None
+            vector_store = self.open_collection(self.index["collection"], self.embeddings)
+            print(f'Loaded existing {vector_store.kind} vector store from disk.')
         except Exception as e:
-            print(f"Error loading documents: {e}")
-            self.documents = []
-    
-    def save_documents(self):
-        """Save the list of uploaded documents"""
+            print(f'Error loading vector store: {e}')
+            return None
+        self._lexical_index = self._build_lexical_index(vector_store)
+        self._lexical_version, self._lexical_documents = version, documents
+        return vector_store
+
+    def _load_token_counter(self) -> TokenCounter:
+        token_counter = TokenCounter(self.embedding_model)
+        token_counter("warm-up")
+        return token_counter
+
+    def warm_up(self):
+        """Load every component ahead of the first request"""
+        for component in self.components:
+            try:
+                component.get()
+                print(f"Warmed up {component.name} in {component.status()['load_seconds']}s")
+            except Exception as e:
+                print(f"Error warming up {component.name}: {e}")
         try:
-            with open(self.documents_file, 'w') as f:
-                json.dump(self.documents, f, indent=2)
+            self.parse_pool.warm_up()
         except Exception as e:
-            print(f"Error saving documents: {e}")
+            print(f"Error starting preflight workers: {e}")
+
+    def readiness(self) -> Dict[str, Any]:
+        """Per-component readiness and load times"""
+        return {
+            "ready": all(component.ready for component in self.components),
+            "components": {component.name: component.status() for component in self.components}
+        }
+
+    @property
+    def corpus_version(self) -> str:
+        """Registry version; changes on every add or delete so cached answers go stale"""
+        version = self.registry.version()
+        if version != self._answers_version:
+            # Answers for earlier versions can no longer be hit; free them (the shared disk cache expires by TTL)
+            if self._answers_version is not None:
+                self.answer_cache.clear_memory()
+            self._answers_version = version
+        return version
     
-    def get_documents(self) -> List[Dict[str, Any]]:
-        """Get list of uploaded documents"""
-        return self.documents
+    def get_documents(self, offset: int = 0, limit: Optional[int] = None, query: Optional[str] = None,
+                      namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Get a page of uploaded documents with their chunk/page counts and corpus totals"""
+        return self.registry.list(offset=offset, limit=limit, query=query, namespace=namespace)
     
+    def preflight(self, file_path: str) -> Dict[str, Any]:
+        """Cheap structural check of an upload (page count, encryption, text layer); raises PDFRejectedError"""
+        return self.parse_pool.preflight(file_path)
+
     def process_pdf(self, file_path: str) -> List[Document]:
         """Process a PDF file and return chunks"""
         try:
-            loader = PyPDFLoader(file_path)
-            pages = loader.load()
-            
-            # Split into chunks
-            chunks = self.text_splitter.split_documents(pages)
-            
-            # Add metadata
-            for chunk in chunks:
-                chunk.metadata["source"] = os.path.basename(file_path)
-            
+            artifact_path = self.page_store.path(hash_file(file_path))
+            chunks = []
+            for page in self.parse_pool.iter_pages(file_path, artifact_path=artifact_path):
+                chunks.extend(page["chunks"])
             return chunks
         except Exception as e:
             print(f"Error processing PDF {file_path}: {e}")
@@ -170,59 +417,478 @@ class LegalAIService:
     
     def add_documents(self, file_paths: List[str]) -> bool:
         """Add documents to the vector store"""
+        return self.ingest_documents(file_paths)["success"]
+
+    def _build_lexical_index(self, vector_store: VectorStore, batch_size: int = 5000) -> BM25Index:
+        """Load every chunk in the vector store into a new lexical index"""
+        lexical_index = BM25Index()
         try:
-            print(f"Starting to process {len(file_paths)} documents")
-            all_chunks = []
-            for path in file_paths:
-                loader = PyPDFLoader(path)
-                pages = loader.load()  # each page is a Document with metadata {'source': path, 'page': i}
-                for page_doc in pages:
-                    for chunk in self.text_splitter.split_documents([page_doc]):
-                        # ensure consistent keys for filtering/citation
-                        chunk.metadata["source"] = basename(path)
-                        if "page" not in chunk.metadata and "page" in page_doc.metadata:
-                            chunk.metadata["page"] = page_doc.metadata["page"]
-                        all_chunks.append(chunk)
-            
-            print(f"Total chunks: {len(all_chunks)}")
-            if not all_chunks:
-                print("No chunks generated, returning False")
-                return False
-            
-            # Create or update vector store
-            if self.vector_store is None:
-                print("Creating new vector store")
-                self.vector_store = Chroma.from_documents(
-                    documents=all_chunks,
-                    embedding=self.embeddings,
-                    persist_directory="./chroma_db"
-                )
-            else:
-                print("Adding documents to existing vector store")
-                self.vector_store.add_documents(all_chunks)
-            
-            # Note: New langchain-chroma automatically persists, no need to call persist()
-            print("Documents added successfully")
-            
-            # Update document tracking
-            for file_path in file_paths:
-                filename = os.path.basename(file_path)
-                if not any(doc["filename"] == filename for doc in self.documents):
-                    self.documents.append({
-                        "filename": filename,
-                        "upload_time": str(datetime.now()),
-                        "chunks": len([c for c in all_chunks if c.metadata.get("source") == filename])
-                    })
-            
-            self.save_documents()
-            print("Successfully added documents to vector store")
-            return True
+            offset = 0
+            while True:
+                batch = vector_store.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+                if not batch["ids"]:
+                    break
+                backfill_ids, backfill_metadatas = [], []
+                for doc_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                    metadata = metadata or {}
+                    if "key_term_count" not in metadata:
+                        # Chunks ingested before key-term features existed get them once, here
+                        metadata = {**metadata, **key_term_features(text or "")}
+                        backfill_ids.append(doc_id)
+                        backfill_metadatas.append(metadata)
+                    lexical_index.add(doc_id, text or "", metadata)
+                if backfill_ids:
+                    vector_store.update_metadata(backfill_ids, backfill_metadatas)
+                offset += len(batch["ids"])
+            print(f"Built lexical index over {len(lexical_index)} chunks")
+        except FlatIndexLockedError:
+            # Another server process owns the index; fail the load rather than serve an empty one
+            raise
         except Exception as e:
-            print(f"Error adding documents: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-    
+            print(f"Error building lexical index: {e}")
+        return lexical_index
+
+    def remove_document(self, filename: str, namespace: Optional[str] = None):
+        """Remove a document from the registry, the vector store and the lexical index"""
+        namespace = validate_namespace(namespace)
+        source = document_key(namespace, filename)
+        with self._source_lock(source), self._write_lock:
+            existing = self.registry.get(filename, namespace)
+            # Remove from vector store (if possible)
+            if self.vector_store:
+                try:
+                    self.vector_store.delete(source=source)
+                except Exception as e:
+                    print(f"Warning: Could not remove from vector store: {e}")
+            self.registry.delete(filename, namespace)
+            if existing:
+                self._release_pages(existing.get("content_hash"))
+            self.lexical_index.remove_source(source)
+            self._lexical_documents.pop(source, None)
+
+    def _find_document(self, source: str) -> Optional[Dict[str, Any]]:
+        namespace, filename = split_document_key(source)
+        return self.registry.get(filename, namespace)
+
+    def _release_pages(self, content_hash: Optional[str]):
+        """Drop a page artifact once no document has that content any more"""
+        if content_hash and not self.registry.has_content_hash(content_hash):
+            self.page_store.remove(content_hash)
+
+    def _activate_index(self, index: Dict[str, Any], embeddings: Optional[CachedEmbeddings] = None,
+                        vector_store: Optional[VectorStore] = None, lexical_index: Optional[BM25Index] = None):
+        """Switch queries and ingests to another index (caller holds the write lock). Returns the old vector store."""
+        model_changed = index["embedding_model"] != self.embedding_model
+        self.index = index
+        self.index_generation += 1
+        self.parse_pool.splitter_config = index["splitter_config"]
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.splitter_config["chunk_size"],
+            chunk_overlap=self.splitter_config["chunk_overlap"],
+            length_function=len,
+            separators=self.splitter_config["separators"]
+        )
+        if embeddings is not None:
+            self._embeddings.set(embeddings)
+        elif model_changed:
+            self._embeddings.reset()
+        if vector_store is not None:
+            self._lexical_index = lexical_index
+            return self._vector_store.set(vector_store)
+        # Reopened, with its lexical index, on next use
+        return self._vector_store.reset()
+
+    def swap_index(self, index: Dict[str, Any], embeddings: CachedEmbeddings, vector_store: VectorStore,
+                   lexical_index: BM25Index, entries: List[Dict[str, Any]]):
+        """Make a rebuilt index active along with its registry entries (caller holds the write lock)"""
+        self.registry.swap_index(index, entries)
+        old_store = self._activate_index(index, embeddings, vector_store, lexical_index)
+        self._lexical_documents = {
+            document_key(entry["namespace"], entry["filename"]): entry["upload_time"] for entry in entries
+        }
+        return old_store
+
+    def _sync_index(self):
+        """Pick up an index swapped in, and documents changed, by other worker processes"""
+        active = self.registry.active_index()
+        if active and active["collection"] != self.index["collection"]:
+            with self._write_lock:
+                if active["collection"] != self.index["collection"]:
+                    print(f"Switching to index {active['collection']}")
+                    self._activate_index(active)
+        self._sync_lexical_index()
+
+    def _registered_uploads(self) -> Dict[str, str]:
+        """Upload time of every document, by document key"""
+        return {
+            document_key(doc["namespace"], doc["filename"]): doc["upload_time"] for doc in self.registry.list()["documents"]
+        }
+
+    def _sync_lexical_index(self):
+        """Reload documents another process added, changed or removed since the lexical index was built"""
+        version = self.registry.version()
+        if version == self._lexical_version or not self._vector_store.ready:
+            return
+        with self._write_lock:
+            documents = self._registered_uploads()
+            vector_store = self._vector_store.get()
+            if vector_store is None:
+                if documents:
+                    # Another process created the collection; open it (and build its lexical index) on next use
+                    self._vector_store.reset()
+                return
+            lexical_index = self._lexical_index
+            removed = [source for source in self._lexical_documents if source not in documents]
+            changed = [source for source, uploaded in documents.items() if self._lexical_documents.get(source) != uploaded]
+            for source in removed:
+                lexical_index.remove_source(source)
+            for source in changed:
+                entry = self._find_document(source)
+                if entry is None or entry.get("page_chunks") is None:
+                    # Chunk ids of legacy entries are unknown; rebuild from the whole store
+                    self._lexical_index = self._build_lexical_index(vector_store)
+                    break
+                ids = [chunk_id(source, page, index) for page, count in enumerate(entry["page_chunks"]) for index in range(count)]
+                lexical_index.remove_source(source)
+                stored = vector_store.get(ids=ids, include=["documents", "metadatas"])
+                lexical_index.add_many(zip(stored["ids"], (text or "" for text in stored["documents"]), stored["metadatas"]))
+            if removed or changed:
+                print(f"Lexical index synced: {len(changed)} document(s) reloaded, {len(removed)} removed")
+            self._lexical_version, self._lexical_documents = version, documents
+
+    def index_status(self) -> Dict[str, Any]:
+        """Active and configured index settings, and the state of the last reindex"""
+        configured = configured_index()
+        status = {
+            "active": self.index,
+            "configured": configured,
+            "reindex_required": not same_index_config(self.index, configured),
+            "reindex": self.reindexer.status(),
+            "namespaces": self.registry.namespaces(),
+        }
+        if self._vector_store.ready and self.vector_store is not None:
+            status["shards"] = self.vector_store.shard_stats()
+        return status
+
+    def start_reindex(self, embedding_model: Optional[str] = None, chunk_size: Optional[int] = None,
+                      chunk_overlap: Optional[int] = None) -> Dict[str, Any]:
+        """Rebuild every document into a new collection in the background, then swap it in.
+
+        Settings default to the configured ones (EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP).
+        """
+        target = configured_index()
+        if embedding_model:
+            target["embedding_model"] = embedding_model
+        if chunk_size:
+            target["splitter_config"]["chunk_size"] = chunk_size
+        if chunk_overlap is not None:
+            target["splitter_config"]["chunk_overlap"] = chunk_overlap
+        if target["splitter_config"]["chunk_overlap"] >= target["splitter_config"]["chunk_size"]:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        return self.reindexer.start(target)
+
+    @contextmanager
+    def _source_lock(self, source: str):
+        """Hold the lock serializing ingests and deletes of a document; it is dropped once nobody holds or awaits it"""
+        with self._source_locks_guard:
+            holder = self._source_locks.setdefault(source, [threading.Lock(), 0])
+            holder[1] += 1
+        try:
+            with holder[0]:
+                yield
+        finally:
+            with self._source_locks_guard:
+                holder[1] -= 1
+                if not holder[1]:
+                    del self._source_locks[source]
+
+    def _embed_chunks(self, embeddings: CachedEmbeddings, chunks: List[Document],
+                      progress: Optional[Callable[..., None]] = None) -> List[List[float]]:
+        # Embed explicitly rather than inside add_documents so each step can be reported
+        vectors = embeddings.embed_documents([chunk.page_content for chunk in chunks])
+        if progress:
+            progress(chunks_embedded=len(chunks))
+        return vectors
+
+    def _upsert_chunks(self, vector_store: VectorStore, lexical_index: BM25Index, chunks: List[Document],
+                       vectors: List[List[float]], progress: Optional[Callable[..., None]] = None):
+        ids = [chunk.metadata["chunk_id"] for chunk in chunks]
+        texts = [chunk.page_content for chunk in chunks]
+        vector_store.upsert(ids, vectors, texts, [chunk.metadata for chunk in chunks])
+        lexical_index.add_many((doc_id, chunk.page_content, chunk.metadata) for doc_id, chunk in zip(ids, chunks))
+        if progress:
+            progress(chunks_upserted=len(chunks))
+
+    def _embed_and_upsert(self, vector_store: VectorStore, embeddings: CachedEmbeddings, lexical_index: BM25Index,
+                          chunks: List[Document], progress: Optional[Callable[..., None]] = None) -> float:
+        """Embed chunks and upsert them into a collection and its lexical index. Returns the seconds spent embedding."""
+        embed_started = time.perf_counter()
+        vectors = self._embed_chunks(embeddings, chunks, progress)
+        embed_seconds = time.perf_counter() - embed_started
+        self._upsert_chunks(vector_store, lexical_index, chunks, vectors, progress)
+        return embed_seconds
+
+    def _apply_batch(self, chunks: List[Document], delete_ids: List[str],
+                     progress: Callable[..., None], generation: int) -> float:
+        """Embed one batch of chunks, then delete stale vectors and upsert the batch. Returns the seconds spent.
+
+        Embedding runs outside the write lock so other files' batches embed meanwhile;
+        only the store and lexical index writes are serialized.
+        """
+        if self.index_generation != generation:
+            raise IndexSwappedError()
+        started = time.perf_counter()
+        vectors = self._embed_chunks(self.embeddings, chunks, progress) if chunks else []
+        embed_seconds = time.perf_counter() - started
+        with self._write_lock:
+            # A reindex may have swapped the collection (and embedding model) while this batch was embedded
+            if self.index_generation != generation:
+                raise IndexSwappedError()
+            if delete_ids:
+                if self.vector_store is not None:
+                    self.vector_store.delete(ids=delete_ids)
+                self.lexical_index.remove_ids(delete_ids)
+            if chunks:
+                if self.vector_store is None:
+                    print("Creating new vector store")
+                    self.vector_store = self.open_collection(self.index["collection"], self.embeddings)
+                self._upsert_chunks(self.vector_store, self.lexical_index, chunks, vectors, progress)
+        elapsed = time.perf_counter() - started
+        INGEST_STAGE_SECONDS.labels(stage="embed").observe(embed_seconds)
+        INGEST_STAGE_SECONDS.labels(stage="upsert").observe(max(0.0, elapsed - embed_seconds))
+        INGESTED_CHUNKS.inc(len(chunks))
+        return elapsed
+
+    def _record_document(self, entry: Dict[str, Any], generation: int):
+        """Save a registry entry, unless a reindex has swapped indexes since the file was started"""
+        with self._write_lock:
+            if self.index_generation != generation:
+                raise IndexSwappedError()
+            self.registry.upsert(entry)
+            self._lexical_documents[document_key(entry["namespace"], entry["filename"])] = entry["upload_time"]
+
+    def _ingest_file(self, path: str, content_hash: str, existing: Optional[Dict[str, Any]],
+                     progress: Callable[..., None], namespace: str = DEFAULT_NAMESPACE) -> Dict[str, Any]:
+        """Stream one PDF through parse, split, embed and upsert, a page and a batch at a time.
+
+        Pages whose text hash is unchanged keep their existing chunks; only changed,
+        added or removed pages are touched. Entries ingested before page hashes were
+        tracked are replaced wholesale. Memory use is bounded by the page prefetch and
+        the embedding batch size, whatever the size of the file.
+        """
+        filename = basename(path)
+        source = document_key(namespace, filename)
+        generation = self.index_generation
+        splitter_config = self.splitter_config
+        old_hashes = existing.get("page_hashes") if existing else None
+        old_counts = existing.get("page_chunks") if existing else None
+        applied = False
+        if existing and old_hashes is None:
+            # Chunk ids of legacy entries are unknown, so drop all of the file's vectors first
+            with self._write_lock:
+                if self.index_generation != generation:
+                    raise IndexSwappedError()
+                if self.vector_store is not None:
+                    self.vector_store.delete(source=source)
+                self.lexical_index.remove_source(source)
+            applied = True
+        old_hashes, old_counts = old_hashes or [], old_counts or []
+
+        page_hashes, page_chunks = [], []
+        batch, delete_ids = [], []
+        result = {"pages_changed": 0, "chunks_added": 0, "chunks_removed": 0, "embed_upsert_seconds": 0.0}
+        load_seconds = split_seconds = 0.0
+
+        def flush(chunks, ids_to_delete):
+            result["embed_upsert_seconds"] += self._apply_batch(chunks, ids_to_delete, progress, generation)
+            result["chunks_added"] += len(chunks)
+            result["chunks_removed"] += len(ids_to_delete)
+
+        try:
+            pages = self.parse_pool.iter_pages(path, splitter_config, self.page_store.path(content_hash), source)
+            for page in pages:
+                number = page["page"]
+                page_hashes.append(page["hash"])
+                page_chunks.append(len(page["chunks"]))
+                load_seconds += page["load_seconds"]
+                split_seconds += page["split_seconds"]
+                progress(pages_parsed=1, chunks_produced=len(page["chunks"]))
+                if number < len(old_hashes) and old_hashes[number] == page["hash"]:
+                    continue
+                result["pages_changed"] += 1
+                if number < len(old_counts):
+                    delete_ids.extend(chunk_id(source, number, index) for index in range(old_counts[number]))
+                for chunk in page["chunks"]:
+                    chunk.metadata["namespace"] = namespace
+                batch.extend(page["chunks"])
+                while len(batch) >= self.embed_batch_size:
+                    flush(batch[:self.embed_batch_size], delete_ids)
+                    applied = True
+                    batch, delete_ids = batch[self.embed_batch_size:], []
+
+            # Pages that no longer exist at the end of the document
+            for number in range(len(page_hashes), len(old_counts)):
+                result["pages_changed"] += 1
+                delete_ids.extend(chunk_id(source, number, index) for index in range(old_counts[number]))
+            if not any(page_chunks):
+                raise ValueError("No text could be extracted")
+            if batch or delete_ids:
+                flush(batch, delete_ids)
+                applied = True
+        except IndexSwappedError:
+            raise
+        except Exception:
+            if applied:
+                # Some batches are already in the vector store. Record every page as changed, with the
+                # larger of the old and new chunk counts, so the next ingest removes all of them.
+                pages = max(len(old_counts), len(page_chunks))
+                counts = [
+                    max(old_counts[i] if i < len(old_counts) else 0, page_chunks[i] if i < len(page_chunks) else 0)
+                    for i in range(pages)
+                ]
+                self._record_document({
+                    "filename": filename,
+                    "upload_time": str(datetime.now()),
+                    "chunks": sum(counts),
+                    "pages": pages,
+                    "content_hash": None,
+                    "page_hashes": [""] * pages,
+                    "page_chunks": counts,
+                    "namespace": namespace,
+                }, generation)
+            self._release_pages(content_hash)
+            if existing:
+                self._release_pages(existing.get("content_hash"))
+            raise
+        finally:
+            INGEST_STAGE_SECONDS.labels(stage="load").observe(load_seconds)
+            INGEST_STAGE_SECONDS.labels(stage="split").observe(split_seconds)
+            INGESTED_PAGES.inc(len(page_hashes))
+
+        # Update document tracking
+        self._record_document({
+            "filename": filename,
+            "upload_time": str(datetime.now()),
+            "chunks": sum(page_chunks),
+            "pages": len(page_hashes),
+            "content_hash": content_hash,
+            "page_hashes": page_hashes,
+            "page_chunks": page_chunks,
+            "namespace": namespace,
+        }, generation)
+        if existing and existing.get("content_hash") != content_hash:
+            self._release_pages(existing.get("content_hash"))
+        result.update({
+            "status": "processed",
+            "pages": len(page_hashes),
+            "chunks": sum(page_chunks),
+            "parse_seconds": round(load_seconds + split_seconds, 3),
+        })
+        return result
+
+    def ingest_documents(self, file_paths: List[str], progress: Optional[Callable[..., None]] = None,
+                         namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Add documents to the vector store and report per-file results and timings.
+
+        Documents are stored in the shard of `namespace` (the default namespace if not
+        given), and a file replaces only the document of the same name in that namespace.
+        Re-uploading identical content is a no-op; a changed file only replaces the
+        chunks of pages whose text changed. If given,
+        progress is called with counter increments (files_total, files_done, pages_total,
+        pages_parsed, chunks_produced, chunks_embedded, chunks_upserted) and the
+        current_file as the pipeline advances.
+        """
+        namespace = validate_namespace(namespace)
+        progress = progress or (lambda **counts: None)
+        started = time.perf_counter()
+        files = {}
+        total_added = 0
+        parse_seconds = embed_upsert_seconds = 0.0
+        print(f"Starting to process {len(file_paths)} documents")
+        self._sync_index()
+        # Reject unusable files from their structure alone, before any hashing or parsing
+        page_counts, rejected = {}, {}
+        for path in file_paths:
+            try:
+                page_counts[path] = self.preflight(path)["pages"]
+            except PDFRejectedError as e:
+                page_counts[path] = 0
+                rejected[path] = str(e)
+        progress(files_total=len(file_paths), pages_total=sum(page_counts.values()))
+        cache_before = self.embeddings.stats()
+
+        def ingest_path(path):
+            filename = basename(path)
+            source = document_key(namespace, filename)
+            progress(current_file=filename)
+            if path in rejected:
+                print(f"Rejected {filename}: {rejected[path]}")
+                ERRORS.labels(operation="preflight").inc()
+                progress(files_done=1)
+                return {"status": "failed", "error": rejected[path]}
+            try:
+                with self._source_lock(source):
+                    # Hash uploads first so unchanged files are skipped before any parsing
+                    content_hash = hash_file(path)
+                    existing = self._find_document(source)
+                    if existing and existing.get("content_hash") == content_hash:
+                        print(f"{filename} is unchanged, skipping")
+                        progress(files_done=1, pages_total=-page_counts[path])
+                        return {"status": "unchanged", "pages": existing.get("pages"), "chunks": existing["chunks"]}
+                    try:
+                        file_result = self._ingest_file(path, content_hash, existing, progress, namespace)
+                    except IndexSwappedError:
+                        # A reindex swapped in a new collection mid-file; redo the file against it
+                        print(f"Index swapped while ingesting {filename}, ingesting it again")
+                        progress(pages_total=page_counts[path])
+                        file_result = self._ingest_file(
+                            path, content_hash, self._find_document(source), progress, namespace
+                        )
+            except Exception as e:
+                print(f"Error processing PDF {path}: {e}")
+                ERRORS.labels(operation="ingest").inc()
+                progress(files_done=1)
+                return {"status": "failed", "error": str(e)}
+            progress(files_done=1)
+            return file_result
+
+        # Several files are in flight at once, so the parse pool works on them in parallel;
+        # each file's pages are still consumed in order by its own thread
+        parallel_files = min(self.ingest_parallel_files, len(file_paths))
+        if parallel_files > 1:
+            with ThreadPoolExecutor(max_workers=parallel_files, thread_name_prefix="ingest-file") as executor:
+                results = list(executor.map(ingest_path, file_paths))
+        else:
+            results = [ingest_path(path) for path in file_paths]
+        for path, file_result in zip(file_paths, results):
+            if file_result["status"] == "processed":
+                parse_seconds += file_result["parse_seconds"]
+                embed_upsert_seconds += file_result.pop("embed_upsert_seconds")
+                total_added += file_result["chunks_added"]
+            files[basename(path)] = file_result
+        cache_after = self.embeddings.stats()
+
+        timings = {
+            "parse_seconds": round(parse_seconds, 3),
+            "embed_upsert_seconds": round(embed_upsert_seconds, 3),
+            "total_seconds": round(time.perf_counter() - started, 3),
+        }
+        if not any(f["status"] in ("processed", "unchanged") for f in files.values()):
+            print("No chunks generated, returning False")
+            return {"success": False, "files": files, "error": "No chunks generated", "timings": timings}
+        # Note: Both vector store backends persist on write, no need to call persist()
+        print(f"Successfully added {total_added} chunks to vector store")
+        return {
+            "success": True,
+            "files": files,
+            "total_chunks": total_added,
+            "embedding_cache": {
+                "hits": cache_after["hits"] - cache_before["hits"],
+                "misses": cache_after["misses"] - cache_before["misses"],
+            },
+            "timings": timings,
+        }
+
     def _preprocess_question(self, question: str) -> str:
         """Preprocess question to improve retrieval by extracting key terms and expanding synonyms."""
         # Common lease-related terms and their synonyms
@@ -255,113 +921,389 @@ class LegalAIService:
         
         return enhanced_query
 
-    def ask_question(self, question: str, top_k: int = 10, selected_documents: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Ask a question and get a grounded answer with structured citations."""
-        try:
-            if self.vector_store is None:
-                return {
-                    "answer": "No documents have been uploaded yet. Please upload some legal documents first.",
-                    "citations": [],
-                    "confidence": "low",
-                    "context_tokens": 0
-                }
-            
+    def _no_answer(self, message: str) -> Dict[str, Any]:
+        return {
+            "answer": message,
+            "citations": [],
+            "confidence": "low",
+            "context_tokens_estimate": 0
+        }
+
+    def _prepare_answer(self, question: str, top_k: int, selected_documents: Optional[List[str]]) -> Dict[str, Any]:
+        """Retrieve and rank context for a question and build the LLM prompt.
+
+        Returns {"response": ...} when there is nothing to ask the LLM about.
+        """
+        self._sync_index()
+        if self.vector_store is None:
+            return {"response": self._no_answer("No documents have been uploaded yet. Please upload some legal documents first.")}
+        
+        with observe_ask_stage("retrieve"):
             # Preprocess question to improve retrieval
             enhanced_question = self._preprocess_question(question)
             
-            # Enhanced retrieval with better parameters
-            retriever = self._build_retriever(top_k=top_k, selected_documents=selected_documents)
+            # Enhanced retrieval with better parameters; the reranker gets a wider candidate set to cut down
+            candidates = max(top_k, self.rerank_candidates) if self.reranker else top_k
+            retriever = self._build_retriever(top_k=candidates, selected_documents=selected_documents)
             if retriever is None:
-                return {
-                    "answer": "Vector store unavailable. Re-ingest documents.",
-                    "citations": [],
-                    "confidence": "low",
-                    "context_tokens": 0
-                }
-            
-            # Get relevant documents first
-            source_docs = retriever.get_relevant_documents(enhanced_question)
-            
-            if not source_docs:
-                return {
-                    "answer": "No relevant documents found for your question. Please try rephrasing or upload more documents.",
-                    "citations": [],
-                    "confidence": "low",
-                    "context_tokens": 0
-                }
-            
-            # Sort documents by relevance and prioritize pages with key information
-            source_docs = self._prioritize_documents(source_docs, question)
+                return {"response": self._no_answer("Vector store unavailable. Re-ingest documents.")}
             
-            # Combine context from all relevant documents
-            context = "\n\n".join([f"Document: {doc.metadata.get('source', 'Unknown')} (Page: {doc.metadata.get('page', 'Unknown')})\n{doc.page_content}" for doc in source_docs])
+            # Get relevant documents first. The synonym-expanded query only feeds the lexical leg,
+            # so it does not dilute the question embedding
+            source_docs = retriever.get_relevant_documents(question, lexical_query=enhanced_question)
+        
+        return self._prepare_context(question, source_docs, top_k, retriever.timings)
+
+    def _prepare_batch(self, questions: List[str], top_k: int, selected_documents: Optional[List[str]]) -> Dict[str, Any]:
+        """_prepare_answer for several questions at once.
+
+        All questions are embedded in one call and searched in one pass over the
+        index. Chunks retrieved for more than one question are shared, and so are
+        their token counts while the prompts are packed. Returns {"prepared": [...]}
+        in question order, with the shared retrieval stats.
+        """
+        self._sync_index()
+        if self.vector_store is None:
+            response = self._no_answer("No documents have been uploaded yet. Please upload some legal documents first.")
+            return {"prepared": [{"response": response} for _ in questions], "stats": {}}
+        
+        with observe_ask_stage("retrieve"):
+            candidates = max(top_k, self.rerank_candidates) if self.reranker else top_k
+            retriever = self._build_retriever(top_k=candidates, selected_documents=selected_documents)
+            if retriever is None:
+                response = self._no_answer("Vector store unavailable. Re-ingest documents.")
+                return {"prepared": [{"response": response} for _ in questions], "stats": {}}
+            retrieved = retriever.get_relevant_documents_batch(
+                questions, [self._preprocess_question(question) for question in questions]
+            )
+        
+        # One Document per chunk across the batch, and one token count per distinct text
+        shared: Dict[str, Any] = {}
+        uses: Dict[str, int] = {}
+        for source_docs, _ in retrieved:
+            for doc in source_docs:
+                key = doc_key(doc)
+                shared.setdefault(key, doc)
+                uses[key] = uses.get(key, 0) + 1
+        token_counts: Dict[str, int] = {}
+        
+        def count_tokens(text: str) -> int:
+            if text not in token_counts:
+                token_counts[text] = self.token_counter(text)
+            return token_counts[text]
+        
+        prepared = [
+            self._prepare_context(question, [shared[doc_key(doc)] for doc in source_docs], top_k, timings, count_tokens)
+            for question, (source_docs, timings) in zip(questions, retrieved)
+        ]
+        return {
+            "prepared": prepared,
+            "stats": {
+                **(retrieved[0][1]["batch"] if retrieved else {}),
+                "unique_chunks": len(shared),
+                "shared_chunks": sum(1 for count in uses.values() if count > 1),
+            },
+        }
+
+    def _prepare_context(self, question: str, source_docs: List, top_k: int, timings: Dict[str, Any],
+                         token_counter: Optional[Callable[[str], int]] = None) -> Dict[str, Any]:
+        """Rerank retrieved chunks and build the prompt, or {"response": ...} if nothing was found."""
+        if not source_docs:
+            return {"response": self._no_answer("No relevant documents found for your question. Please try rephrasing or upload more documents.")}
+        
+        # Sort documents by relevance and prioritize pages with key information
+        with observe_ask_stage("rerank"):
+            source_docs = self._rerank(question, source_docs, top_k, timings)
+        
+        with observe_ask_stage("prompt_build"):
+            return self._build_prompt(question, source_docs, timings, token_counter)
+
+    def _build_prompt(self, question: str, source_docs: List, timings: Dict[str, Any],
+                      token_counter: Optional[Callable[[str], int]] = None) -> Dict[str, Any]:
+        """Pack the prioritized chunks into a prompt and collect their citations."""
+        # Combine context from the relevant documents, merging overlapping chunks and
+        # filling the prompt token budget by priority
+        packed = pack_context(
+            source_docs, token_counter or self.token_counter,
+            int(self.context_token_budget * (1 - self.token_estimate_margin)),
+            max_overlap=self.splitter_config["chunk_overlap"]
+        )
+        context = packed["context"]
+        source_docs = packed["docs"]
+        
+        # Generate dynamic prompt based on question analysis
+        analysis = self._analyze_question(question)
+        
+        # Use different prompt templates based on question type
+        if analysis["response_style"] == "concise":
+            prompt = self._generate_concise_prompt(question, context, analysis)
+        else:
+            prompt = GROUNDING_PROMPT.format(question=question, context=context)
+        
+        # Enhanced citation processing
+        citations = []
+        for d in source_docs:
+            meta = getattr(d, "metadata", {}) or {}
+            fname = meta.get("source") or meta.get("file_path") or "unknown"
+            page = meta.get("page")
+            if page is None and isinstance(meta.get("pages"), list) and meta["pages"]:
+                page = meta["pages"][0]
+            citations.append({"source": fname, "page": page})
+        
+        # Enhanced source documents processing
+        source_documents = [
+            {
+                "source": (getattr(doc, "metadata", {}) or {}).get("source"),
+                "page": (getattr(doc, "metadata", {}) or {}).get("page"),
+                "excerpt": (doc.page_content or "")[:1000]  # Increased excerpt length
+            }
+            for doc in source_docs
+        ]
+        
+        return {
+            "source_docs": source_docs,
+            "prompt": prompt,
+            "analysis": analysis,
+            "citations": citations,
+            "source_documents": source_documents,
+            "retrieval_timings": timings,
+            "context_packing": packed["stats"],
+        }
+
+    def _finalize_answer(self, prepared: Dict[str, Any], raw_answer: str) -> Dict[str, Any]:
+        """Post-process the raw LLM answer and score it."""
+        citations = prepared["citations"]
+        source_docs = prepared["source_docs"]
+        analysis = prepared["analysis"]
+        
+        with observe_ask_stage("post_process"):
+            # Enhanced answer post-processing
+            answer = self._post_process_answer(raw_answer.strip(), citations)
             
-            # Generate dynamic prompt based on question analysis
-            analysis = self._analyze_question(question)
+            # Apply length constraints if specified
+            if analysis["word_limit"] or analysis["char_limit"]:
+                answer = self._apply_length_constraints(answer, analysis)
+        
+        with observe_ask_stage("confidence"):
+            # Calculate confidence based on multiple factors
+            confidence = self._calculate_confidence(citations, source_docs, answer)
+            analysis_quality = self._assess_analysis_quality(answer, citations)
+        
+        LLM_TOKENS.labels(kind="context").inc(prepared["context_packing"]["context_tokens_estimate"])
+        LLM_TOKENS.labels(kind="answer").inc(self.token_counter(raw_answer))
+        
+        return {
+            "answer": answer,
+            "citations": citations,
+            "confidence": confidence,
+            "context_tokens_estimate": prepared["context_packing"]["context_tokens_estimate"],
+            "context_packing": prepared["context_packing"],
+            "source_documents": prepared["source_documents"],
+            "analysis_quality": analysis_quality,
+            "retrieval_timings": prepared["retrieval_timings"]
+        }
+
+    def _cached_answer(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        cached = self.answer_cache.get(cache_key)
+        ANSWER_CACHE_LOOKUPS.labels(result="miss" if cached is None else "hit").inc()
+        return cached
+
+    def ask_question(self, question: str, top_k: int = DEFAULT_TOP_K, selected_documents: Optional[List[str]] = None,
+                     namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Ask a question and get a grounded answer with structured citations.
+
+        `selected_documents` restricts the answer to those filenames in `namespace`.
+        """
+        try:
+            selected_documents = self._selected_sources(selected_documents, namespace)
+            cache_key = self.answer_cache.make_key(question, top_k, selected_documents, self.corpus_version)
+            cached = self._cached_answer(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True}
             
-            # Use different prompt templates based on question type
-            if analysis["response_style"] == "concise":
-                prompt = self._generate_concise_prompt(question, context, analysis)
-            else:
-                prompt = GROUNDING_PROMPT.format(question=question, context=context)
+            prepared = self._prepare_answer(question, top_k, selected_documents)
+            if "response" in prepared:
+                return prepared["response"]
             
             # Get response from LLM
-            response = self.llm.invoke(prompt)
-            answer = response.content.strip()
+            with observe_ask_stage("llm"):
+                response = self.llm.invoke(prepared["prompt"])
+            result = self._finalize_answer(prepared, response.content)
+            self.answer_cache.set(cache_key, result)
+            return {**result, "cached": False}
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            ERRORS.labels(operation="ask").inc()
+            return self._no_answer(f"Error processing your question: {e}")
+
+    async def aask_question(self, question: str, top_k: int = DEFAULT_TOP_K, selected_documents: Optional[List[str]] = None,
+                            namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Non-blocking ask_question: retrieval and the LLM call run on bounded executors."""
+        try:
+            selected_documents = self._selected_sources(selected_documents, namespace)
+            cache_key = self.answer_cache.make_key(question, top_k, selected_documents, self.corpus_version)
+            cached = self._cached_answer(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True}
             
-            # Enhanced citation processing
-            citations = []
-            for d in source_docs:
-                meta = getattr(d, "metadata", {}) or {}
-                fname = meta.get("source") or meta.get("file_path") or "unknown"
-                page = meta.get("page")
-                if page is None and isinstance(meta.get("pages"), list) and meta["pages"]:
-                    page = meta["pages"][0]
-                citations.append({"source": fname, "page": page})
+            prepared = await self.retrieval_limiter.run(self._prepare_answer, question, top_k, selected_documents)
+            if "response" in prepared:
+                return prepared["response"]
             
-            # Enhanced answer post-processing
-            answer = self._post_process_answer(answer, citations)
+            with observe_ask_stage("llm"):
+                response = await self.llm_limiter.run(self.llm.invoke, prepared["prompt"])
+            result = self._finalize_answer(prepared, response.content)
+            self.answer_cache.set(cache_key, result)
+            return {**result, "cached": False}
+        except ServiceBusyError:
+            ERRORS.labels(operation="ask_busy").inc()
+            raise
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            ERRORS.labels(operation="ask").inc()
+            return self._no_answer(f"Error processing your question: {e}")
+
+    async def aask_question_stream(self, question: str, top_k: int = DEFAULT_TOP_K, selected_documents: Optional[List[str]] = None,
+                                   namespace: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Ask a question and yield events as the answer is generated.
+
+        Emits a "citations" event once retrieval is done, "token" events carrying
+        post-processed answer text as it arrives ("replace" if earlier text had to be
+        reformatted), then a "final" event with the complete response.
+        """
+        try:
+            selected_documents = self._selected_sources(selected_documents, namespace)
+            cache_key = self.answer_cache.make_key(question, top_k, selected_documents, self.corpus_version)
+            cached = self._cached_answer(cache_key)
+            if cached is not None:
+                yield {"event": "citations", "data": {
+                    "citations": cached["citations"],
+                    "source_documents": cached["source_documents"],
+                }}
+                yield {"event": "token", "data": {"text": cached["answer"]}}
+                yield {"event": "final", "data": {**cached, "cached": True}}
+                return
             
-            # Apply length constraints if specified
-            analysis = self._analyze_question(question)
-            if analysis["word_limit"] or analysis["char_limit"]:
-                answer = self._apply_length_constraints(answer, analysis)
+            prepared = await self.retrieval_limiter.run(self._prepare_answer, question, top_k, selected_documents)
+            if "response" in prepared:
+                yield {"event": "final", "data": prepared["response"]}
+                return
             
-            # Calculate confidence based on multiple factors
-            confidence = self._calculate_confidence(citations, source_docs, answer)
+            yield {"event": "citations", "data": {
+                "citations": prepared["citations"],
+                "source_documents": prepared["source_documents"],
+            }}
             
-            # Enhanced token counting
-            token_count = sum(len((d.page_content or "").split()) for d in source_docs)
+            formatter = _StreamingAnswerFormatter(self, prepared["citations"])
+            async with self.llm_limiter.slot():
+                with observe_ask_stage("llm"):
+                    async for chunk in self.llm.astream(prepared["prompt"]):
+                        for event in formatter.feed(chunk.content or ""):
+                            yield event
+            
+            result = self._finalize_answer(prepared, formatter.raw_answer)
+            self.answer_cache.set(cache_key, result)
+            for event in formatter.finish(result["answer"]):
+                yield event
+            yield {"event": "final", "data": {**result, "cached": False}}
+        except ServiceBusyError as e:
+            ERRORS.labels(operation="ask_busy").inc()
+            yield {"event": "error", "data": {"detail": str(e)}}
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            ERRORS.labels(operation="ask").inc()
+            yield {"event": "error", "data": {"detail": f"Error processing your question: {e}"}}
+
+    async def aask_questions_batch(self, questions: List[str], top_k: int = DEFAULT_TOP_K,
+                                   selected_documents: Optional[List[str]] = None,
+                                   namespace: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Answer several questions about the same documents, yielding each result as it completes.
+
+        Cached answers come back first. The rest share one retrieval pass (_prepare_batch)
+        and are generated concurrently, at most batch_llm_concurrency at a time and
+        within the LLM limiter. Emits a "result" event per question (with its index in
+        `questions`), an "error" event for a question that could not get an LLM slot,
+        then a "done" event with counts and the shared retrieval stats.
+        """
+        started = time.perf_counter()
+        counts = {"questions": len(questions), "cached": 0, "answered": 0, "failed": 0}
+        tasks: List[asyncio.Task] = []
+        try:
+            selected_documents = self._selected_sources(selected_documents, namespace)
+            # Questions that normalize to the same cache key are answered once
+            corpus_version = self.corpus_version
+            pending: Dict[str, List[int]] = {}
+            for index, question in enumerate(questions):
+                cache_key = self.answer_cache.make_key(question, top_k, selected_documents, corpus_version)
+                cached = self._cached_answer(cache_key)
+                if cached is not None:
+                    counts["cached"] += 1
+                    yield {"event": "result", "data": {"index": index, "question": question, **cached, "cached": True}}
+                else:
+                    pending.setdefault(cache_key, []).append(index)
             
-            # Enhanced source documents processing
-            source_documents = [
-                {
-                    "source": (getattr(doc, "metadata", {}) or {}).get("source"),
-                    "page": (getattr(doc, "metadata", {}) or {}).get("page"),
-                    "excerpt": (doc.page_content or "")[:1000]  # Increased excerpt length
-                }
-                for doc in source_docs
-            ]
+            retrieval = {}
+            if pending:
+                keys = list(pending)
+                batch = await self.retrieval_limiter.run(
+                    self._prepare_batch, [questions[pending[key][0]] for key in keys], top_k, selected_documents
+                )
+                retrieval = batch["stats"]
+                batch_slots = asyncio.Semaphore(self.batch_llm_concurrency)
+                
+                async def answer(cache_key: str, prepared: Dict[str, Any]):
+                    """(cache_key, result, error) for one distinct question"""
+                    try:
+                        if "response" in prepared:
+                            return cache_key, {**prepared["response"], "cached": False}, None
+                        async with batch_slots:
+                            with observe_ask_stage("llm"):
+                                response = await self.llm_limiter.run(self.llm.invoke, prepared["prompt"])
+                        result = self._finalize_answer(prepared, response.content)
+                        self.answer_cache.set(cache_key, result)
+                        return cache_key, {**result, "cached": False}, None
+                    except ServiceBusyError as e:
+                        ERRORS.labels(operation="ask_busy").inc()
+                        return cache_key, None, str(e)
+                    except Exception as e:
+                        import traceback
+                        traceback.print_exc()
+                        ERRORS.labels(operation="ask").inc()
+                        return cache_key, self._no_answer(f"Error processing your question: {e}"), None
+                
+                tasks = [asyncio.ensure_future(answer(key, prepared)) for key, prepared in zip(keys, batch["prepared"])]
+                for next_done in asyncio.as_completed(tasks):
+                    cache_key, result, error = await next_done
+                    for index in pending[cache_key]:
+                        if error is not None:
+                            counts["failed"] += 1
+                            yield {"event": "error", "data": {"index": index, "question": questions[index], "detail": error}}
+                        else:
+                            counts["answered"] += 1
+                            yield {"event": "result", "data": {"index": index, "question": questions[index], **result}}
             
-            return {
-                "answer": answer,
-                "citations": citations,
-                "confidence": confidence,
-                "context_tokens": token_count,
-                "source_documents": source_documents,
-                "analysis_quality": self._assess_analysis_quality(answer, citations)
-            }
+            yield {"event": "done", "data": {
+                **counts,
+                "retrieval": retrieval,
+                "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            }}
+        except ServiceBusyError as e:
+            ERRORS.labels(operation="ask_busy").inc()
+            yield {"event": "error", "data": {"detail": str(e)}}
         except Exception as e:
             import traceback
             traceback.print_exc()
-            return {
-                "answer": f"Error processing your question: {e}",
-                "citations": [],
-                "confidence": "low",
-                "context_tokens": 0
-            }
+            ERRORS.labels(operation="ask").inc()
+            yield {"event": "error", "data": {"detail": f"Error processing your questions: {e}"}}
+        finally:
+            # The client may disconnect mid-batch; stop generating answers nobody will read
+            for task in tasks:
+                task.cancel()
 
-    def debug_retrieval(self, question: str, top_k: int = 5) -> Dict[str, Any]:
+    def debug_retrieval(self, question: str, top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
         """Debug method to see what documents are being retrieved for a question."""
         try:
             if self.vector_store is None:
@@ -371,11 +1313,12 @@ class LegalAIService:
             if retriever is None:
                 return {"error": "Could not build retriever"}
             
-            source_docs = retriever.get_relevant_documents(question)
+            source_docs = retriever.get_relevant_documents(question, lexical_query=self._preprocess_question(question))
             
             debug_info = {
                 "question": question,
                 "total_documents_found": len(source_docs),
+                "retrieval_timings": retriever.timings,
                 "documents": []
             }
             
@@ -393,69 +1336,75 @@ class LegalAIService:
         except Exception as e:
             return {"error": str(e)}
 
+    def _rerank(self, question: str, source_docs: List, top_k: int, timings: Dict[str, Any]) -> List:
+        """Cut the candidates down to top_k with the cross-encoder, or the heuristic when it is off or over budget"""
+        if self.reranker is not None:
+            candidates = len(source_docs)
+            reranked = self.reranker.rerank(question, source_docs, top_k)
+            if reranked is not None:
+                timings["rerank"] = {k: v for k, v in reranked.items() if k != "docs"}
+                kept = reranked["docs"]
+            else:
+                timings["rerank"] = {"fallback": True}
+                kept = self._prioritize_documents(source_docs[:top_k], question)
+            # The retriever returned the wider candidate set; count what the cut to top_k left out
+            timings["dropped"]["top_k"] += candidates - len(kept)
+            timings["dropped_total"] = sum(timings["dropped"].values())
+            return kept
+        return self._prioritize_documents(source_docs, question)
+
     def _prioritize_documents(self, source_docs: List, question: str) -> List:
-        """Prioritize documents based on relevance and presence of key information."""
+        """Prioritize documents based on relevance and presence of key information.
+
+        Uses the key-term features computed at ingest and the lexical index's term
+        postings, so scoring is a lookup rather than a scan of the chunk text.
+        """
         if not source_docs:
             return source_docs
         
-        # Key terms that indicate important lease information
-        key_terms = [
-            'rent', 'monthly payment', 'installment payment', 'total rent',
-            'start date', 'end date', 'lease term', 'duration',
-            'tenant', 'landlord', 'property address', 'premises',
-            'security deposit', 'utilities', 'parking'
-        ]
+        # Score based on question relevance: question terms present in the chunk
+        question_terms = set(tokenize(question))
+        term_hits = np.array(self.lexical_index.term_presence([doc_key(doc) for doc in source_docs], question_terms))
         
-        question_lower = question.lower()
+        # Score based on key lease information (features are missing on chunks ingested before they existed)
+        key_term_counts = np.array([
+            doc.metadata["key_term_count"] if "key_term_count" in doc.metadata
+            else key_term_features(doc.page_content)["key_term_count"]
+            for doc in source_docs
+        ])
         
-        def score_document(doc):
-            content = doc.page_content.lower()
-            score = 0
-            
-            # Score based on question relevance
-            for term in question_lower.split():
-                if term in content:
-                    score += 2
-            
-            # Score based on key lease information
-            for term in key_terms:
-                if term in content:
-                    score += 3
-            
-            # Prioritize early pages (usually contain key terms)
-            page = doc.metadata.get('page', 0)
-            if isinstance(page, int) and page <= 5:
-                score += 2
-            
-            return score
+        # Prioritize early pages (usually contain key terms)
+        early_page = np.array([
+            isinstance(doc.metadata.get('page', 0), int) and doc.metadata.get('page', 0) <= 5
+            for doc in source_docs
+        ])
         
-        # Sort documents by score (highest first)
-        sorted_docs = sorted(source_docs, key=score_document, reverse=True)
+        scores = 2 * term_hits + 3 * key_term_counts + 2 * early_page
         
-        return sorted_docs
+        # Sort documents by score (highest first), keeping retrieval order among ties
+        order = np.argsort(-scores, kind="stable")
+        return [source_docs[i] for i in order]
+
+    def _selected_sources(self, selected_documents: Optional[List[str]], namespace: Optional[str] = None) -> Optional[List[str]]:
+        """Document keys of the selected filenames in a namespace, or None when nothing is selected"""
+        if not selected_documents:
+            return None
+        namespace = validate_namespace(namespace)
+        return [document_key(namespace, os.path.basename(name)) for name in selected_documents]
 
     def _build_retriever(self, top_k: int, selected_documents: Optional[List[str]] = None):
         """
-        Create a per-call retriever with enhanced similarity search and optional metadata filter.
-        Expects chunks to carry metadata {'source': basename, 'page': int}.
+        Create a per-call hybrid retriever: similarity search fused with BM25 by reciprocal rank fusion,
+        with an optional filter on source documents (document keys, see _selected_sources).
+        Expects chunks to carry metadata {'source': document key, 'page': int}.
         """
+        self._sync_index()
         if self.vector_store is None:
             return None
 
-        where_filter = None
-        if selected_documents:
-            # Chroma/LC filter format
-            where_filter = {"source": {"$in": [os.path.basename(x) for x in selected_documents]}}
-
-        # Enhanced retriever configuration for better context retrieval
-        retriever = self.vector_store.as_retriever(
-            search_type="similarity",              # Use similarity for better relevance
-            search_kwargs={
-                "k": top_k,
-                "filter": where_filter,
-            }
+        return HybridRetriever(
+            self.vector_store, self.lexical_index, top_k=top_k, sources=selected_documents or None, **self.retrieval_config
         )
-        return retriever
     
     def _standardize_citations(self, answer: str) -> str:
         """Standardize citation formatting throughout the answer."""
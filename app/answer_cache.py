@@ -0,0 +1,110 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+
+class AnswerCache:
+    """LRU cache of /ask responses with a TTL and an optional SQLite backend.
+
+    Keys include the corpus version, so any add or delete of a document makes
+    earlier answers unreachable instead of serving stale results.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if disk_path:
+            cache_dir = os.path.dirname(disk_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        question = re.sub(r'\s+', ' ', question.lower()).strip()
+        return question.rstrip('?!. ')
+
+    def make_key(self, question: str, top_k: int, selected_documents: Optional[List[str]], corpus_version: str) -> str:
+        key_data = json.dumps({
+            "question": self.normalize_question(question),
+            "top_k": top_k,
+            "selected_documents": sorted(selected_documents or []),
+            "corpus_version": corpus_version,
+        }, sort_keys=True)
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return json.loads(value)
+                del self._entries[key]
+
+            if self._conn is None:
+                return None
+            row = self._conn.execute("SELECT value, created_at FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE answers SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, created_at, value)
+            return json.loads(value)
+
+    def set(self, key: str, response: Dict[str, Any]):
+        now = time.time()
+        value = json.dumps(response)
+        with self._lock:
+            self._remember(key, now, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._conn.execute(
+                    "DELETE FROM answers WHERE key NOT IN "
+                    "(SELECT key FROM answers ORDER BY last_access DESC LIMIT ?)", (self.max_entries,)
+                )
+                self._conn.commit()
+
+    def _remember(self, key: str, created_at: float, value: str):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear_memory(self):
+        """Drop the in-process entries, keeping the shared disk cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM answers")
+                self._conn.commit()
@@ -0,0 +1,67 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+class ServiceBusyError(Exception):
+    """Raised when a call waited longer than the queue timeout for a free slot"""
+
+
+class ConcurrencyLimiter:
+    """Caps the number of concurrent calls to a blocking dependency (embedding model, LLM).
+
+    Blocking work runs on a dedicated thread pool so it never holds up the event loop;
+    callers beyond the limit wait in line for up to queue_timeout seconds.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, queue_timeout: float = 30.0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"{name}-")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiting = 0
+        self._in_flight = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """The semaphore of the running event loop, created there on first use"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the limited slots for the duration of the block"""
+        semaphore = self._get_semaphore()
+        self._waiting += 1
+        try:
+            # A cancelled or timed-out acquire never holds a permit; once acquired, the finally below releases it
+            async with asyncio.timeout(self.queue_timeout):
+                await semaphore.acquire()
+        except TimeoutError:
+            raise ServiceBusyError(f"Timed out after {self.queue_timeout}s waiting for a free {self.name} slot")
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            semaphore.release()
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking function on the limiter's thread pool"""
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, int]:
+        return {"max_concurrency": self.max_concurrency, "in_flight": self._in_flight, "waiting": self._waiting}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
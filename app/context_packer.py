@@ -0,0 +1,138 @@
+import threading
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from langchain.schema import Document
+
+
+class TokenCounter:
+    """Estimates token counts with a subword tokenizer, loaded lazily.
+
+    The tokenizer is the embedding model's, not the LLM's (Gemini's is only available
+    through an API call), so counts are an approximation of what the LLM will see;
+    budgets built on them need a safety margin. Falls back to a characters-per-token
+    estimate if the tokenizer is unavailable.
+    """
+
+    def __init__(self, model_name: str, chars_per_token: float = 4.0):
+        self.model_name = model_name
+        self.chars_per_token = chars_per_token
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_tokenizer(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        from transformers import AutoTokenizer
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    except Exception as e:
+                        print(f"Tokenizer for {self.model_name} unavailable, estimating token counts: {e}")
+                    self._loaded = True
+        return self._tokenizer
+
+    def __call__(self, text: str) -> int:
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return int(len(text) / self.chars_per_token) + 1
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def _chunk_index(doc: Document) -> Optional[int]:
+    chunk_id = (doc.metadata or {}).get("chunk_id")
+    if chunk_id and "::c" in chunk_id:
+        try:
+            return int(chunk_id.rsplit("::c", 1)[1])
+        except ValueError:
+            return None
+    return None
+
+
+def _overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of left that is also a prefix of right"""
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_group(chunks: List[Tuple[int, Document]], max_overlap: int, min_overlap: int) -> List[Dict[str, Any]]:
+    """Merge overlapping or adjacent chunks from one page into contiguous segments.
+
+    chunks are (priority rank, document) pairs. Chunks with known positions are merged
+    in page order; others are merged only when their text overlaps.
+    """
+    ordered = sorted(chunks, key=lambda item: (_chunk_index(item[1]) is None, _chunk_index(item[1]) or 0, item[0]))
+    segments: List[Dict[str, Any]] = []
+    for rank, doc in ordered:
+        text = doc.page_content or ""
+        index = _chunk_index(doc)
+        if segments:
+            last = segments[-1]
+            overlap = _overlap(last["text"], text, max_overlap)
+            adjacent = index is not None and last["last_index"] is not None and index == last["last_index"] + 1
+            if overlap >= min_overlap or adjacent:
+                last["text"] = last["text"] + (text[overlap:] if overlap else "\n" + text)
+                last["overlap_removed"] += overlap
+                last["docs"].append(doc)
+                last["rank"] = min(last["rank"], rank)
+                last["last_index"] = index
+                continue
+        segments.append({
+            "text": text,
+            "rank": rank,
+            "docs": [doc],
+            "last_index": index,
+            "overlap_removed": 0,
+            "source": doc.metadata.get("source", "Unknown"),
+            "page": doc.metadata.get("page", "Unknown"),
+        })
+    return segments
+
+
+def pack_context(docs: List[Document], count_tokens: Callable[[str], int], token_budget: int,
+                 max_overlap: int, min_overlap: int = 20) -> Dict[str, Any]:
+    """Assemble prompt context from prioritized chunks.
+
+    Overlapping and adjacent chunks from the same source/page are merged so shared text is
+    sent once, then segments are added in priority order until the token budget is full.
+    max_overlap is the splitter's chunk_overlap (in characters), the most text two
+    neighbouring chunks can share.
+    Token counts are whatever count_tokens estimates; the caller leaves a margin in the budget.
+    Returns the context string, the chunks it contains and packing statistics.
+    """
+    groups: Dict[Tuple[Any, Any], List[Tuple[int, Document]]] = {}
+    for rank, doc in enumerate(docs):
+        meta = doc.metadata or {}
+        groups.setdefault((meta.get("source"), meta.get("page")), []).append((rank, doc))
+
+    segments = []
+    for group in groups.values():
+        segments.extend(_merge_group(group, max_overlap, min_overlap))
+    segments.sort(key=lambda segment: segment["rank"])
+
+    used, used_tokens, dropped = [], 0, 0
+    for segment in segments:
+        block = f"Document: {segment['source']} (Page: {segment['page']})\n{segment['text']}"
+        tokens = count_tokens(block)
+        if used and used_tokens + tokens > token_budget:
+            dropped += 1
+            continue
+        used.append(block)
+        used_tokens += tokens
+        segment["used"] = True
+
+    used_segments = [segment for segment in segments if segment.get("used")]
+    return {
+        "context": "\n\n".join(used),
+        "docs": [doc for segment in used_segments for doc in segment["docs"]],
+        "stats": {
+            "chunks_in": len(docs),
+            "segments": len(segments),
+            "segments_used": len(used_segments),
+            "segments_dropped": dropped,
+            "overlap_chars_removed": sum(segment["overlap_removed"] for segment in used_segments),
+            "context_tokens_estimate": used_tokens,
+            "token_budget_estimate": token_budget,
+        },
+    }
@@ -0,0 +1,213 @@
+import os
+import re
+import json
+import sqlite3
+import secrets
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+# Columns returned by listings; per-page hashes and chunk counts are only loaded for a single document
+SUMMARY_COLUMNS = ["filename", "upload_time", "chunks", "pages", "content_hash", "namespace"]
+
+# Documents are grouped into namespaces (tenant, matter or folder), each with its own vector shard
+DEFAULT_NAMESPACE = "default"
+# Namespaces become part of collection names, so they are kept short and end on a letter or digit
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9_-]{0,30}[A-Za-z0-9])?$")
+
+
+def validate_namespace(namespace: Optional[str]) -> str:
+    """The namespace to store a document under; raises ValueError for names unusable as shard names"""
+    namespace = namespace or DEFAULT_NAMESPACE
+    if not NAMESPACE_PATTERN.match(namespace):
+        raise ValueError("Namespace must be 1-32 letters, digits, '-' or '_', starting and ending with a letter or digit")
+    return namespace
+
+
+def document_key(namespace: str, filename: str) -> str:
+    """Identifies a document across namespaces: the filename, prefixed by its namespace outside the default one.
+
+    The key is the document's path under uploads/ and the `source` of its chunks, so
+    documents of the default namespace keep the paths and chunk ids they always had.
+    """
+    return filename if namespace == DEFAULT_NAMESPACE else f"{namespace}/{filename}"
+
+
+def split_document_key(key: str) -> Tuple[str, str]:
+    """(namespace, filename) of a document_key()"""
+    namespace, separator, filename = key.partition("/")
+    return (namespace, filename) if separator else (DEFAULT_NAMESPACE, key)
+
+
+class DocumentRegistry:
+    """SQLite registry of ingested documents, shared by every worker process.
+
+    Documents are identified by namespace and filename, so the same filename can be
+    uploaded to several namespaces.
+
+    The database runs in WAL mode so readers never block the writer, and each
+    change is a single transaction that also bumps a version counter. The
+    version identifies the corpus state across processes (answer cache keys use it).
+    Entries from a legacy documents.json are imported once, the first time the
+    registry is opened.
+    """
+
+    def __init__(self, db_path: str = "documents.sqlite3", legacy_json_path: Optional[str] = "documents.json"):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "namespace TEXT NOT NULL, filename TEXT NOT NULL, upload_time TEXT NOT NULL, chunks INTEGER NOT NULL, "
+                "pages INTEGER, content_hash TEXT, page_hashes TEXT, page_chunks TEXT, PRIMARY KEY (namespace, filename))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_upload_time ON documents(upload_time)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS registry_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS registry_settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute("INSERT OR IGNORE INTO registry_meta (key, value) VALUES ('version', 0)")
+            # Distinguishes a recreated database from the one it replaced, whose counter restarts at 0
+            self._conn.execute(
+                "INSERT OR IGNORE INTO registry_meta (key, value) VALUES ('epoch', ?)", (secrets.randbits(48),)
+            )
+        if legacy_json_path and os.path.exists(legacy_json_path):
+            self._import_legacy(legacy_json_path)
+
+    def _import_legacy(self, json_path: str):
+        try:
+            with open(json_path, 'r') as f:
+                entries = json.load(f)
+            with self._lock, self._conn:
+                # The file is left in place (it may be a bind mount), so record that it was imported
+                imported = self._conn.execute(
+                    "INSERT OR IGNORE INTO registry_meta (key, value) VALUES ('legacy_imported', 1)"
+                ).rowcount
+                if not imported:
+                    return
+                for entry in entries:
+                    self._upsert(entry)
+                self._bump_version()
+            print(f"Imported {len(entries)} document(s) from {json_path}")
+        except Exception as e:
+            print(f"Error importing {json_path}: {e}")
+
+    def _upsert(self, entry: Dict[str, Any]):
+        page_hashes = entry.get("page_hashes")
+        page_chunks = entry.get("page_chunks")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO documents "
+            "(filename, upload_time, chunks, pages, content_hash, page_hashes, page_chunks, namespace) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry["filename"], entry["upload_time"], entry["chunks"], entry.get("pages"), entry.get("content_hash"),
+                json.dumps(page_hashes) if page_hashes is not None else None,
+                json.dumps(page_chunks) if page_chunks is not None else None,
+                entry.get("namespace") or DEFAULT_NAMESPACE,
+            )
+        )
+
+    def _bump_version(self):
+        self._conn.execute("UPDATE registry_meta SET value = value + 1 WHERE key = 'version'")
+
+    def version(self) -> str:
+        with self._lock:
+            meta = dict(self._conn.execute("SELECT key, value FROM registry_meta").fetchall())
+        return f"{meta['epoch']:x}-{meta['version']}"
+
+    def get(self, filename: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[Dict[str, Any]]:
+        """Full entry for one document, including per-page hashes and chunk counts"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)}, page_hashes, page_chunks FROM documents "
+                "WHERE namespace = ? AND filename = ?",
+                (namespace, filename)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(SUMMARY_COLUMNS, row[:len(SUMMARY_COLUMNS)]))
+        # Legacy entries have no page tracking; leave the keys out so callers can tell
+        if row[-2] is not None:
+            entry["page_hashes"] = json.loads(row[-2])
+            entry["page_chunks"] = json.loads(row[-1])
+        return entry
+
+    def upsert(self, entry: Dict[str, Any]):
+        """Insert or replace a document entry atomically"""
+        with self._lock, self._conn:
+            self._upsert(entry)
+            self._bump_version()
+
+    def delete(self, filename: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM documents WHERE namespace = ? AND filename = ?", (namespace, filename)
+            ).rowcount
+            if deleted:
+                self._bump_version()
+        return bool(deleted)
+
+    def has_content_hash(self, content_hash: str) -> bool:
+        """Whether any document still has this content (its page artifact is shared)"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone()
+        return row is not None
+
+    def namespaces(self) -> List[str]:
+        """Namespaces that hold at least one document"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT namespace FROM documents ORDER BY namespace").fetchall()
+        return [row[0] for row in rows]
+
+    def active_index(self) -> Optional[Dict[str, Any]]:
+        """The vector index the registry entries were built for (collection, embedding model, splitter)"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM registry_settings WHERE key = 'active_index'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_active_index(self, index: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO registry_settings (key, value) VALUES ('active_index', ?)", (json.dumps(index),)
+            )
+
+    def swap_index(self, index: Dict[str, Any], entries: List[Dict[str, Any]]):
+        """Replace every entry and the active index in one transaction"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents")
+            for entry in entries:
+                self._upsert(entry)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO registry_settings (key, value) VALUES ('active_index', ?)", (json.dumps(index),)
+            )
+            self._bump_version()
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, query: Optional[str] = None,
+             namespace: Optional[str] = None) -> Dict[str, Any]:
+        """A page of document summaries, oldest first, optionally filtered by namespace and filename substring"""
+        conditions, params = [], []
+        if query:
+            conditions.append("filename LIKE ? ESCAPE '\\'")
+            escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        if namespace:
+            conditions.append("namespace = ?")
+            params.append(namespace)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            total, chunks, pages = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(chunks), 0), COALESCE(SUM(pages), 0) FROM documents {where}", params
+            ).fetchone()
+            rows = self._conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM documents {where} "
+                "ORDER BY upload_time, namespace, filename LIMIT ? OFFSET ?",
+                params + [limit if limit is not None else -1, offset]
+            ).fetchall()
+        return {
+            "documents": [dict(zip(SUMMARY_COLUMNS, row)) for row in rows],
+            "total": total,
+            "stats": {"documents": total, "chunks": chunks, "pages": pages},
+        }
@@ -0,0 +1,146 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Dict
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with a persistent, content-addressed cache of document vectors.
+
+    Entries are keyed by a hash of the model name and the chunk text, so identical
+    chunks are only embedded once no matter which file or upload they come from.
+    The least recently used entries are evicted once the cache exceeds max_entries.
+
+    Query vectors, which asymmetric models compute differently from document vectors,
+    are kept apart in a bounded in-memory LRU of max_query_entries, so questions never
+    evict chunk vectors or write to the database.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 cache_path: str = "embedding_cache.sqlite3", max_entries: int = 200000,
+                 max_query_entries: int = 10000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.embed_seconds = 0.0
+        self._lock = threading.Lock()
+        self.max_query_entries = max_query_entries
+        self._query_vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_lock = threading.Lock()
+
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reading cached vectors and only sending misses to the model"""
+        keys = [self._key(text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        now = time.time()
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vectors[key] = array("f", blob).tolist()
+            if vectors:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in vectors]
+                )
+                self._conn.commit()
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            started = time.perf_counter()
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            embed_seconds = time.perf_counter() - started
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                    [(key, array("f", vector).tobytes(), now) for key, vector in zip(missing, new_vectors)]
+                )
+                self._evict()
+                self._conn.commit()
+            vectors.update(zip(missing, new_vectors))
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+            if missing:
+                self.embed_seconds += embed_seconds
+        return [list(vectors[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the model's query embedding, through the in-memory query cache"""
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries; the ones not in the query cache go to the model in a single call"""
+        vectors: Dict[str, List[float]] = {}
+        with self._query_lock:
+            for text in texts:
+                if text in self._query_vectors:
+                    self._query_vectors.move_to_end(text)
+                    vectors[text] = self._query_vectors[text]
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            new_vectors = self._embed_query_batch(missing)
+            vectors.update(zip(missing, new_vectors))
+            with self._query_lock:
+                self._query_vectors.update(zip(missing, new_vectors))
+                while len(self._query_vectors) > self.max_query_entries:
+                    self._query_vectors.popitem(last=False)
+        return [list(vectors[text]) for text in texts]
+
+    def _embed_query_batch(self, texts: List[str]) -> List[List[float]]:
+        """Query vectors for several texts, in one model call where the model allows it"""
+        model = self.embeddings
+        if isinstance(model, HuggingFaceEmbeddings):
+            query_encode_kwargs = getattr(model, "query_encode_kwargs", None)
+            if query_encode_kwargs is None:
+                # Releases without query_encode_kwargs encode a query exactly like a document
+                return model.embed_documents(texts)
+            # What embed_query does for one text, applied to the whole list
+            return model._embed(texts, query_encode_kwargs or model.encode_kwargs)
+        return [model.embed_query(text) for text in texts]
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)", (excess,)
+            )
+
+    def stats(self) -> Dict[str, float]:
+        """Get cumulative hit/miss counts and time spent in the model"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "embed_seconds": self.embed_seconds}
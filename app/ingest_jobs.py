@@ -0,0 +1,294 @@
+import os
+import json
+import uuid
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+
+
+class IngestProgress:
+    """Live counters of a running ingest job.
+
+    The ingest pipeline reports increments through add(); snapshot() adds the
+    elapsed time and an ETA from the page throughput so far. Parsing runs at most a
+    bounded number of pages ahead of embedding, so pages parsed tracks overall progress.
+    """
+
+    FIELDS = ("files_total", "files_done", "pages_total", "pages_parsed",
+              "chunks_produced", "chunks_embedded", "chunks_upserted")
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+        self.current_file: Optional[str] = None
+        self.seq = 0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, current_file: Optional[str] = None, **deltas: int):
+        with self._lock:
+            for field, delta in deltas.items():
+                self.counts[field] += delta
+            if current_file is not None:
+                self.current_file = current_file
+            self.seq += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+            elapsed = time.perf_counter() - self._started
+            eta = None
+            if counts["pages_parsed"] and counts["pages_total"]:
+                remaining = max(0, counts["pages_total"] - counts["pages_parsed"])
+                eta = round(elapsed / counts["pages_parsed"] * remaining, 1)
+            return {
+                **counts,
+                "current_file": self.current_file,
+                "elapsed_seconds": round(elapsed, 1),
+                "eta_seconds": eta,
+                "seq": self.seq,
+            }
+
+
+class IngestJobQueue:
+    """Persistent queue of ingestion jobs processed by a pool of background worker threads.
+
+    Jobs live in a SQLite table (normally in the document registry's database), so
+    every worker process sees every job and its progress. A worker thread claims the
+    oldest queued job atomically, so each job runs exactly once whichever process
+    received the upload. Processes record a heartbeat on the jobs they run; a running
+    job whose heartbeat goes stale (its process died) is queued again.
+    """
+
+    def __init__(self, process_fn: Callable[..., Dict[str, Any]], db_path: str = "documents.sqlite3",
+                 num_workers: int = 2, max_finished_jobs: int = 200, heartbeat_seconds: float = 5.0,
+                 poll_seconds: float = 1.0):
+        self.process_fn = process_fn
+        self.db_path = db_path
+        self.num_workers = max(1, num_workers)
+        self.max_finished_jobs = max_finished_jobs
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = heartbeat_seconds * 6
+        self.poll_seconds = poll_seconds
+        # Unique per process start; a restarted process never inherits its predecessor's jobs
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._workers: List[threading.Thread] = []
+        self._progress: Dict[str, IngestProgress] = {}
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, owner TEXT, heartbeat_at REAL, "
+            "created_at TEXT NOT NULL, job TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs(status, created_at)")
+
+    @contextmanager
+    def _transaction(self):
+        """A write transaction that holds the database lock from its start, across processes"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def start(self):
+        """Start the worker pool and the heartbeat; unfinished jobs of dead processes are picked up by claims"""
+        if self._workers:
+            return
+        self._stopping.clear()
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"ingest-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="ingest-heartbeat", daemon=True)
+        heartbeat.start()
+        self._workers.append(heartbeat)
+        print(f"Started {self.num_workers} ingest worker(s)")
+
+    def stop(self, timeout: float = 5.0):
+        """Ask the workers to exit once they finish their current job"""
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+
+    def submit(self, file_paths: List[str], namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a new ingestion job into a document namespace and return its record"""
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "files": [os.path.basename(p) for p in file_paths],
+            "file_paths": list(file_paths),
+            "namespace": namespace,
+            "created_at": str(datetime.now()),
+            "started_at": None,
+            "finished_at": None,
+            "results": {},
+            "stats": {},
+            "timings": {},
+            "progress": None,
+            "error": None,
+        }
+        with self._transaction():
+            self._conn.execute(
+                "INSERT INTO ingest_jobs (job_id, status, created_at, job) VALUES (?, ?, ?, ?)",
+                (job_id, job["status"], job["created_at"], json.dumps(job))
+            )
+            self._prune_finished_jobs()
+        self._wakeup.set()
+        return dict(job)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of a job record"""
+        with self._lock:
+            row = self._conn.execute("SELECT job FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Live progress of a job running here, else the progress last saved by the process running it"""
+        progress = self._progress.get(job_id)
+        if progress is not None:
+            return progress.snapshot()
+        job = self.get_job(job_id)
+        return job.get("progress") if job else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the most recent jobs, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job FROM ingest_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _prune_finished_jobs(self):
+        """Keep the newest max_finished_jobs finished jobs (caller holds a transaction)"""
+        self._conn.execute(
+            "DELETE FROM ingest_jobs WHERE job_id IN ("
+            "SELECT job_id FROM ingest_jobs WHERE status IN ('completed', 'failed') "
+            "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (self.max_finished_jobs,)
+        )
+
+    def _update_job(self, job_id: str, **fields):
+        with self._transaction():
+            row = self._conn.execute("SELECT job FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            job = {**json.loads(row[0]), **fields}
+            self._conn.execute(
+                "UPDATE ingest_jobs SET status = ?, job = ?, heartbeat_at = ? WHERE job_id = ?",
+                (job["status"], json.dumps(job), time.time(), job_id)
+            )
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job, first re-queueing jobs whose process stopped heartbeating"""
+        now = time.time()
+        with self._transaction():
+            stale = self._conn.execute(
+                "SELECT job_id, job FROM ingest_jobs WHERE status = 'running' AND heartbeat_at < ?",
+                (now - self.stale_seconds,)
+            ).fetchall()
+            for job_id, data in stale:
+                print(f"Re-queueing unfinished ingest job {job_id}")
+                job = {**json.loads(data), "status": "queued", "started_at": None}
+                self._conn.execute(
+                    "UPDATE ingest_jobs SET status = 'queued', owner = NULL, job = ? WHERE job_id = ?",
+                    (json.dumps(job), job_id)
+                )
+            row = self._conn.execute(
+                "SELECT job_id, job FROM ingest_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            job = {**json.loads(row[1]), "status": "running", "started_at": str(datetime.now())}
+            self._conn.execute(
+                "UPDATE ingest_jobs SET status = 'running', owner = ?, heartbeat_at = ?, job = ? "
+                "WHERE job_id = ? AND status = 'queued'",
+                (self.owner, now, json.dumps(job), row[0])
+            )
+        return job
+
+    def _heartbeat_loop(self):
+        """Mark this process's jobs alive and save their progress so other processes can report it"""
+        while not self._stopping.wait(self.heartbeat_seconds):
+            for job_id, progress in list(self._progress.items()):
+                try:
+                    with self._transaction():
+                        row = self._conn.execute(
+                            "SELECT job FROM ingest_jobs WHERE job_id = ? AND owner = ?", (job_id, self.owner)
+                        ).fetchone()
+                        if row is not None:
+                            job = {**json.loads(row[0]), "progress": progress.snapshot()}
+                            self._conn.execute(
+                                "UPDATE ingest_jobs SET heartbeat_at = ?, job = ? WHERE job_id = ?",
+                                (time.time(), json.dumps(job), job_id)
+                            )
+                except Exception as e:
+                    print(f"Error saving progress of ingest job {job_id}: {e}")
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                print(f"Error claiming an ingest job: {e}")
+                job = None
+            if job is None:
+                # Jobs submitted to other processes are found by polling
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+                continue
+            self._run_job(job)
+
+    def _run_job(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+        print(f"Processing ingest job {job_id}: {job['files']}")
+        started_at = datetime.fromisoformat(job["started_at"])
+        queued_seconds = round((started_at - datetime.fromisoformat(job["created_at"])).total_seconds(), 3)
+        started = time.perf_counter()
+        # Progress is kept in memory while the job runs, saved by the heartbeat and with the finished job
+        progress = self._progress[job_id] = IngestProgress()
+        try:
+            result = self.process_fn(job["file_paths"], progress=progress.add, namespace=job.get("namespace"))
+            status = "completed" if result.get("success") else "failed"
+            self._update_job(
+                job_id,
+                status=status,
+                finished_at=str(datetime.now()),
+                progress=progress.snapshot(),
+                results=result.get("files", {}),
+                stats={k: v for k, v in result.items() if k not in ("success", "files", "timings", "error")},
+                timings={
+                    "queued_seconds": queued_seconds,
+                    "processing_seconds": round(time.perf_counter() - started, 3),
+                    **result.get("timings", {}),
+                },
+                error=result.get("error"),
+            )
+            print(f"Ingest job {job_id} {status}")
+        except Exception as e:
+            print(f"Error in ingest job {job_id}: {e}")
+            self._update_job(
+                job_id,
+                status="failed",
+                finished_at=str(datetime.now()),
+                progress=progress.snapshot(),
+                timings={"queued_seconds": queued_seconds, "processing_seconds": round(time.perf_counter() - started, 3)},
+                error=str(e),
+            )
+        finally:
+            self._progress.pop(job_id, None)
@@ -0,0 +1,64 @@
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class LazyComponent:
+    """A service dependency that is built on first use.
+
+    Loading happens at most once at a time; its status, load time and any error
+    are recorded for the readiness probe. A failed load is retried on the next use.
+    """
+
+    def __init__(self, name: str, builder: Callable[[], Any]):
+        self.name = name
+        self._builder = builder
+        self._value = None
+        self._state = "pending"
+        self._load_seconds: Optional[float] = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._state == "ready"
+
+    def get(self) -> Any:
+        """Return the component, building it first if needed"""
+        if self._state == "ready":
+            return self._value
+        with self._lock:
+            if self._state != "ready":
+                self._state = "loading"
+                started = time.perf_counter()
+                try:
+                    value = self._builder()
+                except Exception as e:
+                    self._state = "failed"
+                    self._error = str(e)
+                    self._load_seconds = round(time.perf_counter() - started, 3)
+                    raise
+                self._value = value
+                self._error = None
+                self._load_seconds = round(time.perf_counter() - started, 3)
+                self._state = "ready"
+        return self._value
+
+    def set(self, value: Any) -> Any:
+        """Replace the component with one built elsewhere; returns the previous value"""
+        with self._lock:
+            previous, self._value = self._value, value
+            self._state = "ready"
+            return previous
+
+    def reset(self) -> Any:
+        """Forget the component so it is built again on next use; returns the previous value"""
+        with self._lock:
+            value, self._value = self._value, None
+            self._state = "pending"
+            self._load_seconds = None
+            self._error = None
+            return value
+
+    def status(self) -> Dict[str, Any]:
+        return {"status": self._state, "load_seconds": self._load_seconds, "error": self._error}
@@ -0,0 +1,23 @@
+from typing import Dict, Any
+
+# Key terms that indicate important lease information
+KEY_TERMS = [
+    'rent', 'monthly payment', 'installment payment', 'total rent',
+    'start date', 'end date', 'lease term', 'duration',
+    'tenant', 'landlord', 'property address', 'premises',
+    'security deposit', 'utilities', 'parking'
+]
+
+
+def key_term_features(text: str) -> Dict[str, Any]:
+    """Presence of each key term as a bitmask (bit i = KEY_TERMS[i]) plus the number of terms present.
+
+    Computed once per chunk at ingest and stored in the chunk metadata, so reranking
+    never has to rescan chunk text.
+    """
+    content = text.lower()
+    mask = 0
+    for bit, term in enumerate(KEY_TERMS):
+        if term in content:
+            mask |= 1 << bit
+    return {"key_terms": mask, "key_term_count": bin(mask).count("1")}
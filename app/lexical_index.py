@@ -0,0 +1,118 @@
+import re
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+# Keeps dollar amounts ("$1,250.00"), clause numbers ("4.2") and dates ("01/05/2024") as single tokens
+TOKEN_PATTERN = re.compile(r"\$?\d+(?:[.,/-]\d+)*%?|[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """In-process BM25 inverted index over chunk text, maintained incrementally.
+
+    Chunks are keyed by their vector store id so results can be fused with
+    similarity search results.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_lengths: Dict[str, int] = {}
+        self._docs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._ids_by_source: Dict[str, set] = defaultdict(set)
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc_id: str, text: str, metadata: Dict[str, Any]):
+        """Index a chunk, replacing any previous chunk with the same id"""
+        tokens = tokenize(text)
+        with self._lock:
+            if doc_id in self._docs:
+                self._remove(doc_id)
+            for term, tf in Counter(tokens).items():
+                self._postings[term][doc_id] = tf
+            self._doc_lengths[doc_id] = len(tokens)
+            self._total_length += len(tokens)
+            self._docs[doc_id] = (text, dict(metadata))
+            self._ids_by_source[metadata.get("source")].add(doc_id)
+
+    def add_many(self, items: Iterable[Tuple[str, str, Dict[str, Any]]]):
+        for doc_id, text, metadata in items:
+            self.add(doc_id, text, metadata)
+
+    def remove_ids(self, doc_ids: Iterable[str]):
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id in self._docs:
+                    self._remove(doc_id)
+
+    def remove_source(self, source: str):
+        with self._lock:
+            for doc_id in list(self._ids_by_source.get(source, ())):
+                self._remove(doc_id)
+            self._ids_by_source.pop(source, None)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_lengths.clear()
+            self._docs.clear()
+            self._ids_by_source.clear()
+            self._total_length = 0
+
+    def _remove(self, doc_id: str):
+        text, metadata = self._docs.pop(doc_id)
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id, 0)
+        self._ids_by_source[metadata.get("source")].discard(doc_id)
+
+    def get(self, doc_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            return self._docs.get(doc_id)
+
+    def term_presence(self, doc_ids: List[str], terms: Iterable[str]) -> List[int]:
+        """For each doc id, how many of the given terms occur in it"""
+        terms = set(terms)
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            return [sum(1 for p in postings if doc_id in p) for doc_id in doc_ids]
+
+    def search(self, query: str, k: int, sources: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Return the top k (doc_id, score) pairs, optionally restricted to some sources"""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._docs)
+            if not terms or n_docs == 0:
+                return []
+            allowed = None
+            if sources is not None:
+                allowed = set()
+                for source in sources:
+                    allowed |= self._ids_by_source.get(source, set())
+            avg_length = self._total_length / n_docs or 1.0
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
@@ -0,0 +1,140 @@
+import os
+import re
+import time
+import asyncio
+from typing import List, Iterator, AsyncIterator, Optional, Tuple
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+# LLM backends are chat models exposing invoke/stream/ainvoke/astream; select one with LLM_PROVIDER.
+
+
+def _build_gemini():
+    import google.generativeai as genai
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    # Configure Gemini API
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY environment variable is required")
+
+    genai.configure(api_key=api_key)
+
+    # Initialize LLM with improved configuration for better responses
+    return ChatGoogleGenerativeAI(
+        model="models/gemini-1.5-pro-latest",
+        temperature=0.3,  # Lower temperature for more consistent, factual responses
+        max_output_tokens=4096,  # Increased for more comprehensive responses
+        google_api_key=api_key,
+        top_p=0.9,  # Better response diversity while maintaining quality
+        top_k=40,  # Improved token selection
+    )
+
+
+def _build_stub():
+    return StubChatModel(
+        latency_ms=float(os.getenv("STUB_LLM_LATENCY_MS", "0")),
+        tokens_per_second=float(os.getenv("STUB_LLM_TOKENS_PER_SEC", "0")),
+    )
+
+
+LLM_PROVIDERS = {
+    "gemini": _build_gemini,
+    "stub": _build_stub,
+}
+
+
+def build_llm(provider: Optional[str] = None):
+    """Build the configured LLM backend"""
+    provider = (provider or os.getenv("LLM_PROVIDER", "gemini")).lower()
+    if provider not in LLM_PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER '{provider}'. Choose one of: {', '.join(LLM_PROVIDERS)}")
+    print(f"Using LLM provider: {provider}")
+    return LLM_PROVIDERS[provider]()
+
+
+class StubChatModel:
+    """Offline, deterministic stand-in for the Gemini chat model.
+
+    Answers are built from the document excerpts in the prompt, so they carry real
+    (Source: file:page) citations and go through the same post-processing as model
+    output. latency_ms is the time to first token and tokens_per_second paces the
+    rest of the answer (0 disables either delay).
+    """
+
+    EXCERPT_HEADER = re.compile(r"^Document: (.+?) \(Page: ([^)]*)\)$", re.MULTILINE)
+
+    def __init__(self, latency_ms: float = 0, tokens_per_second: float = 0):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+
+    def _excerpts(self, prompt: str) -> List[Tuple[str, str, str]]:
+        excerpts_section = prompt.split("## DOCUMENT EXCERPTS:", 1)[-1]
+        headers = list(self.EXCERPT_HEADER.finditer(excerpts_section))
+        excerpts = []
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(excerpts_section)
+            text = " ".join(excerpts_section[header.end():end].split())
+            sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0][:200]
+            excerpts.append((header.group(1), header.group(2), sentence))
+        return excerpts
+
+    def _answer(self, prompt: str) -> str:
+        question_match = re.search(r"## QUESTION:\s*(.+?)\s*## DOCUMENT EXCERPTS:", prompt, re.DOTALL)
+        question = question_match.group(1).strip() if question_match else "the question"
+        excerpts = self._excerpts(prompt)
+        if not excerpts:
+            return "## SUMMARY\n\nThe provided excerpts do not contain information to answer this question."
+
+        def cite(source: str, page: str) -> str:
+            return f"(Source: {source}:{page})" if page.isdigit() else f"(Source: {source})"
+
+        lines = [
+            "## SUMMARY",
+            "",
+            f"This answer to \"{question}\" is based on {len(excerpts)} excerpt(s). {cite(*excerpts[0][:2])}",
+            "",
+            "## KEY FINDINGS",
+            "",
+        ]
+        lines += [f"* {sentence} {cite(source, page)}" for source, page, sentence in excerpts[:5]]
+        lines += ["", "## RELEVANT PROVISIONS", ""]
+        lines += [f"> {sentence} {cite(source, page)}" for source, page, sentence in excerpts[:3]]
+        lines += ["", "## IMPLICATIONS", "", f"The tenant and landlord must comply with these provisions. {cite(*excerpts[0][:2])}"]
+        return "\n".join(lines)
+
+    def _tokens(self, text: str) -> List[str]:
+        return re.findall(r"\S+\s*|\s+", text)
+
+    def invoke(self, prompt: str, **kwargs) -> AIMessage:
+        answer = self._answer(prompt)
+        delay = self.latency_ms / 1000
+        if self.tokens_per_second:
+            delay += len(self._tokens(answer)) / self.tokens_per_second
+        if delay:
+            time.sleep(delay)
+        return AIMessage(content=answer)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[AIMessageChunk]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        for token in self._tokens(self._answer(prompt)):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield AIMessageChunk(content=token)
+
+    async def ainvoke(self, prompt: str, **kwargs) -> AIMessage:
+        answer = self._answer(prompt)
+        delay = self.latency_ms / 1000
+        if self.tokens_per_second:
+            delay += len(self._tokens(answer)) / self.tokens_per_second
+        if delay:
+            await asyncio.sleep(delay)
+        return AIMessage(content=answer)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        for token in self._tokens(self._answer(prompt)):
+            if self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield AIMessageChunk(content=token)
@@ -1,10 +1,20 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Path
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Path, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from pydantic import BaseModel
 import shutil
 import os
 import json
-from .ai_service import ai_service
+import asyncio
+import threading
+from typing import Optional
+from .ai_service import ai_service, DEFAULT_TOP_K
+from .concurrency import ServiceBusyError
+from .pdf_extractors import PDFRejectedError
+from .document_registry import document_key, validate_namespace
+from .metrics import render_metrics
+from .ingest_jobs import IngestJobQueue
 
 app = FastAPI()
 
@@ -17,100 +27,289 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Background ingestion workers
+# Jobs are kept in the registry database so every server process sees them and each runs once
+ingest_queue = IngestJobQueue(
+    ai_service.ingest_documents,
+    db_path=ai_service.registry.db_path,
+    num_workers=int(os.getenv("INGEST_WORKERS", "2")),
+)
+
+# How often the ingest progress stream checks for new counts
+INGEST_PROGRESS_INTERVAL = float(os.getenv("INGEST_PROGRESS_INTERVAL", "0.5"))
+
+@app.on_event("startup")
+async def start_ingest_workers():
+    ingest_queue.start()
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Load models and indexes in the background so the server binds immediately
+    if os.getenv("WARM_UP_ON_STARTUP", "true").lower() in ("1", "true", "yes"):
+        threading.Thread(target=ai_service.warm_up, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_ingest_workers():
+    ingest_queue.stop()
+    ai_service.parse_pool.shutdown()
+    ai_service.retrieval_limiter.shutdown()
+    ai_service.llm_limiter.shutdown()
+
+def _check_namespace(namespace: Optional[str]) -> str:
+    try:
+        return validate_namespace(namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/ingest")
-async def ingest_pdf(files: list[UploadFile] = File(...)):
+async def ingest_pdf(files: list[UploadFile] = File(...), namespace: Optional[str] = Form(None)):
     try:
+        # Documents are stored in the vector shard of their namespace (tenant, matter or folder)
+        namespace = _check_namespace(namespace)
+        
         # Create a directory for uploads if it doesn't exist
         uploads_dir = "uploads"
         os.makedirs(uploads_dir, exist_ok=True)
         
         saved_files = []
+        rejected = {}
         for file in files:
-            file_path = os.path.join(uploads_dir, file.filename)
+            # Each namespace has its own uploads, so the same filename can exist in several
+            file_path = os.path.join(uploads_dir, document_key(namespace, file.filename))
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
             
             print(f"Saving file to: {file_path}")
-            with open(file_path, "wb") as buffer:
+            # Check the upload before it replaces an earlier version of the file
+            partial_path = f"{file_path}.part"
+            with open(partial_path, "wb") as buffer:
                 shutil.copyfileobj(file.file, buffer)
+            try:
+                # Off the event loop: the check runs in a parse worker and may wait on its time budget
+                await run_in_threadpool(ai_service.preflight, partial_path)
+            except PDFRejectedError as e:
+                os.remove(partial_path)
+                rejected[file.filename] = str(e)
+                print(f"Rejected {file.filename}: {e}")
+                continue
+            os.replace(partial_path, file_path)
             
             saved_files.append(file.filename)
             print(f"File {file.filename} saved successfully.")
         
-        # Process PDFs with AI service
-        file_paths = [os.path.join(uploads_dir, filename) for filename in saved_files]
-        print(f"Processing files: {file_paths}")
+        if not saved_files:
+            raise HTTPException(status_code=422, detail={"message": "No usable PDFs were uploaded", "rejected": rejected})
         
-        try:
-            success = ai_service.add_documents(file_paths)
-            print(f"AI service processing result: {success}")
-            
-            if success:
-                return {"filenames": saved_files, "message": f"{len(saved_files)} file(s) ingested and processed successfully."}
-            else:
-                return {"filenames": saved_files, "message": f"{len(saved_files)} file(s) saved but processing failed."}
-        except Exception as e:
-            print(f"Error in AI service processing: {e}")
-            return {"filenames": saved_files, "message": f"{len(saved_files)} file(s) saved but processing failed: {str(e)}"}
+        # Queue PDFs for processing by the background workers
+        file_paths = [os.path.join(uploads_dir, document_key(namespace, filename)) for filename in saved_files]
+        job = ingest_queue.submit(file_paths, namespace=namespace)
+        print(f"Queued ingest job {job['job_id']} for files: {file_paths}")
+        
+        return {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "filenames": saved_files,
+            "namespace": namespace,
+            "rejected": rejected,
+            "message": f"{len(saved_files)} file(s) saved and queued for processing."
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"An error occurred: {e}")
         return {"error": str(e)}
 
+@app.get("/ingest/jobs")
+async def list_ingest_jobs(limit: int = 50):
+    """Get the most recent ingestion jobs"""
+    return {"jobs": [_public_job(job) for job in ingest_queue.list_jobs(limit)]}
+
+@app.get("/ingest/jobs/{job_id}")
+async def get_ingest_job(job_id: str = Path(...)):
+    """Get status, per-file results and timings of an ingestion job"""
+    job = ingest_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingest job {job_id} not found")
+    return _public_job(job)
+
+@app.get("/ingest/jobs/{job_id}/events")
+async def stream_ingest_job(job_id: str = Path(...)):
+    """Stream job progress as Server-Sent Events: progress updates, then the finished job"""
+    if ingest_queue.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Ingest job {job_id} not found")
+
+    async def event_stream():
+        last_seen = None
+        while True:
+            job = ingest_queue.get_job(job_id)
+            if job is None:
+                return
+            progress = ingest_queue.get_progress(job_id)
+            state = (job["status"], progress and progress["seq"])
+            if state != last_seen:
+                last_seen = state
+                yield f"event: progress\ndata: {json.dumps({'status': job['status'], 'progress': progress})}\n\n"
+            if job["status"] in ("completed", "failed"):
+                yield f"event: done\ndata: {json.dumps(_public_job(job))}\n\n"
+                return
+            await asyncio.sleep(INGEST_PROGRESS_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _public_job(job: dict) -> dict:
+    # Server-side paths are an implementation detail of the worker
+    public = {k: v for k, v in job.items() if k != "file_paths"}
+    if job["status"] == "running":
+        public["progress"] = ingest_queue.get_progress(job["job_id"])
+    return public
+
+ASK_REQUEST_TIMEOUT = float(os.getenv("ASK_REQUEST_TIMEOUT", "120"))
+
 class AskRequest(BaseModel):
     question: str
-    top_k: int = 5
+    top_k: int = DEFAULT_TOP_K
     selected_documents: list[str] = None
+    # Namespace of the selected documents
+    namespace: Optional[str] = None
 
 @app.post("/ask")
 async def ask_question(request: AskRequest):
+    namespace = _check_namespace(request.namespace)
     try:
-        # Use AI service to get answer
-        result = ai_service.ask_question(request.question, request.top_k, request.selected_documents)
+        # Use AI service to get answer without blocking the event loop
+        result = await asyncio.wait_for(
+            ai_service.aask_question(request.question, request.top_k, request.selected_documents, namespace),
+            timeout=ASK_REQUEST_TIMEOUT
+        )
         return result
+    except ServiceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Question timed out after {ASK_REQUEST_TIMEOUT}s")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ask/stream")
+async def ask_question_stream(request: AskRequest):
+    """Stream the answer as Server-Sent Events: citations, answer tokens, then the final result"""
+    namespace = _check_namespace(request.namespace)
+    
+    async def event_stream():
+        async for event in ai_service.aask_question_stream(
+            request.question, request.top_k, request.selected_documents, namespace
+        ):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "50"))
+
+class AskBatchRequest(BaseModel):
+    questions: list[str]
+    top_k: int = DEFAULT_TOP_K
+    selected_documents: list[str] = None
+    namespace: Optional[str] = None
+
+@app.post("/ask/batch")
+async def ask_questions_batch(request: AskBatchRequest):
+    """Answer several questions as Server-Sent Events: a result per question as it completes, then done"""
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="questions must not be empty")
+    if len(request.questions) > ASK_BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {ASK_BATCH_MAX_QUESTIONS} questions per batch")
+    namespace = _check_namespace(request.namespace)
+    
+    async def event_stream():
+        async for event in ai_service.aask_questions_batch(
+            request.questions, request.top_k, request.selected_documents, namespace
+        ):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Legal Researcher AI backend!"}
 
 @app.get("/health")
 async def health_check():
-    print("Health check requested")
-    response = {"status": "up"}
-    print(f"Health check response: {response}")
-    return response
+    return {"status": "up"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness of each service component, with load times; 503 until all are loaded"""
+    readiness = ai_service.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for ingest and ask stages"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+class ReindexRequest(BaseModel):
+    embedding_model: Optional[str] = None
+    chunk_size: Optional[int] = None
+    chunk_overlap: Optional[int] = None
+
+@app.get("/index")
+async def get_index():
+    """Active and configured embedding/chunking settings and reindex progress"""
+    return ai_service.index_status()
+
+@app.post("/reindex", status_code=202)
+async def reindex(request: ReindexRequest = None):
+    """Rebuild the index in the background with new settings; queries use the old index until the swap"""
+    request = request or ReindexRequest()
+    try:
+        return ai_service.start_reindex(request.embedding_model, request.chunk_size, request.chunk_overlap)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 @app.get("/documents")
-async def get_documents():
-    """Get list of uploaded documents"""
+async def get_documents(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    q: Optional[str] = None,
+    namespace: Optional[str] = None
+):
+    """Get a page of uploaded documents, optionally filtered by filename and namespace"""
     try:
-        documents = ai_service.get_documents()
-        return {"documents": documents}
+        result = ai_service.get_documents(offset=offset, limit=limit, query=q, namespace=namespace)
+        return {**result, "offset": offset, "limit": limit}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/documents/{filename}")
-async def delete_document(filename: str = Path(...)):
+async def delete_document(filename: str = Path(...), namespace: Optional[str] = None):
+    namespace = _check_namespace(namespace)
     try:
         # Remove file from uploads
         uploads_dir = "uploads"
-        file_path = os.path.join(uploads_dir, filename)
+        file_path = os.path.join(uploads_dir, document_key(namespace, filename))
         if os.path.exists(file_path):
             os.remove(file_path)
-        # Remove from ai_service.documents
-        ai_service.documents = [doc for doc in ai_service.documents if doc["filename"] != filename]
-        ai_service.save_documents()
-        # Remove from vector store (if possible)
-        if ai_service.vector_store:
-            try:
-                ai_service.vector_store._collection.delete(where={"source": filename})
-            except Exception as e:
-                print(f"Warning: Could not remove from vector store: {e}")
+        # Off the event loop: removal waits for any ingest of the same file and for the write lock
+        await run_in_threadpool(ai_service.remove_document, filename, namespace)
         return {"success": True, "message": f"Document {filename} deleted."}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 @app.get("/debug-retrieval")
-async def debug_retrieval(question: str, top_k: int = 5):
+async def debug_retrieval(question: str, top_k: int = DEFAULT_TOP_K):
     """Debug endpoint to see what documents are being retrieved for a question"""
     try:
         debug_info = ai_service.debug_retrieval(question, top_k)
@@ -0,0 +1,30 @@
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Stage latencies are recorded in seconds; buckets span fast lookups up to long LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+INGEST_STAGE_SECONDS = Histogram(
+    "documind_ingest_stage_seconds", "Time spent in each ingest stage",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+ASK_STAGE_SECONDS = Histogram(
+    "documind_ask_stage_seconds", "Time spent in each stage of answering a question",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+INGESTED_PAGES = Counter("documind_ingested_pages_total", "Pages parsed during ingest")
+INGESTED_CHUNKS = Counter("documind_ingested_chunks_total", "Chunks embedded and upserted during ingest")
+LLM_TOKENS = Counter("documind_llm_tokens_total", "Estimated tokens sent to and received from the LLM", ["kind"])
+ANSWER_CACHE_LOOKUPS = Counter("documind_answer_cache_lookups_total", "Answer cache lookups", ["result"])
+ERRORS = Counter("documind_errors_total", "Errors by operation", ["operation"])
+RERANK_OUTCOMES = Counter("documind_rerank_total", "Cross-encoder rerank calls by outcome", ["result"])
+RERANK_PAIRS = Counter("documind_rerank_pairs_total", "Question/chunk pairs reranked, by score source", ["source"])
+
+
+def observe_ask_stage(stage: str):
+    """Context manager timing one stage of the ask pipeline"""
+    return ASK_STAGE_SECONDS.labels(stage=stage).time()
+
+
+def render_metrics():
+    """Metrics in Prometheus text exposition format, with its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,87 @@
+import os
+import mmap
+import zlib
+import uuid
+import struct
+from typing import Iterator, List, Optional
+
+# Artifact layout: each page's text compressed on its own, followed by a footer of
+# (page_count + 1) uint64 offsets, the uint32 page count and the magic bytes.
+# Pages can then be read individually from a memory map without decompressing the rest.
+MAGIC = b"DMPAGES1"
+_COUNT = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+
+class PageArtifactWriter:
+    """Writes a page artifact one page at a time; the file only appears once close() succeeds"""
+
+    def __init__(self, path: str, compression_level: int = 6):
+        self.path = path
+        self.compression_level = compression_level
+        self._tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._offsets: List[int] = [0]
+
+    def add(self, text: str):
+        data = zlib.compress(text.encode("utf-8"), self.compression_level)
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def close(self):
+        for offset in self._offsets:
+            self._file.write(_OFFSET.pack(offset))
+        self._file.write(_COUNT.pack(len(self._offsets) - 1))
+        self._file.write(MAGIC)
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+def read_pages(path: str) -> Iterator[str]:
+    """Yield the text of each page of an artifact, decompressing one page at a time"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            footer = len(mm) - len(MAGIC) - _COUNT.size
+            if footer < 0 or mm[footer + _COUNT.size:] != MAGIC:
+                raise ValueError(f"{path} is not a page artifact")
+            (page_count,) = _COUNT.unpack_from(mm, footer)
+            table = footer - (page_count + 1) * _OFFSET.size
+            offsets = [_OFFSET.unpack_from(mm, table + i * _OFFSET.size)[0] for i in range(page_count + 1)]
+            for start, end in zip(offsets, offsets[1:]):
+                yield zlib.decompress(mm[start:end]).decode("utf-8")
+
+
+class PageStore:
+    """Parsed page text of each upload, stored once per content hash.
+
+    Extraction is the slowest step of ingest, so its output is kept and every later
+    split, re-chunk or reindex of the same content reads the artifact instead of the PDF.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def path(self, content_hash: str) -> str:
+        return os.path.join(self.root_dir, f"{content_hash}.pages")
+
+    def has(self, content_hash: str) -> bool:
+        return os.path.exists(self.path(content_hash))
+
+    def pages(self, content_hash: str) -> Iterator[str]:
+        return read_pages(self.path(content_hash))
+
+    def remove(self, content_hash: Optional[str]):
+        if not content_hash:
+            return
+        try:
+            os.remove(self.path(content_hash))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,208 @@
+import os
+import time
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# PDF text extraction backends, selected with PDF_EXTRACTOR. Each extractor offers a
+# preflight that only reads the document structure and an iterator over page text.
+# Kept free of service-level imports; extraction runs in the parse worker processes.
+
+# Pages sampled by the preflight when looking for fonts (text) in a document
+PREFLIGHT_SAMPLE_PAGES = 50
+
+
+class PDFRejectedError(Exception):
+    """The upload cannot be processed (encrypted, image-only, too large, unreadable...)"""
+
+
+class ExtractionTimeoutError(Exception):
+    """Extraction of a page or document ran past its time budget"""
+
+
+def _sample(count: int, limit: int = PREFLIGHT_SAMPLE_PAGES):
+    """Evenly spread page numbers, always including the first and the last page"""
+    if count <= limit:
+        return range(count)
+    step = (count - 1) / (limit - 1)
+    return sorted({round(i * step) for i in range(limit)})
+
+
+class PypdfExtractor:
+    """Pure-Python extraction with pypdf (the default; same text as PyPDFLoader)"""
+
+    name = "pypdf"
+
+    def _open(self, path: str):
+        from pypdf import PdfReader
+
+        reader = PdfReader(path)
+        # Many "encrypted" PDFs only restrict editing and open with an empty password
+        if reader.is_encrypted and not reader.decrypt(""):
+            raise PDFRejectedError("PDF is password protected")
+        return reader
+
+    def _page_has_fonts(self, page) -> bool:
+        resources = page.get("/Resources")
+        if resources is None:
+            return False
+        resources = resources.get_object()
+        if resources.get("/Font"):
+            return True
+        # Text drawn inside form XObjects has its fonts there
+        for xobject in (resources.get("/XObject") or {}).values():
+            xobject = xobject.get_object()
+            if xobject.get("/Subtype") == "/Form" and (xobject.get("/Resources") or {}).get("/Font"):
+                return True
+        return False
+
+    def preflight(self, path: str) -> Dict[str, Any]:
+        reader = self._open(path)
+        pages = len(reader.pages)
+        return {
+            "pages": pages,
+            "encrypted": reader.is_encrypted,
+            "has_text": any(self._page_has_fonts(reader.pages[i]) for i in _sample(pages)),
+        }
+
+    def iter_pages(self, path: str) -> Iterator[str]:
+        for page in self._open(path).pages:
+            yield page.extract_text()
+
+
+class PyMuPDFExtractor:
+    """Extraction with PyMuPDF (MuPDF's native parser); several times faster than pypdf"""
+
+    name = "pymupdf"
+
+    def __init__(self):
+        import fitz  # noqa: F401  (fail at selection time if pymupdf is not installed)
+
+    def _open(self, path: str):
+        import fitz
+
+        document = fitz.open(path)
+        if document.needs_pass and not document.authenticate(""):
+            document.close()
+            raise PDFRejectedError("PDF is password protected")
+        return document
+
+    def preflight(self, path: str) -> Dict[str, Any]:
+        with self._open(path) as document:
+            pages = document.page_count
+            return {
+                "pages": pages,
+                "encrypted": document.is_encrypted or document.needs_pass,
+                "has_text": any(document.get_page_fonts(i) for i in _sample(pages)),
+            }
+
+    def iter_pages(self, path: str) -> Iterator[str]:
+        with self._open(path) as document:
+            for page in document:
+                yield page.get_text("text")
+
+
+PDF_EXTRACTORS = {
+    "pypdf": PypdfExtractor,
+    "pymupdf": PyMuPDFExtractor,
+}
+
+_extractors: Dict[str, Any] = {}
+
+
+def get_extractor(name: Optional[str] = None):
+    """The named (or PDF_EXTRACTOR) extractor; falls back to pypdf if its package is missing"""
+    name = (name or os.getenv("PDF_EXTRACTOR", "pypdf")).lower()
+    if name not in PDF_EXTRACTORS:
+        raise ValueError(f"Unknown PDF_EXTRACTOR '{name}'. Choose one of: {', '.join(PDF_EXTRACTORS)}")
+    if name not in _extractors:
+        try:
+            _extractors[name] = PDF_EXTRACTORS[name]()
+        except ImportError as e:
+            print(f"Warning: PDF extractor '{name}' is unavailable ({e}); using pypdf")
+            _extractors[name] = get_extractor("pypdf")
+    return _extractors[name]
+
+
+def extraction_config(extractor: Optional[str] = None) -> Dict[str, Any]:
+    """Extractor and time budgets for parsing, from the environment"""
+    return {
+        "extractor": get_extractor(extractor).name,
+        "page_timeout": float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "30")),
+        "document_timeout": float(os.getenv("PDF_DOCUMENT_TIMEOUT_SECONDS", "600")),
+        "preflight_timeout": float(os.getenv("PDF_PREFLIGHT_TIMEOUT_SECONDS", "30")),
+        "max_pages": int(os.getenv("PDF_MAX_PAGES", "0")),
+    }
+
+
+def preflight(path: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Check an upload without extracting any text.
+
+    Returns {pages, encrypted, has_text, seconds}; raises PDFRejectedError for files
+    that would fail or could not produce any chunks.
+    """
+    started = time.perf_counter()
+    try:
+        result = get_extractor(config["extractor"]).preflight(path)
+    except PDFRejectedError:
+        raise
+    except Exception as e:
+        raise PDFRejectedError(f"Not a readable PDF: {e}")
+    if result["pages"] == 0:
+        raise PDFRejectedError("PDF has no pages")
+    if config.get("max_pages") and result["pages"] > config["max_pages"]:
+        raise PDFRejectedError(f"PDF has {result['pages']} pages; the limit is {config['max_pages']}")
+    if not result["has_text"]:
+        raise PDFRejectedError("PDF has no text layer (scanned or image-only); run OCR on it first")
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeoutError()
+
+
+@contextmanager
+def _time_limit(seconds: float):
+    """Interrupt the enclosed code after `seconds` (main thread only; a no-op elsewhere)"""
+    if seconds <= 0 or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def extract_pages(path: str, config: Dict[str, Any]) -> Iterator[str]:
+    """Page text of a PDF, enforcing the per-page and per-document time budgets.
+
+    In a parse worker process the running page is interrupted when a budget runs out.
+    Elsewhere (inline parsing on a thread) the budgets are checked after each page.
+    """
+    page_timeout, document_timeout = config["page_timeout"], config["document_timeout"]
+    pages = get_extractor(config["extractor"]).iter_pages(path)
+    deadline = time.monotonic() + document_timeout if document_timeout > 0 else None
+    page_number = 0
+    while True:
+        started = time.monotonic()
+        budget = page_timeout if page_timeout > 0 else float("inf")
+        if deadline is not None:
+            budget = min(budget, deadline - started)
+            if budget <= 0:
+                raise ExtractionTimeoutError(f"Extraction took longer than {document_timeout:g}s")
+        try:
+            with _time_limit(budget if budget != float("inf") else 0):
+                text = next(pages, None)
+        except ExtractionTimeoutError:
+            raise ExtractionTimeoutError(f"Page {page_number + 1} took longer than {budget:.3g}s to extract")
+        if text is None:
+            return
+        if time.monotonic() - started > budget:
+            raise ExtractionTimeoutError(f"Page {page_number + 1} took longer than {budget:.3g}s to extract")
+        yield text
+        page_number += 1
@@ -0,0 +1,344 @@
+import os
+import time
+import queue
+import signal
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from os.path import basename
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+from .lease_features import key_term_features
+from .pdf_extractors import PDFRejectedError, extract_pages, extraction_config, preflight
+from .page_store import PageArtifactWriter, read_pages
+
+# Kept free of service-level imports so that spawned worker processes start quickly
+# and never construct the global LegalAIService.
+
+_splitters: Dict[Tuple, RecursiveCharacterTextSplitter] = {}
+
+
+def _get_splitter(splitter_config: Dict[str, Any]) -> RecursiveCharacterTextSplitter:
+    key = (splitter_config["chunk_size"], splitter_config["chunk_overlap"], tuple(splitter_config["separators"]))
+    if key not in _splitters:
+        _splitters[key] = RecursiveCharacterTextSplitter(
+            chunk_size=splitter_config["chunk_size"],
+            chunk_overlap=splitter_config["chunk_overlap"],
+            length_function=len,
+            separators=splitter_config["separators"]
+        )
+    return _splitters[key]
+
+
+def hash_file(path: str) -> str:
+    """Hash the raw bytes of an upload"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_id(source: str, page: int, index: int) -> str:
+    """Stable id of the index-th chunk of a page, so unchanged pages keep their vector ids"""
+    return f"{source}::p{page}::c{index}"
+
+
+def chunk_source(chunk_id: str) -> str:
+    """Source of a chunk id made by chunk_id()"""
+    return chunk_id.rsplit("::", 2)[0]
+
+
+def split_page(text: str, page_number: int, source: str, splitter_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Split one page's text into chunks with stable ids and key-term features"""
+    page_doc = Document(page_content=text, metadata={"source": source, "page": page_number})
+    chunks = _get_splitter(splitter_config).split_documents([page_doc])
+    for index, chunk in enumerate(chunks):
+        # ensure consistent keys for filtering/citation
+        chunk.metadata["chunk_id"] = chunk_id(source, page_number, index)
+        chunk.metadata.update(key_term_features(chunk.page_content))
+    return {"page": page_number, "hash": hash_text(text), "chunks": chunks}
+
+
+def page_texts(path: str, artifact_path: Optional[str] = None,
+               extraction: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """Text of each page of a PDF, read from its page artifact when one exists.
+
+    Otherwise the PDF is extracted with the configured extractor and time budgets and,
+    given an artifact_path, the artifact is written along the way so the file never
+    has to be extracted again.
+    """
+    if artifact_path and os.path.exists(artifact_path):
+        yield from read_pages(artifact_path)
+        return
+    writer = PageArtifactWriter(artifact_path) if artifact_path else None
+    try:
+        for text in extract_pages(path, extraction or extraction_config()):
+            if writer:
+                writer.add(text)
+            yield text
+    except BaseException:
+        # Includes the consumer abandoning the generator; never leave a partial artifact
+        if writer:
+            writer.abort()
+        raise
+    if writer:
+        writer.close()
+
+
+def iter_pages(path: str, splitter_config: Dict[str, Any], artifact_path: Optional[str] = None,
+               extraction: Optional[Dict[str, Any]] = None, source: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Extract and split a PDF one page at a time.
+
+    Yields {page, hash, chunks, load_seconds, split_seconds} per page; only the
+    current page is held in memory. Chunks are attributed to `source`, by default
+    the file's name.
+    """
+    source = source or basename(path)
+    pages = page_texts(path, artifact_path, extraction)
+    page_number = 0
+    while True:
+        started = time.perf_counter()
+        text = next(pages, None)
+        if text is None:
+            return
+        loaded = time.perf_counter()
+        result = split_page(text, page_number, source, splitter_config)
+        result["load_seconds"] = loaded - started
+        result["split_seconds"] = time.perf_counter() - loaded
+        yield result
+        page_number += 1
+
+
+def _produce_pages(path: str, splitter_config: Dict[str, Any], artifact_path: Optional[str],
+                   extraction: Dict[str, Any], source: Optional[str], out_queue, cancel) -> None:
+    """Worker process side of PDFParsePool.iter_pages"""
+    out_queue.put(("started", os.getpid()))
+    try:
+        for page in iter_pages(path, splitter_config, artifact_path, extraction, source):
+            if cancel.is_set():
+                return
+            out_queue.put(("page", page))
+        out_queue.put(("done", None))
+    except Exception as e:
+        out_queue.put(("error", f"{type(e).__name__}: {e}"))
+
+
+def _preflight_in_worker(path: str, extraction: Dict[str, Any], pid_queue) -> Dict[str, Any]:
+    """Worker process side of PDFParsePool.preflight"""
+    pid_queue.put(os.getpid())
+    return preflight(path, extraction)
+
+
+class _WorkerLanes:
+    """A fixed number of single-process executors, each running one task at a time.
+
+    A task checks out a lane for its whole run, so killing a lane's process (a hung
+    parse or preflight) breaks only that lane, which is replaced on check-in; tasks
+    in the other lanes keep running.
+    """
+
+    def __init__(self, size: int, context):
+        self.size = size
+        self._context = context
+        self._idle: List[ProcessPoolExecutor] = []
+        self._busy = set()
+        self._retired = set()
+        self._available = threading.Condition()
+
+    def checkout(self) -> ProcessPoolExecutor:
+        """An idle lane, or a new one while fewer than `size` are busy; waits while all are busy"""
+        with self._available:
+            while not self._idle and len(self._busy) >= self.size:
+                self._available.wait()
+            # The worker process itself starts on the lane's first task
+            lane = self._idle.pop() if self._idle else ProcessPoolExecutor(max_workers=1, mp_context=self._context)
+            self._busy.add(lane)
+            return lane
+
+    def checkin(self, lane: ProcessPoolExecutor, broken: bool = False):
+        """Return a lane after its task; a broken lane is shut down and replaced on a later checkout"""
+        with self._available:
+            self._busy.discard(lane)
+            retire = broken or lane in self._retired
+            self._retired.discard(lane)
+            if not retire:
+                self._idle.append(lane)
+            self._available.notify()
+        if retire:
+            lane.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = False):
+        """Stop idle lanes now and busy ones once their task is checked in"""
+        with self._available:
+            lanes, self._idle = self._idle, []
+            self._retired |= self._busy
+        for lane in lanes:
+            lane.shutdown(wait=wait, cancel_futures=True)
+
+
+class PDFParsePool:
+    """Extracts and splits PDFs in worker processes, streaming pages back as they are parsed.
+
+    At most `prefetch` parsed pages per file wait in memory for the consumer, so
+    parsing overlaps embedding without holding whole documents. Workers enforce the
+    extraction time budgets themselves; a worker stuck in native code that sends
+    nothing for longer than its budgets allow is killed and replaced. Each file runs
+    in a worker of its own, so killing one never disturbs the other files. Preflights
+    run in separate `preflight_workers` so they never wait behind whole-document parses.
+    """
+
+    # Extra time a worker gets beyond its budgets before it is considered hung
+    HUNG_GRACE_SECONDS = 15
+
+    def __init__(self, splitter_config: Dict[str, Any], num_workers: Optional[int] = None, prefetch: int = 8,
+                 extraction: Optional[Dict[str, Any]] = None, preflight_workers: int = 1):
+        self.splitter_config = splitter_config
+        self.extraction = extraction or extraction_config()
+        self.num_workers = max(1, num_workers or os.cpu_count() or 1)
+        self.preflight_workers = max(0, preflight_workers)
+        self.prefetch = max(1, prefetch)
+        # spawn rather than fork: the parent runs ingest worker threads
+        context = multiprocessing.get_context("spawn")
+        self._parse_lanes = _WorkerLanes(self.num_workers, context)
+        self._preflight_lanes = _WorkerLanes(self.preflight_workers, context)
+        self._context = context
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def _get_manager(self):
+        """Shared process that hosts the page queues and cancel events; one for the life of the pool"""
+        with self._lock:
+            if self._manager is None:
+                self._manager = self._context.Manager()
+            return self._manager
+
+    def warm_up(self):
+        """Start the preflight workers, so the first upload is not checked behind a process start"""
+        lanes = [self._preflight_lanes.checkout() for _ in range(self.preflight_workers)]
+        try:
+            for future in [lane.submit(os.getpid) for lane in lanes]:
+                future.result()
+        finally:
+            for lane in lanes:
+                self._preflight_lanes.checkin(lane)
+
+    def iter_pages(self, path: str, splitter_config: Optional[Dict[str, Any]] = None,
+                   artifact_path: Optional[str] = None, source: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Parse a file, yielding split pages in order; parse errors are raised as RuntimeError.
+
+        With an artifact_path, pages are read from that page artifact if it exists and
+        the artifact is written otherwise. Chunks are attributed to `source`, by default
+        the file's name.
+        """
+        splitter_config = splitter_config or self.splitter_config
+        if self.num_workers == 1:
+            yield from iter_pages(path, splitter_config, artifact_path, self.extraction, source)
+            return
+
+        manager = self._get_manager()
+        out_queue = manager.Queue(maxsize=self.prefetch)
+        cancel = manager.Event()
+        lane = self._parse_lanes.checkout()
+        broken = False
+        future = lane.submit(
+            _produce_pages, path, splitter_config, artifact_path, self.extraction, source, out_queue, cancel
+        )
+        worker_pid = None
+        # Longest the worker may go without sending a page before it counts as hung
+        silence_limit = (self.extraction["page_timeout"] or self.extraction["document_timeout"] or float("inf"))
+        silence_limit += self.HUNG_GRACE_SECONDS
+        last_message = time.monotonic()
+        try:
+            while True:
+                try:
+                    kind, payload = out_queue.get(timeout=1)
+                except queue.Empty:
+                    if future.done():
+                        # The worker died without reporting, e.g. the pool was shut down
+                        broken = True
+                        future.result()
+                        raise RuntimeError(f"Parser for {basename(path)} exited unexpectedly")
+                    if worker_pid is not None and time.monotonic() - last_message > silence_limit:
+                        broken = True
+                        self._kill_worker(worker_pid)
+                        raise RuntimeError(f"Parser for {basename(path)} stopped responding and was killed")
+                    continue
+                last_message = time.monotonic()
+                if kind == "started":
+                    worker_pid = payload
+                    continue
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise RuntimeError(payload)
+                yield payload
+                last_message = time.monotonic()
+        finally:
+            # Unblock the worker if the consumer stopped early
+            cancel.set()
+            while not broken and not future.done():
+                try:
+                    out_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._parse_lanes.checkin(lane, broken=broken)
+
+    def preflight(self, path: str) -> Dict[str, Any]:
+        """Check an upload's structure in a preflight worker; see pdf_extractors.preflight.
+
+        A preflight running past the preflight_timeout budget has its worker killed and
+        replaced, and the file is rejected. Without preflight workers the check runs
+        inline, without a time limit.
+        """
+        if not self.preflight_workers:
+            return preflight(path, self.extraction)
+        pid_queue = self._get_manager().Queue()
+        lane = self._preflight_lanes.checkout()
+        broken = False
+        try:
+            future = lane.submit(_preflight_in_worker, path, self.extraction, pid_queue)
+            # The budget starts once the worker has the file, not while a new worker process starts
+            worker_pid = None
+            while worker_pid is None and not future.done():
+                try:
+                    worker_pid = pid_queue.get(timeout=1)
+                except queue.Empty:
+                    pass
+            timeout = self.extraction["preflight_timeout"]
+            try:
+                return future.result(timeout=timeout if timeout > 0 else None)
+            except FutureTimeoutError:
+                broken = True
+                self._kill_worker(worker_pid)
+                raise PDFRejectedError(f"Reading the PDF structure took longer than {timeout:g}s")
+            except BrokenProcessPool:
+                broken = True
+                raise
+        finally:
+            self._preflight_lanes.checkin(lane, broken=broken)
+
+    def _kill_worker(self, pid: Optional[int]):
+        """Kill a hung worker process; its lane is replaced when it is checked in"""
+        if pid is None:
+            return
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def shutdown(self, wait: bool = False):
+        """Stop the worker processes; with `wait`, block until the idle ones have exited"""
+        self._parse_lanes.shutdown(wait)
+        self._preflight_lanes.shutdown(wait)
+        with self._lock:
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
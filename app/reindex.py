@@ -0,0 +1,220 @@
+import os
+import time
+import uuid
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from langchain.schema import Document
+from .lexical_index import BM25Index
+from .pdf_parsing import hash_file, chunk_id
+from .document_registry import document_key
+
+# langchain_chroma's default collection, which held every chunk before reindexing existed
+LEGACY_COLLECTION = "langchain"
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_SPLITTER_CONFIG = {
+    "chunk_size": 1000,   # Larger chunks for better context
+    "chunk_overlap": 200,  # More overlap to maintain context continuity
+    "separators": ["\n\n", "\n", ". ", " ", ""]  # Better sentence boundary detection
+}
+
+
+def configured_index() -> Dict[str, Any]:
+    """Embedding model and splitter settings requested through the environment"""
+    return {
+        "embedding_model": os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL),
+        "splitter_config": {
+            "chunk_size": int(os.getenv("CHUNK_SIZE", DEFAULT_SPLITTER_CONFIG["chunk_size"])),
+            "chunk_overlap": int(os.getenv("CHUNK_OVERLAP", DEFAULT_SPLITTER_CONFIG["chunk_overlap"])),
+            "separators": DEFAULT_SPLITTER_CONFIG["separators"],
+        },
+    }
+
+
+def _key(document: Dict[str, Any]) -> str:
+    return document_key(document["namespace"], document["filename"])
+
+
+def same_index_config(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    return a["embedding_model"] == b["embedding_model"] and a["splitter_config"] == b["splitter_config"]
+
+
+class ShadowReindexer:
+    """Rebuilds the vector index into a new collection and swaps it in atomically.
+
+    The shadow collection is built in a background thread from the stored uploads while
+    queries keep using the active one. The rebuild is throttled to a duty cycle and yields
+    while questions are being retrieved. Files ingested or deleted meanwhile are caught up
+    before the swap, which happens under the service's write lock together with the
+    registry update. If any document cannot be rebuilt the swap is abandoned and the
+    reindex fails, so no document drops out of the index. The old collection is dropped
+    after a grace period.
+    """
+
+    def __init__(self, service, duty_cycle: float = 0.5, drop_grace_seconds: float = 60,
+                 max_catch_up_rounds: int = 5):
+        self.service = service
+        self.duty_cycle = min(1.0, max(0.05, duty_cycle))
+        self.drop_grace_seconds = drop_grace_seconds
+        self.max_catch_up_rounds = max_catch_up_rounds
+        self._status: Dict[str, Any] = {"state": "idle"}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self, target_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Start rebuilding with the given embedding model and splitter settings"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("A reindex is already running")
+            target = {"collection": f"documents_{uuid.uuid4().hex[:12]}", **target_config}
+            self._status = {
+                "state": "running",
+                "target": target,
+                "files_total": 0,
+                "files_done": 0,
+                "chunks": 0,
+                "failed_files": [],
+                "started_at": str(datetime.now()),
+                "finished_at": None,
+                "error": None,
+            }
+            self._thread = threading.Thread(target=self._run, args=(target,), name="reindex", daemon=True)
+            self._thread.start()
+            return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        return {k: (list(v) if isinstance(v, list) else v) for k, v in self._status.items()}
+
+    def _throttle(self, busy_seconds: float):
+        # Keep the rebuild to its share of the time, then hold off briefly while questions are in flight
+        time.sleep(busy_seconds * (1 - self.duty_cycle) / self.duty_cycle)
+        deadline = time.monotonic() + 2
+        while self.service.retrieval_limiter.stats()["in_flight"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _write(self, store, embeddings, lexical: BM25Index, chunks: List[Document]):
+        started = time.perf_counter()
+        self.service._embed_and_upsert(store, embeddings, lexical, chunks)
+        self._status["chunks"] += len(chunks)
+        self._throttle(time.perf_counter() - started)
+
+    def _remove(self, store, lexical: BM25Index, entry: Dict[str, Any]):
+        ids = [
+            chunk_id(_key(entry), page, index)
+            for page, count in enumerate(entry["page_chunks"]) for index in range(count)
+        ]
+        if ids:
+            store.delete(ids=ids)
+            lexical.remove_ids(ids)
+
+    def _build_file(self, target: Dict[str, Any], store, embeddings, lexical: BM25Index,
+                    document: Dict[str, Any]) -> Dict[str, Any]:
+        source = _key(document)
+        path = os.path.join(self.service.uploads_dir, source)
+        page_store = self.service.page_store
+        content_hash = document.get("content_hash")
+        if not content_hash or not page_store.has(content_hash):
+            # No page artifact for the indexed content (legacy or failed ingest); parse the upload
+            content_hash = hash_file(path)
+        batch_size = self.service.embed_batch_size
+        page_hashes, page_chunks, batch = [], [], []
+        pages = self.service.parse_pool.iter_pages(path, target["splitter_config"], page_store.path(content_hash), source)
+        for page in pages:
+            page_hashes.append(page["hash"])
+            page_chunks.append(len(page["chunks"]))
+            for chunk in page["chunks"]:
+                chunk.metadata["namespace"] = document["namespace"]
+            batch.extend(page["chunks"])
+            while len(batch) >= batch_size:
+                self._write(store, embeddings, lexical, batch[:batch_size])
+                batch = batch[batch_size:]
+        if batch:
+            self._write(store, embeddings, lexical, batch)
+        return {
+            "filename": document["filename"],
+            "upload_time": document["upload_time"],
+            "chunks": sum(page_chunks),
+            "pages": len(page_hashes),
+            "content_hash": content_hash,
+            "page_hashes": page_hashes,
+            "page_chunks": page_chunks,
+            "namespace": document["namespace"],
+        }
+
+    def _pending(self, built: Dict[str, tuple]) -> List[Dict[str, Any]]:
+        """Registry documents not yet built at their current content hash"""
+        documents = self.service.registry.list()["documents"]
+        return [doc for doc in documents if _key(doc) not in built or built[_key(doc)][0] != doc["content_hash"]]
+
+    def _catch_up(self, target: Dict[str, Any], store, embeddings, lexical: BM25Index,
+                  built: Dict[str, tuple]) -> bool:
+        """Build every pending document and drop deleted ones; returns whether anything changed"""
+        pending = self._pending(built)
+        current = {_key(doc) for doc in self.service.registry.list()["documents"]}
+        removed = [source for source in built if source not in current]
+        self._status["files_total"] += len(pending)
+        for source in removed:
+            entry = built.pop(source)[1]
+            if entry is not None:
+                self._remove(store, lexical, entry)
+        for document in pending:
+            previous = built.pop(_key(document), None)
+            if previous is not None and previous[1] is not None:
+                self._remove(store, lexical, previous[1])
+            try:
+                entry = self._build_file(target, store, embeddings, lexical, document)
+            except Exception as e:
+                # Keep building the rest so every failing document is reported; the swap is refused below
+                print(f"Reindex could not rebuild {_key(document)}: {e}")
+                self._status["failed_files"].append({
+                    "filename": document["filename"], "namespace": document["namespace"], "error": str(e)
+                })
+                entry = None
+            built[_key(document)] = (document["content_hash"], entry)
+            self._status["files_done"] += 1
+        return bool(pending or removed)
+
+    def _run(self, target: Dict[str, Any]):
+        service = self.service
+        store = None
+        try:
+            print(f"Reindexing into {target['collection']} with {target['embedding_model']}")
+            embeddings = service.build_embeddings(target["embedding_model"])
+            store = service.open_collection(target["collection"], embeddings)
+            lexical = BM25Index()
+            built: Dict[str, tuple] = {}
+            for _ in range(self.max_catch_up_rounds):
+                if self._catch_up(target, store, embeddings, lexical, built):
+                    continue
+                with service._write_lock:
+                    if self._pending(built):
+                        continue
+                    failed = sorted(source for source, (_, entry) in built.items() if entry is None)
+                    if failed:
+                        # The new index would be missing these documents; keep serving the current one
+                        raise RuntimeError(
+                            f"Could not rebuild {len(failed)} document(s): {', '.join(failed)}. "
+                            "The active index is unchanged; fix or delete them and reindex again"
+                        )
+                    old_store = service.swap_index(
+                        target, embeddings, store, lexical, [entry for _, entry in built.values()]
+                    )
+                break
+            else:
+                raise RuntimeError("Documents kept changing during the rebuild; try again")
+            self._status.update(state="completed", finished_at=str(datetime.now()))
+            print(f"Reindex complete; {target['collection']} is now active")
+        except Exception as e:
+            print(f"Reindex failed: {e}")
+            self._status.update(state="failed", finished_at=str(datetime.now()), error=str(e))
+            if store is not None:
+                store.drop()
+            return
+
+        # Queries that started before the swap may still be reading the old collection
+        time.sleep(self.drop_grace_seconds)
+        if old_store is not None:
+            try:
+                old_store.drop()
+            except Exception as e:
+                print(f"Warning: Could not drop the old collection: {e}")
@@ -0,0 +1,119 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from langchain.schema import Document
+from .lazy_components import LazyComponent
+from .retrieval import doc_key
+from .metrics import RERANK_OUTCOMES, RERANK_PAIRS
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def load_cross_encoder(model_name: str, max_length: int = 512):
+    """A sentence-transformers cross-encoder on CPU, warmed up with one prediction"""
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+    model.predict([("warm-up", "warm-up")])
+    return model
+
+
+class CrossEncoderReranker:
+    """Reorders retrieved candidates by cross-encoder relevance to the question.
+
+    Pairs are scored on CPU in batches, and scores are cached per (question, chunk)
+    so repeated and overlapping questions only score new chunks. Each call has a
+    latency budget; before every batch, the measured scoring speed is used to check
+    that the batch still fits. When it does not, or while the model is still loading,
+    rerank() returns None and the caller keeps its own ordering. Scores computed
+    before the budget ran out stay cached.
+    """
+
+    def __init__(self, model: LazyComponent, budget_ms: float = 300, batch_size: int = 16,
+                 cache_size: int = 20000):
+        self.model = model
+        self.budget_ms = budget_ms
+        self.batch_size = max(1, batch_size)
+        self.cache_size = cache_size
+        self._scores: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pair_seconds: Optional[float] = None  # moving average of scoring time per pair
+        self._loading: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _cache_key(question: str, doc: Document) -> tuple:
+        # The chunk text is part of the key: a re-ingested page reuses its chunk ids
+        content = hashlib.sha1((doc.page_content or "").encode("utf-8")).hexdigest()[:16]
+        return (question.strip(), doc_key(doc), content)
+
+    def _ensure_loading(self):
+        """Load the model in the background rather than inside a request"""
+        with self._lock:
+            if self._loading is None or not self._loading.is_alive():
+                def load():
+                    try:
+                        self.model.get()
+                    except Exception as e:
+                        print(f"Error loading rerank model: {e}")
+                self._loading = threading.Thread(target=load, name="rerank-model", daemon=True)
+                self._loading.start()
+
+    def _cached(self, key: tuple) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def _store(self, keys: List[tuple], scores):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._scores[key] = float(score)
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+
+    def rerank(self, question: str, docs: List[Document], top_k: int) -> Optional[Dict[str, Any]]:
+        """The top_k docs by cross-encoder score with timings, or None to fall back"""
+        started = time.perf_counter()
+        if not self.model.ready:
+            RERANK_OUTCOMES.labels(result="model_loading").inc()
+            self._ensure_loading()
+            return None
+
+        keys = [self._cache_key(question, doc) for doc in docs]
+        scores = {key: self._cached(key) for key in keys}
+        missing = [i for i, key in enumerate(keys) if scores[key] is None]
+        cache_hits = len(docs) - len(missing)
+        RERANK_PAIRS.labels(source="cache").inc(cache_hits)
+        deadline = started + self.budget_ms / 1000
+        try:
+            for offset in range(0, len(missing), self.batch_size):
+                batch = missing[offset:offset + self.batch_size]
+                if self._pair_seconds is not None and time.perf_counter() + self._pair_seconds * len(batch) > deadline:
+                    RERANK_OUTCOMES.labels(result="budget_exceeded").inc()
+                    return None
+                batch_started = time.perf_counter()
+                batch_scores = self.model.get().predict([(question, docs[i].page_content or "") for i in batch])
+                per_pair = (time.perf_counter() - batch_started) / len(batch)
+                self._pair_seconds = per_pair if self._pair_seconds is None else 0.8 * self._pair_seconds + 0.2 * per_pair
+                batch_keys = [keys[i] for i in batch]
+                self._store(batch_keys, batch_scores)
+                scores.update(zip(batch_keys, (float(s) for s in batch_scores)))
+                RERANK_PAIRS.labels(source="model").inc(len(batch))
+        except Exception as e:
+            print(f"Error reranking: {e}")
+            RERANK_OUTCOMES.labels(result="error").inc()
+            return None
+
+        order = sorted(range(len(docs)), key=lambda i: scores[keys[i]], reverse=True)[:top_k]
+        RERANK_OUTCOMES.labels(result="reranked").inc()
+        return {
+            "docs": [docs[i] for i in order],
+            "scores": [round(scores[keys[i]], 4) for i in order],
+            "candidates": len(docs),
+            "cache_hits": cache_hits,
+            "rerank_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
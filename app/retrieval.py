@@ -0,0 +1,168 @@
+import time
+import hashlib
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from langchain.schema import Document
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from .lexical_index import BM25Index
+
+
+def doc_key(doc: Document) -> str:
+    """Vector store id of a retrieved chunk, falling back to its content for untracked chunks"""
+    key = getattr(doc, "id", None) or (doc.metadata or {}).get("chunk_id")
+    if key:
+        return key
+    return hashlib.sha256(f"{doc.metadata.get('source')}|{doc.metadata.get('page')}|{doc.page_content}".encode("utf-8")).hexdigest()
+
+
+class HybridRetriever:
+    """Fuses vector similarity search with BM25 lexical search by reciprocal rank fusion.
+
+    Each leg fetches `candidates` results. Weak hits are dropped before fusion: vector
+    hits past `max_distance` or after a jump of more than `score_gap` in distance
+    (once `min_k` hits are kept), and lexical hits scoring below `lexical_min_ratio`
+    of the best one. `max_distance` and `score_gap` are squared L2 distances between unit
+    vectors, so both are only applied when the query embedding is normalized. The fused
+    list is cut to top_k, optionally picking a diverse set by maximal marginal relevance
+    (`mmr_lambda`, 1 = relevance only). Per-leg timings, hit counts and the score of
+    each returned chunk are kept in `timings` (milliseconds), with the number of chunks
+    dropped by each rule.
+    """
+
+    def __init__(self, vector_store, lexical_index: BM25Index, top_k: int,
+                 sources: Optional[List[str]] = None, candidates: Optional[int] = None, rrf_k: int = 60,
+                 max_distance: Optional[float] = None, score_gap: Optional[float] = None, min_k: int = 1,
+                 lexical_min_ratio: float = 0.0, mmr_lambda: Optional[float] = None):
+        self.vector_store = vector_store
+        self.lexical_index = lexical_index
+        self.top_k = top_k
+        self.sources = sources
+        self.candidates = max(candidates or top_k * 2, top_k)
+        self.rrf_k = rrf_k
+        self.max_distance = max_distance
+        self.score_gap = score_gap
+        self.min_k = max(1, min_k)
+        self.lexical_min_ratio = lexical_min_ratio
+        self.mmr_lambda = mmr_lambda
+        self.timings: Dict[str, Any] = {}
+
+    def _cut_vector_hits(self, hits: List[Tuple[Document, float]], dropped: Dict[str, int],
+                         max_distance: Optional[float], score_gap: Optional[float]) -> List[Tuple[Document, float]]:
+        """Vector hits (ascending distance) up to the distance threshold and the first large gap"""
+        kept = []
+        for doc, distance in hits:
+            if len(kept) >= self.min_k:
+                if max_distance is not None and distance > max_distance:
+                    dropped["threshold"] = len(hits) - len(kept)
+                    break
+                if score_gap is not None and distance - kept[-1][1] > score_gap:
+                    dropped["gap"] = len(hits) - len(kept)
+                    break
+            kept.append((doc, distance))
+        return kept
+
+    def _mmr(self, ranked: List[str], query_embedding: List[float], dropped: Dict[str, int]) -> List[str]:
+        """Pick top_k of the ranked chunk ids by maximal marginal relevance"""
+        stored = self.vector_store.get(ids=ranked, include=["embeddings"])
+        vectors = dict(zip(stored["ids"], stored["embeddings"]))
+        ranked = [key for key in ranked if key in vectors]
+        picked = maximal_marginal_relevance(
+            np.array(query_embedding), [vectors[key] for key in ranked], lambda_mult=self.mmr_lambda, k=self.top_k
+        )
+        dropped["mmr"] = len(ranked) - len(picked)
+        return [ranked[i] for i in picked]
+
+    def get_relevant_documents(self, query: str, lexical_query: Optional[str] = None,
+                               query_embedding: Optional[List[float]] = None,
+                               vector_hits: Optional[List[Tuple[Document, float]]] = None) -> List[Document]:
+        """Fused top_k chunks for a query; the embedding and vector hits are computed unless given"""
+        started = time.perf_counter()
+        dropped: Dict[str, int] = {"threshold": 0, "gap": 0, "lexical": 0, "mmr": 0, "top_k": 0}
+        if query_embedding is None:
+            query_embedding = self.vector_store.embeddings.embed_query(query)
+        if vector_hits is None:
+            vector_hits = self.vector_store.search(query_embedding, self.candidates, self.sources)
+        # Distances of unnormalized embeddings have no fixed scale, so absolute cuts would be arbitrary
+        if abs(float(np.linalg.norm(query_embedding)) - 1.0) < 1e-3:
+            vector_kept = self._cut_vector_hits(vector_hits, dropped, self.max_distance, self.score_gap)
+        else:
+            vector_kept = self._cut_vector_hits(vector_hits, dropped, None, None)
+        vector_done = time.perf_counter()
+
+        lexical_hits = self.lexical_index.search(lexical_query or query, self.candidates, self.sources)
+        if lexical_hits and self.lexical_min_ratio:
+            floor = lexical_hits[0][1] * self.lexical_min_ratio
+            lexical_kept = [(key, score) for key, score in lexical_hits if score >= floor]
+            dropped["lexical"] = len(lexical_hits) - len(lexical_kept)
+        else:
+            lexical_kept = lexical_hits
+        lexical_done = time.perf_counter()
+
+        fused: Dict[str, float] = {}
+        docs: Dict[str, Document] = {}
+        distances: Dict[str, float] = {}
+        lexical_scores: Dict[str, float] = {}
+        for rank, (doc, distance) in enumerate(vector_kept):
+            key = doc_key(doc)
+            docs[key] = doc
+            distances[key] = distance
+            fused[key] = fused.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        for rank, (key, score) in enumerate(lexical_kept):
+            if key not in docs:
+                text, metadata = self.lexical_index.get(key) or ("", {})
+                docs[key] = Document(page_content=text, metadata=metadata, id=key)
+            lexical_scores[key] = score
+            fused[key] = fused.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        ranked = sorted(fused, key=fused.get, reverse=True)
+        if self.mmr_lambda is not None and len(ranked) > self.top_k:
+            ranked = self._mmr(ranked, query_embedding, dropped)
+        dropped["top_k"] = max(0, len(ranked) - self.top_k)
+        ranked = ranked[:self.top_k]
+        finished = time.perf_counter()
+        self.timings = {
+            "vector_ms": round((vector_done - started) * 1000, 2),
+            "lexical_ms": round((lexical_done - vector_done) * 1000, 2),
+            "fusion_ms": round((finished - lexical_done) * 1000, 2),
+            "vector_hits": len(vector_hits),
+            "lexical_hits": len(lexical_hits),
+            "dropped": dropped,
+            "dropped_total": sum(dropped.values()),
+            "scores": [
+                {
+                    "chunk_id": key,
+                    "distance": round(distances[key], 4) if key in distances else None,
+                    "lexical": round(lexical_scores[key], 4) if key in lexical_scores else None,
+                    "fused": round(fused[key], 5),
+                }
+                for key in ranked
+            ],
+        }
+        return [docs[key] for key in ranked]
+
+    def get_relevant_documents_batch(self, queries: List[str],
+                                     lexical_queries: Optional[List[str]] = None) -> List[Tuple[List[Document], Dict[str, Any]]]:
+        """get_relevant_documents for several queries, with one embedding call and one vector search.
+
+        Returns (documents, timings) per query; each timings also reports the shared batch steps.
+        """
+        lexical_queries = lexical_queries or [None] * len(queries)
+        started = time.perf_counter()
+        embeddings = self.vector_store.embeddings
+        if hasattr(embeddings, "embed_queries"):
+            query_embeddings = embeddings.embed_queries(queries)
+        else:
+            query_embeddings = [embeddings.embed_query(query) for query in queries]
+        embedded = time.perf_counter()
+        all_hits = self.vector_store.search_many(query_embeddings, self.candidates, self.sources)
+        searched = time.perf_counter()
+        batch = {
+            "questions": len(queries),
+            "embed_ms": round((embedded - started) * 1000, 2),
+            "search_ms": round((searched - embedded) * 1000, 2),
+        }
+        results = []
+        for query, lexical_query, query_embedding, vector_hits in zip(queries, lexical_queries, query_embeddings, all_hits):
+            docs = self.get_relevant_documents(query, lexical_query, query_embedding, vector_hits)
+            results.append((docs, {**self.timings, "batch": batch}))
+        return results
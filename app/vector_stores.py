@@ -0,0 +1,623 @@
+import os
+import json
+import shutil
+import sqlite3
+import threading
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: the single-process guard is not available
+    fcntl = None
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from langchain.schema import Document
+from .pdf_parsing import chunk_source
+
+# Every backend ranks by squared L2 distance (Chroma's default space), so distance
+# thresholds mean the same thing whichever store holds a collection.
+
+ALL_FIELDS = ["documents", "metadatas", "embeddings"]
+
+
+class VectorStore:
+    """Chunk vectors with their text and metadata, searchable by embedding.
+
+    `embeddings` is the embedding function the vectors came from, used to embed queries.
+    """
+
+    kind = "base"
+
+    def __init__(self, name: str, embeddings):
+        self.name = name
+        self.embeddings = embeddings
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], documents: List[str],
+               metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def delete(self, ids: Optional[List[str]] = None, source: Optional[str] = None):
+        """Delete chunks by id, or every chunk of a source document"""
+        raise NotImplementedError
+
+    def get(self, ids: Optional[List[str]] = None, limit: Optional[int] = None, offset: int = 0,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Chunks by id, or a page of all chunks, as {ids, documents, metadatas, embeddings}"""
+        raise NotImplementedError
+
+    def search(self, query_embedding: List[float], k: int,
+               sources: Optional[List[str]] = None) -> List[Tuple[Document, float]]:
+        """The k nearest chunks with their distances, optionally only from the given sources"""
+        raise NotImplementedError
+
+    def search_many(self, query_embeddings: List[List[float]], k: int,
+                    sources: Optional[List[str]] = None) -> List[List[Tuple[Document, float]]]:
+        """search() for several queries; backends override it to answer them in one pass"""
+        return [self.search(query_embedding, k, sources) for query_embedding in query_embeddings]
+
+    def drop(self):
+        """Delete the whole collection"""
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    """A collection in the persistent Chroma database (HNSW index, scales to large corpora)"""
+
+    kind = "chroma"
+
+    def __init__(self, name: str, embeddings, client):
+        super().__init__(name, embeddings)
+        self._client = client
+        # No embedding function: vectors are always computed by the service
+        self._collection = client.get_or_create_collection(name=name, embedding_function=None)
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self._collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def update_metadata(self, ids, metadatas):
+        self._collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids=None, source=None):
+        if ids:
+            self._collection.delete(ids=ids)
+        elif source is not None:
+            self._collection.delete(where={"source": source})
+
+    def get(self, ids=None, limit=None, offset=0, include=None):
+        include = include or ["documents", "metadatas"]
+        result = self._collection.get(ids=ids, limit=limit, offset=offset or None, include=include)
+        return {
+            "ids": result["ids"],
+            "documents": result.get("documents") if "documents" in include else None,
+            "metadatas": result.get("metadatas") if "metadatas" in include else None,
+            "embeddings": [list(v) for v in result["embeddings"]] if "embeddings" in include else None,
+        }
+
+    def search(self, query_embedding, k, sources=None):
+        return self.search_many([query_embedding], k, sources)[0]
+
+    def search_many(self, query_embeddings, k, sources=None):
+        if k <= 0 or not query_embeddings or self.count() == 0:
+            return [[] for _ in query_embeddings]
+        result = self._collection.query(
+            query_embeddings=list(query_embeddings), n_results=k,
+            where={"source": {"$in": sources}} if sources else None,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                (Document(page_content=text or "", metadata=metadata or {}, id=doc_id), distance)
+                for doc_id, text, metadata, distance in zip(ids, documents, metadatas, distances)
+            ]
+            for ids, documents, metadatas, distances in zip(
+                result["ids"], result["documents"], result["metadatas"], result["distances"]
+            )
+        ]
+
+    def drop(self):
+        self._client.delete_collection(self.name)
+
+
+class FlatIndexLockedError(RuntimeError):
+    """Raised when a flat collection is already open in another process"""
+
+
+class FlatVectorStore(VectorStore):
+    """Exact search over a memory-mapped float16 matrix, for small and medium collections.
+
+    Vectors live in `vectors.f16`, one row per chunk; texts and metadata live in a
+    SQLite table next to it and are only read for the chunks a search returns. A
+    search is one scan over the rows of the requested sources, with no index to build
+    or keep in memory beyond a source code and a norm per row. Rows of deleted chunks
+    are reused. Row allocation and the in-memory row map belong to one process, so a
+    flat collection is locked (flock on its `lock` file) by the process that opens it,
+    and opening it from a second process raises FlatIndexLockedError.
+    """
+
+    kind = "flat"
+    GROW_ROWS = 1024
+    SCAN_BLOCK_ROWS = 65536
+
+    def __init__(self, name: str, embeddings, directory: str):
+        super().__init__(name, embeddings)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._acquire_directory(directory)
+        self._vectors_path = os.path.join(directory, "vectors.f16")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "rows.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rows ("
+                "row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, source TEXT, document TEXT, metadata TEXT)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        dim = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim: Optional[int] = dim[0] if dim else None
+        self._matrix: Optional[np.memmap] = None
+        self._row_ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._source_codes: Dict[str, int] = {}
+        self._row_sources = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._free: List[int] = []
+        self._load()
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, "rows.sqlite3"))
+
+    @staticmethod
+    def _acquire_directory(directory: str):
+        """Exclusive lock on the collection for this process; held until close()"""
+        lock_file = open(os.path.join(directory, "lock"), "a+")
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.seek(0)
+            holder = lock_file.read().strip() or "another process"
+            lock_file.close()
+            raise FlatIndexLockedError(
+                f"Flat index {directory} is already open in process {holder}. The flat index supports a "
+                "single server process; run several workers (uvicorn --workers, gunicorn -w) with "
+                "VECTOR_STORE_BACKEND=chroma"
+            )
+        lock_file.truncate(0)
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        return lock_file
+
+    def _load(self):
+        if self.dim is None:
+            return
+        rows = self._conn.execute("SELECT row, id, source FROM rows").fetchall()
+        capacity = os.path.getsize(self._vectors_path) // (2 * self.dim) if os.path.exists(self._vectors_path) else 0
+        self._open_matrix(capacity)
+        self._row_ids = [None] * capacity
+        self._row_sources = np.full(capacity, -1, dtype=np.int32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._norms = np.zeros(capacity, dtype=np.float32)
+        for row, doc_id, source in rows:
+            self._row_ids[row] = doc_id
+            self._rows[doc_id] = row
+            self._row_sources[row] = self._source_code(source)
+            self._alive[row] = True
+        for start in range(0, capacity, self.SCAN_BLOCK_ROWS):
+            block = np.asarray(self._matrix[start:start + self.SCAN_BLOCK_ROWS], dtype=np.float32)
+            self._norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+        self._free = [row for row in range(capacity) if not self._alive[row]]
+        self._free.reverse()
+
+    def _open_matrix(self, capacity: int):
+        if capacity == 0:
+            self._matrix = None
+            return
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 2)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+
+    def _source_code(self, source: Optional[str]) -> int:
+        if source not in self._source_codes:
+            self._source_codes[source] = len(self._source_codes)
+        return self._source_codes[source]
+
+    def _allocate(self, needed: int) -> List[int]:
+        """Free row numbers, growing the matrix file when there are not enough"""
+        capacity = len(self._row_ids)
+        if len(self._free) < needed:
+            new_capacity = max(capacity * 2, capacity + needed - len(self._free), self.GROW_ROWS)
+            self._open_matrix(new_capacity)
+            grown = new_capacity - capacity
+            self._row_ids.extend([None] * grown)
+            self._row_sources = np.concatenate([self._row_sources, np.full(grown, -1, dtype=np.int32)])
+            self._alive = np.concatenate([self._alive, np.zeros(grown, dtype=bool)])
+            self._norms = np.concatenate([self._norms, np.zeros(grown, dtype=np.float32)])
+            self._free = list(range(new_capacity - 1, capacity - 1, -1)) + self._free
+        return [self._free.pop() for _ in range(needed)]
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (self.dim,))
+            new_ids = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self._rows]
+            for doc_id, row in zip(new_ids, self._allocate(len(new_ids))):
+                self._rows[doc_id] = row
+                self._row_ids[row] = doc_id
+            rows = [self._rows[doc_id] for doc_id in ids]
+            # Vectors are written before their rows are committed, so a crash never exposes a missing vector
+            self._matrix[rows] = vectors.astype(np.float16)
+            self._matrix.flush()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rows (row, id, source, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (row, doc_id, (metadata or {}).get("source"), document, json.dumps(metadata or {}))
+                        for row, doc_id, document, metadata in zip(rows, ids, documents, metadatas)
+                    ]
+                )
+            stored = np.asarray(self._matrix[rows], dtype=np.float32)
+            self._norms[rows] = np.einsum("ij,ij->i", stored, stored)
+            self._row_sources[rows] = [self._source_code((metadata or {}).get("source")) for metadata in metadatas]
+            self._alive[rows] = True
+
+    def update_metadata(self, ids, metadatas):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE rows SET metadata = ?, source = ? WHERE id = ?",
+                [(json.dumps(metadata), metadata.get("source"), doc_id) for doc_id, metadata in zip(ids, metadatas)]
+            )
+            for doc_id, metadata in zip(ids, metadatas):
+                if doc_id in self._rows:
+                    self._row_sources[self._rows[doc_id]] = self._source_code(metadata.get("source"))
+
+    def delete(self, ids=None, source=None):
+        with self._lock:
+            if ids:
+                doomed = [doc_id for doc_id in ids if doc_id in self._rows]
+            elif source is not None and source in self._source_codes:
+                rows = np.flatnonzero(self._alive & (self._row_sources == self._source_codes[source]))
+                doomed = [self._row_ids[row] for row in rows]
+            else:
+                return
+            with self._conn:
+                self._conn.executemany("DELETE FROM rows WHERE id = ?", [(doc_id,) for doc_id in doomed])
+            for doc_id in doomed:
+                row = self._rows.pop(doc_id)
+                self._row_ids[row] = None
+                self._alive[row] = False
+                self._free.append(row)
+
+    def _fetch(self, where: str, params: list, include: List[str]) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT row, id, document, metadata FROM rows {where}", params).fetchall()
+            vectors = (
+                np.asarray(self._matrix[[row for row, *_ in rows]], dtype=np.float32)
+                if "embeddings" in include and rows else None
+            )
+        return {
+            "ids": [doc_id for _, doc_id, _, _ in rows],
+            "documents": [document for _, _, document, _ in rows] if "documents" in include else None,
+            "metadatas": [json.loads(metadata) for _, _, _, metadata in rows] if "metadatas" in include else None,
+            "embeddings": (vectors.tolist() if vectors is not None else []) if "embeddings" in include else None,
+        }
+
+    def get(self, ids=None, limit=None, offset=0, include=None):
+        include = include or ["documents", "metadatas"]
+        if ids is not None:
+            if not ids:
+                return {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+            return self._fetch(f"WHERE id IN ({', '.join('?' * len(ids))})", list(ids), include)
+        return self._fetch("ORDER BY row LIMIT ? OFFSET ?", [limit if limit is not None else -1, offset], include)
+
+    def search(self, query_embedding, k, sources=None):
+        return self.search_many([query_embedding], k, sources)[0]
+
+    def search_many(self, query_embeddings, k, sources=None):
+        with self._lock:
+            matrix = self._matrix
+            if matrix is None or k <= 0 or not query_embeddings:
+                return [[] for _ in query_embeddings]
+            # Writes update the row flags, sources and norms in place, so the candidate rows
+            # and their norms are copied out before the scan
+            mask = self._alive[:len(matrix)]
+            if sources:
+                codes = [self._source_codes[s] for s in sources if s in self._source_codes]
+                mask = mask & np.isin(self._row_sources[:len(matrix)], codes)
+            candidates = np.flatnonzero(mask)
+            candidate_norms = self._norms[candidates]
+        if len(candidates) == 0:
+            return [[] for _ in query_embeddings]
+        # One scan of the matrix scores every query: each block is read once for all of them
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        distances = np.empty((len(queries), len(candidates)), dtype=np.float32)
+        for start in range(0, len(candidates), self.SCAN_BLOCK_ROWS):
+            rows = candidates[start:start + self.SCAN_BLOCK_ROWS]
+            block = np.asarray(matrix[rows], dtype=np.float32)
+            distances[:, start:start + len(rows)] = candidate_norms[start:start + len(rows)] - 2 * (queries @ block.T)
+        distances += np.einsum("ij,ij->i", queries, queries)[:, None]
+        k = min(k, len(candidates))
+        best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        best = np.take_along_axis(best, np.argsort(np.take_along_axis(distances, best, axis=1), axis=1, kind="stable"), axis=1)
+        rows = sorted({int(candidates[i]) for i in best.ravel()})
+        with self._lock:
+            found = {
+                row: (doc_id, document, metadata)
+                for row, doc_id, document, metadata in self._conn.execute(
+                    f"SELECT row, id, document, metadata FROM rows WHERE row IN ({', '.join('?' * len(rows))})", rows
+                ).fetchall()
+            }
+        results = []
+        for query_best, query_distances in zip(best, distances):
+            hits = []
+            for i in query_best:
+                row = int(candidates[i])
+                if row in found:
+                    doc_id, document, metadata = found[row]
+                    hits.append((Document(page_content=document or "", metadata=json.loads(metadata), id=doc_id),
+                                 max(0.0, float(query_distances[i]))))
+            results.append(hits)
+        return results
+
+    def close(self):
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
+            # Closing the file releases the flock
+            self._lock_file.close()
+
+    def drop(self):
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class PromotingVectorStore(VectorStore):
+    """A flat store that moves itself into Chroma once it holds more than `promote_at` chunks.
+
+    Callers keep the same object; after promotion every call goes to the Chroma collection.
+    """
+
+    def __init__(self, store: FlatVectorStore, promote, promote_at: int):
+        super().__init__(store.name, store.embeddings)
+        self._store: VectorStore = store
+        self._promote_to = promote
+        self.promote_at = promote_at
+        self._lock = threading.Lock()
+
+    @property
+    def kind(self) -> str:
+        return self._store.kind
+
+    def _promote(self, batch_size: int = 5000):
+        flat = self._store
+        print(f"Promoting {self.name} ({flat.count()} chunks) from the flat index to Chroma")
+        chroma = self._promote_to()
+        if chroma.count():
+            # Left over from an interrupted promotion; the flat store is still the complete copy
+            chroma.drop()
+            chroma = self._promote_to()
+        offset = 0
+        while True:
+            batch = flat.get(limit=batch_size, offset=offset, include=ALL_FIELDS)
+            if not batch["ids"]:
+                break
+            chroma.upsert(batch["ids"], batch["embeddings"], batch["documents"], batch["metadatas"])
+            offset += len(batch["ids"])
+        self._store = chroma
+        flat.drop()
+
+    def count(self):
+        return self._store.count()
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        with self._lock:
+            self._store.upsert(ids, embeddings, documents, metadatas)
+            if self._store.kind == "flat" and self._store.count() > self.promote_at:
+                self._promote()
+
+    def update_metadata(self, ids, metadatas):
+        self._store.update_metadata(ids, metadatas)
+
+    def delete(self, ids=None, source=None):
+        self._store.delete(ids=ids, source=source)
+
+    def get(self, ids=None, limit=None, offset=0, include=None):
+        return self._store.get(ids=ids, limit=limit, offset=offset, include=include)
+
+    def search(self, query_embedding, k, sources=None):
+        return self._store.search(query_embedding, k, sources)
+
+    def search_many(self, query_embeddings, k, sources=None):
+        return self._store.search_many(query_embeddings, k, sources)
+
+    def drop(self):
+        self._store.drop()
+
+
+class VectorStoreFactory:
+    """Opens collections in the configured backend.
+
+    backend is "chroma", "flat" or "auto". With auto, a collection that already exists
+    in Chroma stays there; any other starts in the flat index and is promoted to
+    Chroma once it passes `promote_at` chunks. The flat index is single-process, so
+    both backends that use it are refused when the server runs several `processes`;
+    worker counts set outside WEB_CONCURRENCY are caught by the flat collections' lock.
+    """
+
+    def __init__(self, chroma_dir: str, flat_dir: str, backend: str = "auto", promote_at: int = 50000,
+                 processes: int = 1):
+        if backend not in ("auto", "flat", "chroma"):
+            raise ValueError(f"Unknown VECTOR_STORE_BACKEND '{backend}'. Choose one of: auto, flat, chroma")
+        if processes > 1 and backend != "chroma":
+            raise ValueError(
+                f"VECTOR_STORE_BACKEND '{backend}' uses the flat index, which supports a single server process, "
+                f"but WEB_CONCURRENCY is {processes}. Set VECTOR_STORE_BACKEND=chroma or WEB_CONCURRENCY=1"
+            )
+        self.chroma_dir = chroma_dir
+        self.flat_dir = flat_dir
+        self.backend = backend
+        self.promote_at = promote_at
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _chroma_client(self):
+        with self._lock:
+            if self._client is None:
+                import chromadb
+
+                self._client = chromadb.PersistentClient(path=self.chroma_dir)
+            return self._client
+
+    def _in_chroma(self, collection: str) -> bool:
+        if not (os.path.exists(self.chroma_dir) and os.listdir(self.chroma_dir)):
+            return False
+        return collection in [getattr(c, "name", c) for c in self._chroma_client().list_collections()]
+
+    def exists(self, collection: str) -> bool:
+        return FlatVectorStore.exists(os.path.join(self.flat_dir, collection)) or self._in_chroma(collection)
+
+    def open(self, collection: str, embeddings) -> VectorStore:
+        flat_path = os.path.join(self.flat_dir, collection)
+        if self.backend == "chroma" or (not FlatVectorStore.exists(flat_path) and self._in_chroma(collection)):
+            return ChromaVectorStore(collection, embeddings, self._chroma_client())
+        flat = FlatVectorStore(collection, embeddings, flat_path)
+        if self.backend == "flat":
+            return flat
+        store = PromotingVectorStore(
+            flat, lambda: ChromaVectorStore(collection, embeddings, self._chroma_client()), self.promote_at
+        )
+        if flat.count() > self.promote_at:
+            with store._lock:
+                store._promote()
+        return store
+
+
+class ShardedVectorStore(VectorStore):
+    """One shard per document namespace, presented as a single store.
+
+    Every chunk goes to the shard of the namespace its source belongs to, as told by
+    `namespace_of`. Searches only visit the shards that hold the requested sources, or
+    every shard when there is no selection, and merge the hits by distance; all shards
+    use the same embedding model, so distances compare. Shards are opened on first use.
+    """
+
+    kind = "sharded"
+
+    def __init__(self, name: str, embeddings, open_shard: Callable[[str], VectorStore],
+                 namespace_of: Callable[[str], str], all_namespaces: Callable[[], List[str]]):
+        super().__init__(name, embeddings)
+        self._open_shard = open_shard
+        self._namespace_of = namespace_of
+        self._all_namespaces = all_namespaces
+        self._shards: Dict[str, VectorStore] = {}
+        self._lock = threading.Lock()
+
+    def shard(self, namespace: str) -> VectorStore:
+        with self._lock:
+            if namespace not in self._shards:
+                self._shards[namespace] = self._open_shard(namespace)
+            return self._shards[namespace]
+
+    def namespaces(self) -> List[str]:
+        return sorted(set(self._all_namespaces()) | set(self._shards))
+
+    def shard_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {namespace: {"kind": shard.kind, "chunks": shard.count()} for namespace, shard in sorted(self._shards.items())}
+
+    def _group(self, ids: List[str]) -> Dict[str, List[str]]:
+        groups: Dict[str, List[str]] = {}
+        for doc_id in ids:
+            groups.setdefault(self._namespace_of(chunk_source(doc_id)), []).append(doc_id)
+        return groups
+
+    def count(self):
+        return sum(self.shard(namespace).count() for namespace in self.namespaces())
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        groups: Dict[str, List[int]] = {}
+        for i, doc_id in enumerate(ids):
+            groups.setdefault(self._namespace_of(chunk_source(doc_id)), []).append(i)
+        for namespace, rows in groups.items():
+            self.shard(namespace).upsert(
+                [ids[i] for i in rows], [embeddings[i] for i in rows],
+                [documents[i] for i in rows], [metadatas[i] for i in rows]
+            )
+
+    def update_metadata(self, ids, metadatas):
+        for namespace, group in self._group(ids).items():
+            wanted = set(group)
+            self.shard(namespace).update_metadata(
+                [doc_id for doc_id in ids if doc_id in wanted],
+                [metadata for doc_id, metadata in zip(ids, metadatas) if doc_id in wanted]
+            )
+
+    def delete(self, ids=None, source=None):
+        if ids:
+            for namespace, group in self._group(ids).items():
+                self.shard(namespace).delete(ids=group)
+        elif source is not None:
+            self.shard(self._namespace_of(source)).delete(source=source)
+
+    def get(self, ids=None, limit=None, offset=0, include=None):
+        merged = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        if ids is not None:
+            parts = [self.shard(namespace).get(ids=group, include=include) for namespace, group in self._group(ids).items()]
+        else:
+            # Pages run through the shards in namespace order
+            parts = []
+            remaining = limit if limit is not None else float("inf")
+            for namespace in self.namespaces():
+                if remaining <= 0:
+                    break
+                shard = self.shard(namespace)
+                size = shard.count()
+                if offset >= size:
+                    offset -= size
+                    continue
+                part = shard.get(limit=None if remaining == float("inf") else int(remaining), offset=offset, include=include)
+                offset = 0
+                remaining -= len(part["ids"])
+                parts.append(part)
+        for part in parts:
+            for field in merged:
+                if part.get(field) is not None:
+                    merged[field].extend(part[field])
+        return merged
+
+    def search(self, query_embedding, k, sources=None):
+        return self.search_many([query_embedding], k, sources)[0]
+
+    def search_many(self, query_embeddings, k, sources=None):
+        if sources:
+            by_namespace: Dict[str, List[str]] = {}
+            for source in sources:
+                by_namespace.setdefault(self._namespace_of(source), []).append(source)
+        else:
+            by_namespace = {namespace: None for namespace in self.namespaces()}
+        hits = [[] for _ in query_embeddings]
+        for namespace, shard_sources in by_namespace.items():
+            for query_hits, shard_hits in zip(hits, self.shard(namespace).search_many(query_embeddings, k, shard_sources)):
+                query_hits.extend(shard_hits)
+        return [sorted(query_hits, key=lambda hit: hit[1])[:k] for query_hits in hits]
+
+    def drop(self):
+        for namespace in self.namespaces():
+            self.shard(namespace).drop()
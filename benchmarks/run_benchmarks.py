@@ -0,0 +1,172 @@
+"""End-to-end benchmarks for ingest, retrieval and /ask against a synthetic lease corpus.
+
+Runs in a scratch working directory with the stub LLM, and writes a JSON report:
+
+    python -m benchmarks.run_benchmarks --files 20 --pages 30 --output bench_results.json
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import List, Dict, Any
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_leases import generate_corpus  # noqa: E402
+
+QUESTIONS = [
+    "What is the monthly rent?",
+    "When does the lease end?",
+    "How much is the security deposit?",
+    "Who is responsible for utilities?",
+    "Which parking space is assigned to the tenant?",
+    "What is the late payment fee?",
+    "Can the tenant sublet the premises?",
+    "How much notice is required to terminate the lease?",
+    "Are pets allowed?",
+    "What is the property address?",
+]
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered), 2),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def bench_ingest(ai_service, paths: List[str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = ai_service.ingest_documents(paths)
+    elapsed = time.perf_counter() - started
+    # Long pages overflow onto extra PDF pages, so count what was actually ingested
+    pages = sum(f.get("pages") or 0 for f in result.get("files", {}).values())
+    chunks = result.get("total_chunks", 0)
+    # RUSAGE_CHILDREN only covers reaped processes, so stop the parse workers before measuring;
+    # the pool starts new ones on the next parse
+    ai_service.parse_pool.shutdown(wait=True)
+    return {
+        "success": result["success"],
+        "files": len(paths),
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 2),
+        "chunks_per_second": round(chunks / elapsed, 2),
+        "stage_timings": result.get("timings", {}),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_retrieval(ai_service, top_k: int, repeats: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(repeats):
+        for question in QUESTIONS:
+            started = time.perf_counter()
+            retriever = ai_service._build_retriever(top_k=top_k)
+            retriever.get_relevant_documents(question, lexical_query=ai_service._preprocess_question(question))
+            samples.append((time.perf_counter() - started) * 1000)
+    return {"top_k": top_k, **percentiles(samples)}
+
+
+def bench_ask(app, top_k: int, repeats: int) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+
+    samples = []
+    errors = 0
+    with TestClient(app) as client:
+        for _ in range(repeats):
+            for question in QUESTIONS:
+                started = time.perf_counter()
+                response = client.post("/ask", json={"question": question, "top_k": top_k})
+                samples.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+    return {"top_k": top_k, "errors": errors, **percentiles(samples)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, retrieval and /ask")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--workdir", default=None, help="Scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="documind-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    paths = generate_corpus(os.path.join(workdir, "uploads"), args.files, args.pages)
+
+    # The service keeps its state in the working directory; benchmark against a fresh one
+    os.chdir(workdir)
+    os.environ.setdefault("LLM_PROVIDER", "stub")
+    os.environ.setdefault("ANSWER_CACHE_MAX_ENTRIES", "0")
+    os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(workdir, "embedding_cache.sqlite3"))
+
+    import_started = time.perf_counter()
+    from app.ai_service import ai_service
+    from app.main import app
+    import_seconds = time.perf_counter() - import_started
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "files": args.files,
+            "pages_per_file": args.pages,
+            "top_k": args.top_k,
+            "repeats": args.repeats,
+            "llm_provider": os.environ["LLM_PROVIDER"],
+        },
+        "startup_seconds": round(import_seconds, 3),
+        "ingest": bench_ingest(ai_service, paths),
+        "retrieval": bench_retrieval(ai_service, args.top_k, args.repeats),
+        "ask": bench_ask(app, args.top_k, args.repeats),
+    }
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Wrote benchmark report to {output}")
+
+
+if __name__ == "__main__":
+    main()
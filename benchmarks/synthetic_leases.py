@@ -0,0 +1,140 @@
+"""Generate synthetic residential lease PDFs for benchmarking.
+
+Usage: python -m benchmarks.synthetic_leases --out bench_corpus --files 10 --pages 20
+"""
+import os
+import random
+import argparse
+import textwrap
+from typing import List
+
+TENANTS = ["John Smith", "Maria Garcia", "Wei Chen", "Aisha Khan", "Liam O'Brien", "Sofia Rossi"]
+LANDLORDS = ["Oakwood Properties LLC", "Jane Roe", "Harbor Realty Inc.", "Pinecrest Holdings"]
+STREETS = ["Oak St", "Maple Ave", "Harbor Blvd", "Pine Ct", "Elm Dr", "Cedar Ln"]
+
+CLAUSES = [
+    "The Tenant shall pay monthly rent of ${rent:,} on the first day of each month to the Landlord.",
+    "The lease term begins on {start} and ends on {end}, unless terminated earlier under Section {section}.",
+    "A security deposit of ${deposit:,} shall be held by the Landlord and returned within 30 days of move out.",
+    "The Tenant is responsible for utilities including electricity, gas and internet service.",
+    "One parking space, number {space}, is assigned to the Tenant for the duration of the lease term.",
+    "The premises located at {address} shall be used solely as a private residence.",
+    "Late payment of rent incurs a fee of ${late_fee} after a grace period of five days.",
+    "The Landlord shall maintain the premises in good repair and comply with all applicable housing codes.",
+    "The Tenant may not sublet the premises without the prior written consent of the Landlord.",
+    "Either party may terminate this agreement with sixty days written notice as set out in Section {section}.",
+    "Pets are not permitted on the premises without an additional deposit of ${pet_deposit}.",
+    "The Tenant shall permit entry by the Landlord upon twenty-four hours notice for inspection and repairs.",
+]
+
+
+def _lease_facts(rng: random.Random) -> dict:
+    year = rng.randint(2020, 2026)
+    return {
+        "rent": rng.randrange(900, 4500, 25),
+        "deposit": rng.randrange(500, 5000, 50),
+        "start": f"{rng.randint(1, 12):02d}/01/{year}",
+        "end": f"{rng.randint(1, 12):02d}/28/{year + 1}",
+        "section": f"{rng.randint(1, 20)}.{rng.randint(1, 9)}",
+        "space": rng.randint(1, 200),
+        "address": f"{rng.randint(10, 9999)} {rng.choice(STREETS)}",
+        "late_fee": rng.randrange(25, 150, 5),
+        "pet_deposit": rng.randrange(200, 800, 50),
+    }
+
+
+def lease_pages(num_pages: int, seed: int) -> List[str]:
+    """Text of each page of one synthetic lease"""
+    rng = random.Random(seed)
+    facts = _lease_facts(rng)
+    pages = []
+    for page in range(num_pages):
+        paragraphs = []
+        if page == 0:
+            paragraphs.append(
+                f"RESIDENTIAL LEASE AGREEMENT between {rng.choice(LANDLORDS)} (Landlord) "
+                f"and {rng.choice(TENANTS)} (Tenant) for the premises at {facts['address']}."
+            )
+        for number in range(rng.randint(10, 16)):
+            clause = rng.choice(CLAUSES).format(**facts)
+            paragraphs.append(f"Section {page + 1}.{number + 1}. {clause}")
+        pages.append("\n\n".join(paragraphs))
+    return pages
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+# Lines of 10pt text that fit between the top and bottom margins of a Letter page
+LINES_PER_PAGE = 56
+
+
+def write_pdf(path: str, pages: List[str]):
+    """Write a minimal text PDF (Helvetica, one content stream per page).
+
+    Text that does not fit on its page flows onto extra pages, so every clause
+    of the lease is in the PDF (which then has more pages than `pages`).
+    """
+    page_lines = []
+    for text in pages:
+        lines = []
+        for paragraph in text.split("\n\n"):
+            lines.extend(textwrap.wrap(paragraph, 90) or [""])
+            lines.append("")
+        while lines and not lines[-1]:
+            lines.pop()
+        for start in range(0, max(len(lines), 1), LINES_PER_PAGE):
+            page_lines.append(lines[start:start + LINES_PER_PAGE])
+
+    objects: List[bytes] = []
+    font_id = 1
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = 2 + 2 * len(page_lines)
+    page_ids = []
+    for lines in page_lines:
+        stream = "BT /F1 10 Tf 50 760 Td 13 TL " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode("latin-1", "replace")))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        )
+        page_ids.append(len(objects))
+    objects.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    catalog_id = len(objects)
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_corpus(out_dir: str, num_files: int, pages_per_file: int, seed: int = 0) -> List[str]:
+    """Write num_files synthetic leases to out_dir and return their paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(num_files):
+        path = os.path.join(out_dir, f"lease_{seed}_{i:04d}.pdf")
+        write_pdf(path, lease_pages(pages_per_file, seed=seed * 100003 + i))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic lease PDFs")
+    parser.add_argument("--out", default="bench_corpus")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generated = generate_corpus(args.out, args.files, args.pages, args.seed)
+    print(f"Wrote {len(generated)} lease(s) of {args.pages} page(s) to {args.out}")
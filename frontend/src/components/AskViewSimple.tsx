@@ -341,9 +341,9 @@ export default function AskViewSimple({
                     }}
                   />
                 )}
-                {answer.context_tokens && (
+                {answer.context_tokens_estimate && (
                   <Chip 
-                    label={`${answer.context_tokens} tokens analyzed`}
+                    label={`~${answer.context_tokens_estimate} tokens analyzed`}
                     style={{ background: '#f1f5f9', color: '#475569', fontWeight: 500 }}
                   />
                 )}
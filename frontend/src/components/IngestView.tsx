@@ -244,6 +244,12 @@ export default function IngestView({ docs, setDocs, isUploading, onFilesChosen,
                   }}>
                     <span>{(doc.size / 1024).toFixed(1)} KB</span>
                     <span>{doc.status}</span>
+                    {doc.progress && (
+                      <span>
+                        {doc.progress.pages_parsed}/{doc.progress.pages_total} pages • {doc.progress.chunks_upserted}/{doc.progress.chunks_produced} chunks stored
+                        {doc.progress.eta_seconds != null && ` • ~${Math.ceil(doc.progress.eta_seconds)}s left`}
+                      </span>
+                    )}
                     {doc.error && <span style={{ color: '#dc2626' }}>{doc.error}</span>}
                   </div>
                 </div>
@@ -3,6 +3,31 @@ import { AskResponse, QAItem } from '../types';
 
 const API_BASE = "http://localhost:8000"; // FastAPI backend URL
 
+// Parses a Server-Sent Events response body into {event, data} messages
+async function* readEvents(body: ReadableStream<Uint8Array>): AsyncGenerator<{ event: string; data: any }> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      const message = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = "message";
+      let data = "";
+      for (const line of message.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (data) yield { event, data: JSON.parse(data) };
+      boundary = buffer.indexOf("\n\n");
+    }
+  }
+}
+
 export const useAsk = () => {
   const [question, setQuestion] = useState("");
   const [topK, setTopK] = useState(5);
@@ -23,15 +48,35 @@ export const useAsk = () => {
     setAsking(true);
     setAnswer(null);
     try {
-      const res = await fetch(`${API_BASE}/ask`, {
+      const res = await fetch(`${API_BASE}/ask/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ question: question.trim(), top_k: topK, selected_documents: selectedDocuments }),
       });
-      const data = (await res.json()) as AskResponse;
-      if (!res.ok) throw new Error((data as any)?.detail || "Ask failed");
-      setAnswer(data);
-      setQaHistory((prev) => [{ q: question.trim(), a: data.answer, time: Date.now() }, ...prev].slice(0, 10));
+      if (!res.ok || !res.body) {
+        const data = await res.json().catch(() => ({}));
+        throw new Error((data as any)?.detail || "Ask failed");
+      }
+
+      let partial: AskResponse = { answer: "" };
+      let final: AskResponse | null = null;
+      for await (const { event, data } of readEvents(res.body)) {
+        if (event === "citations") {
+          partial = { ...partial, citations: data.citations };
+        } else if (event === "token") {
+          partial = { ...partial, answer: partial.answer + data.text };
+        } else if (event === "replace") {
+          partial = { ...partial, answer: data.text };
+        } else if (event === "final") {
+          final = data as AskResponse;
+          partial = final;
+        } else if (event === "error") {
+          throw new Error(data?.detail || "Ask failed");
+        }
+        setAnswer(partial);
+      }
+      if (!final) throw new Error("Answer stream ended unexpectedly");
+      setQaHistory((prev) => [{ q: question.trim(), a: final!.answer, time: Date.now() }, ...prev].slice(0, 10));
     } catch (e: any) {
       setAnswer({ answer: `Error: ${String(e?.message || e)}` });
     } finally {
@@ -6,6 +6,7 @@ export interface Document {
   filename: string;
   upload_time: string;
   chunks: number;
+  pages?: number | null;
 }
 
 export const useDocuments = () => {
@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import { DocItem } from '../types';
+import { DocItem, IngestJob, IngestProgress } from '../types';
 
 const API_BASE = "http://localhost:8000"; // FastAPI backend URL
 
@@ -23,6 +23,42 @@ export const useIngest = (
     await uploadFiles(Array.from(files), items.map((i) => i.id));
   };
 
+  const waitForJob = async (jobId: string): Promise<IngestJob> => {
+    while (true) {
+      const res = await fetch(`${API_BASE}/ingest/jobs/${jobId}`);
+      if (!res.ok) throw new Error(`Could not fetch ingest job ${jobId}`);
+      const job = (await res.json()) as IngestJob;
+      if (job.status === "running") {
+        setDocs((prev) => prev.map((d) => (job.files.includes(d.name) && d.status === "Parsing" ? { ...d, status: "Chunked" } : d)));
+      }
+      if (job.status === "completed" || job.status === "failed") return job;
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
+  // Follows the job's progress stream, falling back to polling if the stream is unavailable
+  const followJob = (jobId: string, ids: string[]): Promise<IngestJob> =>
+    new Promise((resolve, reject) => {
+      const source = new EventSource(`${API_BASE}/ingest/jobs/${jobId}/events`);
+      source.addEventListener("progress", (e) => {
+        const { status, progress } = JSON.parse((e as MessageEvent).data) as { status: IngestJob["status"]; progress?: IngestProgress | null };
+        if (status !== "running" || !progress) return;
+        setDocs((prev) =>
+          prev.map((d) =>
+            ids.includes(d.id) ? { ...d, status: progress.chunks_produced > 0 ? "Chunked" : "Parsing", progress } : d
+          )
+        );
+      });
+      source.addEventListener("done", (e) => {
+        source.close();
+        resolve(JSON.parse((e as MessageEvent).data) as IngestJob);
+      });
+      source.onerror = () => {
+        source.close();
+        waitForJob(jobId).then(resolve, reject);
+      };
+    });
+
   const uploadFiles = async (files: File[], ids: string[]) => {
     setIsUploading(true);
     setDocs((prev) => prev.map((d) => (ids.includes(d.id) ? { ...d, status: "Parsing" } : d)));
@@ -32,19 +68,34 @@ export const useIngest = (
 
     try {
       const res = await fetch(`${API_BASE}/ingest`, { method: "POST", body: form });
+      const data = await res.json().catch(() => ({}));
+      // Files that failed the upload preflight (encrypted, image-only, unreadable...)
+      const rejected: Record<string, string> = (res.ok ? data?.rejected : data?.detail?.rejected) || {};
+      setDocs((prev) =>
+        prev.map((d) => (ids.includes(d.id) && rejected[d.name] ? { ...d, status: "Error", error: rejected[d.name] } : d))
+      );
       if (!res.ok) {
-        const data = await res.json().catch(() => ({}));
-        throw new Error(data?.detail || "Ingest failed");
+        throw new Error(data?.detail?.message || data?.detail || "Ingest failed");
       }
 
-      setDocs((prev) => prev.map((d) => (ids.includes(d.id) ? { ...d, status: "Chunked" } : d)));
-      setTimeout(() => {
-        setDocs((prev) => prev.map((d) => (ids.includes(d.id) ? { ...d, status: "Embedded" } : d)));
-      }, 400);
+      if (!data?.job_id) throw new Error(data?.error || "Ingest failed");
+      const accepted = ids.filter((id, i) => !rejected[files[i].name]);
+      const job = await followJob(data.job_id, accepted);
+
+      setDocs((prev) =>
+        prev.map((d) => {
+          if (!accepted.includes(d.id)) return d;
+          const result = job.results?.[d.name];
+          if (job.status === "failed" || result?.status === "failed") {
+            return { ...d, status: "Error", error: result?.error || job.error || "Processing failed", progress: undefined };
+          }
+          return { ...d, status: "Embedded", progress: undefined };
+        })
+      );
 
-      pushLog(`Ingested ${files.length} file(s).`);
+      pushLog(job.status === "completed" ? `Ingested ${accepted.length} file(s).` : `Ingest job failed: ${job.error || "see file errors"}`);
     } catch (e: any) {
-      setDocs((prev) => prev.map((d) => (ids.includes(d.id) ? { ...d, status: "Error", error: String(e?.message || e) } : d)));
+      setDocs((prev) => prev.map((d) => (ids.includes(d.id) && d.status !== "Error" ? { ...d, status: "Error", error: String(e?.message || e) } : d)));
       pushLog(`Ingest error: ${String((e && e.message) || e)}`);
     } finally {
       setIsUploading(false);
@@ -8,6 +8,41 @@ export interface DocItem {
   size: number;
   status: DocStatus;
   error?: string;
+  progress?: IngestProgress;
+}
+
+export interface IngestFileResult {
+  status: "processed" | "unchanged" | "failed";
+  pages?: number;
+  chunks?: number;
+  error?: string;
+}
+
+export interface IngestProgress {
+  files_total: number;
+  files_done: number;
+  pages_total: number;
+  pages_parsed: number;
+  chunks_produced: number;
+  chunks_embedded: number;
+  chunks_upserted: number;
+  current_file?: string | null;
+  elapsed_seconds: number;
+  eta_seconds?: number | null;
+}
+
+export interface IngestJob {
+  job_id: string;
+  status: "queued" | "running" | "completed" | "failed";
+  files: string[];
+  results?: Record<string, IngestFileResult>;
+  stats?: {
+    total_chunks?: number;
+    embedding_cache?: { hits: number; misses: number };
+  };
+  timings?: Record<string, number>;
+  progress?: IngestProgress | null;
+  error?: string | null;
 }
 
 export interface Citation {
@@ -20,8 +55,9 @@ export interface AskResponse {
   answer: string;
   citations?: Citation[];
   confidence?: "high" | "medium" | "low";
-  context_tokens?: number;
+  context_tokens_estimate?: number;
   source_documents?: string[];
+  cached?: boolean;
 }
 
 export interface QAItem {
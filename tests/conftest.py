@@ -0,0 +1,63 @@
+import os
+import time
+import tempfile
+from typing import List
+
+import pytest
+
+# app.ai_service builds a global service on import; keep the files it creates out of the checkout
+_scratch = tempfile.mkdtemp(prefix="documind-tests-")
+os.environ.setdefault("DOCUMENT_REGISTRY_PATH", os.path.join(_scratch, "documents.sqlite3"))
+os.environ.setdefault("PAGE_STORE_DIR", os.path.join(_scratch, "pages"))
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["HF_HUB_OFFLINE"] = "1"
+os.environ["WARM_UP_ON_STARTUP"] = "false"
+
+from benchmarks.synthetic_leases import write_pdf  # noqa: E402
+from tests.helpers import HashingEmbeddings  # noqa: E402
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Write a text PDF into the uploads directory and return its path"""
+    def make(filename: str, pages: List[str]) -> str:
+        path = os.path.join(str(tmp_path), "uploads", filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_pdf(path, pages)
+        return path
+    return make
+
+
+@pytest.fixture
+def service_factory(tmp_path, monkeypatch):
+    """LegalAIService instances sharing one working directory (like worker processes of one server)"""
+    from app import ai_service as ai_service_module
+
+    monkeypatch.chdir(tmp_path)
+    # Every file relative to the test's directory, whatever the developer's .env says
+    for name in ("DOCUMENT_REGISTRY_PATH", "PAGE_STORE_DIR", "EMBEDDING_CACHE_PATH", "ANSWER_CACHE_PATH",
+                 "FLAT_INDEX_DIR", "VECTOR_STORE_BACKEND", "WEB_CONCURRENCY", "RERANK_ENABLED"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("PDF_PARSE_WORKERS", "1")
+    monkeypatch.setenv("PDF_PREFLIGHT_WORKERS", "0")
+    monkeypatch.setenv("REINDEX_DROP_GRACE_SECONDS", "0")
+    monkeypatch.setenv("REINDEX_DUTY_CYCLE", "1")
+    monkeypatch.setattr(ai_service_module, "HuggingFaceEmbeddings", HashingEmbeddings)
+    services = []
+
+    def create():
+        service = ai_service_module.LegalAIService()
+        services.append(service)
+        return service
+
+    yield create
+    for service in services:
+        deadline = time.monotonic() + 10
+        while service.reindexer.status()["state"] == "running" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        service.parse_pool.shutdown()
+
+
+@pytest.fixture
+def service(service_factory):
+    return service_factory()
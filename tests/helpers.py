@@ -0,0 +1,42 @@
+import json
+import hashlib
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words vectors (unit length), standing in for the sentence-transformers model"""
+
+    DIM = 64
+
+    def __init__(self, model_name: str = "hashing", **kwargs):
+        self.model_name = model_name
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.DIM
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.DIM] += 1.0
+        norm = sum(x * x for x in vector) ** 0.5 or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def lease_pages(name: str, count: int, words: int = 60) -> List[str]:
+    """Distinct page texts for a test lease"""
+    return [f"{name} lease page {page}. Monthly rent {1000 + page} dollars. " + f"clause{page} " * words
+            for page in range(count)]
+
+
+def events(response):
+    """(event, data) pairs of a Server-Sent Events response"""
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        parsed.append((lines["event"], json.loads(lines["data"])))
+    return parsed
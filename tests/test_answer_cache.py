@@ -0,0 +1,68 @@
+import pytest
+
+from app import answer_cache
+from app.answer_cache import AnswerCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache.time, "time", clock.time)
+    return clock
+
+
+def test_keys_normalize_the_question_and_include_the_corpus_version():
+    cache = AnswerCache()
+    key = cache.make_key("What is the rent?", 5, ["b.pdf", "a.pdf"], "1-3")
+
+    assert cache.make_key("  what is   the RENT ", 5, ["a.pdf", "b.pdf"], "1-3") == key
+    assert cache.make_key("What is the rent?", 5, ["a.pdf", "b.pdf"], "1-4") != key
+    assert cache.make_key("What is the rent?", 6, ["a.pdf", "b.pdf"], "1-3") != key
+    assert cache.make_key("What is the rent?", 5, ["a.pdf", "acme/b.pdf"], "1-3") != key
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = AnswerCache(ttl_seconds=60)
+    cache.set("k", {"answer": "42"})
+
+    clock.now += 59
+    assert cache.get("k") == {"answer": "42"}
+    clock.now += 2
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = AnswerCache(max_entries=2)
+    cache.set("a", {"answer": "a"})
+    cache.set("b", {"answer": "b"})
+    assert cache.get("a") is not None
+
+    cache.set("c", {"answer": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"answer": "a"}
+    assert cache.get("c") == {"answer": "c"}
+
+
+def test_disk_cache_is_shared_and_survives_clear_memory(tmp_path, clock):
+    path = str(tmp_path / "answers.sqlite3")
+    writer, reader = AnswerCache(disk_path=path, ttl_seconds=60), AnswerCache(disk_path=path, ttl_seconds=60)
+    writer.set("k", {"answer": "shared"})
+
+    assert reader.get("k") == {"answer": "shared"}
+    writer.clear_memory()
+    assert writer.get("k") == {"answer": "shared"}
+    clock.now += 61
+    assert reader.get("k") is None
+
+    writer.set("k2", {"answer": "x"})
+    writer.clear()
+    assert reader.get("k2") is None
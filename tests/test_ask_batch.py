@@ -0,0 +1,37 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from tests.helpers import events, lease_pages
+
+
+@pytest.fixture
+def client(service, make_pdf, monkeypatch):
+    service.ingest_documents([make_pdf("lease.pdf", lease_pages("alpha", 3))])
+    monkeypatch.setattr(main, "ai_service", service)
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("questions", [[], ["a?", "b?", "c?"]])
+def test_question_count_is_limited(client, monkeypatch, questions):
+    monkeypatch.setattr(main, "ASK_BATCH_MAX_QUESTIONS", 2)
+
+    assert client.post("/ask/batch", json={"questions": questions}).status_code == 400
+
+
+def test_batch_streams_a_result_per_question_then_done(client):
+    questions = ["What is the monthly rent?", "Which clauses apply?", "what is the  MONTHLY rent"]
+
+    first = events(client.post("/ask/batch", json={"questions": questions}))
+    second = events(client.post("/ask/batch", json={"questions": questions[:2] + ["Who is the tenant?"]}))
+
+    assert [event for event, _ in first] == ["result"] * 3 + ["done"]
+    assert sorted(data["index"] for _, data in first[:3]) == [0, 1, 2]
+    assert first[-1][1]["questions"] == 3 and first[-1][1]["answered"] == 3
+    # Cached answers are sent before any new question is answered
+    assert [(data["index"], data["cached"]) for _, data in second[:3]] == [(0, True), (1, True), (2, False)]
+    assert second[-1][0] == "done" and second[-1][1]["cached"] == 2
+
+
+def test_batch_rejects_an_invalid_namespace(client):
+    assert client.post("/ask/batch", json={"questions": ["a?"], "namespace": "../x"}).status_code == 400
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+import pytest
+
+from app.concurrency import ConcurrencyLimiter, ServiceBusyError
+
+
+def test_limits_concurrent_calls_and_releases_every_slot():
+    limiter = ConcurrencyLimiter("test", 2, queue_timeout=5)
+    peak = 0
+
+    def work():
+        nonlocal peak
+        peak = max(peak, limiter.stats()["in_flight"])
+        time.sleep(0.05)
+        return True
+
+    async def main():
+        return await asyncio.gather(*(limiter.run(work) for _ in range(6)))
+
+    assert asyncio.run(main()) == [True] * 6
+    assert peak == 2
+    assert limiter.stats() == {"max_concurrency": 2, "in_flight": 0, "waiting": 0}
+    limiter.shutdown()
+
+
+def test_waiting_past_the_queue_timeout_raises_busy_without_leaking_a_slot():
+    limiter = ConcurrencyLimiter("test", 1, queue_timeout=0.05)
+
+    async def main():
+        async with limiter.slot():
+            with pytest.raises(ServiceBusyError):
+                async with limiter.slot():
+                    pass
+        # The slot is free again once the holder leaves
+        async with limiter.slot():
+            return limiter.stats()
+
+    assert asyncio.run(main())["in_flight"] == 1
+    # A new event loop gets its own semaphore
+    assert asyncio.run(main())["in_flight"] == 1
+    assert limiter.stats()["waiting"] == 0
+    limiter.shutdown()
@@ -0,0 +1,69 @@
+from langchain.schema import Document
+
+from app import ai_service as ai_service_module
+from app.context_packer import pack_context
+from app.pdf_parsing import split_page
+from tests.helpers import lease_pages
+
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+def chunks_of(text, source="lease.pdf", page=0, chunk_size=1200, chunk_overlap=500):
+    config = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "separators": SEPARATORS}
+    return split_page(text, page, source, config)["chunks"]
+
+
+def test_chunks_are_merged_back_into_the_page_text_up_to_the_splitter_overlap():
+    text = " ".join(f"word{n}" for n in range(1200))
+    chunks = chunks_of(text)
+    assert len(chunks) > 2
+
+    packed = pack_context(list(reversed(chunks)), len, 100000, max_overlap=500)
+
+    assert packed["context"] == f"Document: lease.pdf (Page: 0)\n{text}"
+    assert packed["stats"]["segments"] == 1
+    assert packed["stats"]["overlap_chars_removed"] > 400 * (len(chunks) - 1)
+
+
+def test_a_smaller_max_overlap_misses_longer_overlaps():
+    chunks = chunks_of(" ".join(f"word{n}" for n in range(1200)))
+
+    packed = pack_context(chunks, len, 100000, max_overlap=100)
+
+    assert packed["stats"]["overlap_chars_removed"] == 0
+
+
+def test_segments_fill_the_budget_in_priority_order():
+    docs = [
+        Document(page_content=text, metadata={"source": "lease.pdf", "page": page})
+        for page, text in enumerate(lease_pages("alpha", 3))
+    ]
+    block = len(f"Document: lease.pdf (Page: 0)\n{docs[0].page_content}")
+
+    packed = pack_context([docs[2], docs[0], docs[1]], len, 2 * block + 10, max_overlap=200)
+
+    assert [doc.metadata["page"] for doc in packed["docs"]] == [2, 0]
+    assert packed["stats"]["segments_dropped"] == 1
+    assert packed["stats"]["context_tokens_estimate"] <= 2 * block + 10
+
+
+def test_first_segment_is_kept_even_over_budget():
+    doc = Document(page_content="x" * 500, metadata={"source": "lease.pdf", "page": 0})
+
+    packed = pack_context([doc], len, 10, max_overlap=200)
+
+    assert packed["docs"] == [doc]
+
+
+def test_service_packs_with_the_active_chunk_overlap(service, make_pdf, monkeypatch):
+    service.ingest_documents([make_pdf("lease.pdf", lease_pages("alpha", 2))])
+    overlaps = []
+
+    def spy(*args, **kwargs):
+        overlaps.append(kwargs["max_overlap"])
+        return pack_context(*args, **kwargs)
+
+    monkeypatch.setattr(ai_service_module, "pack_context", spy)
+    service.ask_question("What is the monthly rent?")
+
+    assert overlaps == [service.splitter_config["chunk_overlap"]]
@@ -0,0 +1,88 @@
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from app.embedding_cache import CachedEmbeddings
+
+
+class AsymmetricEmbeddings(Embeddings):
+    """Embeds queries and documents differently, as E5/BGE-style models do"""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(("documents", list(texts)))
+        return [[1.0, float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls.append(("query", text))
+        return [0.0, float(len(text))]
+
+
+def cached(tmp_path, model):
+    return CachedEmbeddings(model, model_name="asymmetric", cache_path=str(tmp_path / "cache.sqlite3"))
+
+
+def test_documents_are_embedded_once(tmp_path):
+    model = AsymmetricEmbeddings()
+    embeddings = cached(tmp_path, model)
+
+    first = embeddings.embed_documents(["rent", "deposit", "rent"])
+    second = cached(tmp_path, model).embed_documents(["deposit", "rent"])
+
+    assert model.calls == [("documents", ["rent", "deposit"])]
+    assert second == [first[1], first[0]]
+    assert embeddings.stats()["misses"] == 2 and embeddings.stats()["hits"] == 1
+
+
+class RecordingClient:
+    """Stands in for the SentenceTransformer inside HuggingFaceEmbeddings"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[1.0, float(len(text))] for text in texts])
+
+
+def test_queries_are_cached_in_memory_apart_from_documents(tmp_path):
+    model = AsymmetricEmbeddings()
+    embeddings = cached(tmp_path, model)
+    document_vector = embeddings.embed_documents(["rent"])[0]
+
+    vectors = embeddings.embed_queries(["rent", "deposit", "rent"])
+
+    assert vectors[0] == vectors[2] == [0.0, 4.0] != document_vector
+    assert [call for call in model.calls if call[0] == "query"] == [("query", "rent"), ("query", "deposit")]
+    assert embeddings.embed_query("deposit") == vectors[1]
+    assert len(model.calls) == 3
+    # Nothing about questions reaches the database or the ingest statistics
+    assert embeddings._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone() == (1,)
+    assert embeddings.stats()["misses"] == 1 and embeddings.stats()["hits"] == 0
+
+
+def test_query_cache_is_bounded(tmp_path):
+    model = AsymmetricEmbeddings()
+    embeddings = CachedEmbeddings(model, "asymmetric", cache_path=str(tmp_path / "cache.sqlite3"), max_query_entries=2)
+
+    embeddings.embed_queries(["a", "b"])
+    embeddings.embed_query("a")
+    embeddings.embed_query("c")
+
+    assert list(embeddings._query_vectors) == ["a", "c"]
+
+
+def test_query_misses_go_to_the_sentence_transformer_in_one_call(tmp_path):
+    model = HuggingFaceEmbeddings.model_construct(model_name="fake")
+    model._client = RecordingClient()
+    embeddings = CachedEmbeddings(model, "fake", cache_path=str(tmp_path / "cache.sqlite3"))
+    embeddings.embed_query("rent")
+
+    vectors = embeddings.embed_queries(["deposit", "rent", "term", "deposit"])
+
+    assert model._client.calls == [["rent"], ["deposit", "term"]]
+    assert vectors == [[1.0, 7.0], [1.0, 4.0], [1.0, 4.0], [1.0, 7.0]]
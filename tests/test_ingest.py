@@ -0,0 +1,137 @@
+import os
+import threading
+
+from app.pdf_parsing import chunk_id
+from tests.helpers import lease_pages
+
+
+def stored_ids(service, filename):
+    entry = service.registry.get(filename)
+    return sorted(chunk_id(filename, page, i) for page, count in enumerate(entry["page_chunks"]) for i in range(count))
+
+
+def lexical_ids(service, source):
+    return sorted(service.lexical_index._ids_by_source.get(source, ()))
+
+
+def test_ingest_stores_every_page(service, make_pdf):
+    path = make_pdf("lease.pdf", lease_pages("alpha", 3))
+
+    result = service.ingest_documents([path])
+
+    entry = service.registry.get("lease.pdf")
+    assert result["files"]["lease.pdf"]["status"] == "processed"
+    assert entry["pages"] == 3 and len(entry["page_hashes"]) == 3
+    assert sorted(service.vector_store.get()["ids"]) == stored_ids(service, "lease.pdf")
+    assert lexical_ids(service, "lease.pdf") == stored_ids(service, "lease.pdf")
+
+
+def test_reingest_only_replaces_changed_pages(service, make_pdf):
+    pages = lease_pages("alpha", 3)
+    service.ingest_documents([make_pdf("lease.pdf", pages)])
+    before = service.registry.get("lease.pdf")
+    untouched = service.vector_store.get(ids=[chunk_id("lease.pdf", 0, 0)])["documents"]
+
+    pages[1] = "beta amended page. Rent is now 2000 dollars. " + "amended " * 150
+    result = service.ingest_documents([make_pdf("lease.pdf", pages)])["files"]["lease.pdf"]
+
+    after = service.registry.get("lease.pdf")
+    assert result["pages_changed"] == 1
+    assert result["chunks_removed"] == before["page_chunks"][1]
+    assert result["chunks_added"] == after["page_chunks"][1]
+    assert after["page_hashes"][0] == before["page_hashes"][0] and after["page_hashes"][1] != before["page_hashes"][1]
+    assert service.vector_store.get(ids=[chunk_id("lease.pdf", 0, 0)])["documents"] == untouched
+    assert sorted(service.vector_store.get()["ids"]) == stored_ids(service, "lease.pdf")
+    assert lexical_ids(service, "lease.pdf") == stored_ids(service, "lease.pdf")
+
+
+def test_removed_trailing_pages_are_deleted(service, make_pdf):
+    pages = lease_pages("alpha", 4)
+    service.ingest_documents([make_pdf("lease.pdf", pages)])
+
+    result = service.ingest_documents([make_pdf("lease.pdf", pages[:2])])["files"]["lease.pdf"]
+
+    assert result["pages_changed"] == 2 and result["chunks_added"] == 0
+    assert service.registry.get("lease.pdf")["pages"] == 2
+    assert sorted(service.vector_store.get()["ids"]) == stored_ids(service, "lease.pdf")
+
+
+def test_identical_upload_is_unchanged(service, make_pdf):
+    path = make_pdf("lease.pdf", lease_pages("alpha", 2))
+    service.ingest_documents([path])
+
+    result = service.ingest_documents([path])
+
+    assert result["files"]["lease.pdf"]["status"] == "unchanged"
+    assert result["total_chunks"] == 0
+
+
+def test_files_ingested_in_parallel_keep_their_own_pages(service, make_pdf):
+    service.ingest_parallel_files = 3
+    paths = [make_pdf(f"lease{n}.pdf", lease_pages(f"tenant{n}", 3)) for n in range(5)]
+
+    result = service.ingest_documents(paths)
+
+    assert list(result["files"]) == [f"lease{n}.pdf" for n in range(5)]
+    assert all(f["status"] == "processed" for f in result["files"].values())
+    all_ids = sorted(i for n in range(5) for i in stored_ids(service, f"lease{n}.pdf"))
+    assert sorted(service.vector_store.get()["ids"]) == all_ids
+    assert service._source_locks == {}
+
+
+def test_remove_document_drops_vectors_lexical_entries_and_lock(service, make_pdf):
+    service.ingest_documents([make_pdf("a.pdf", lease_pages("a", 2)), make_pdf("b.pdf", lease_pages("b", 2))])
+
+    service.remove_document("a.pdf")
+
+    assert service.registry.get("a.pdf") is None
+    assert all(not doc_id.startswith("a.pdf") for doc_id in service.vector_store.get()["ids"])
+    assert lexical_ids(service, "a.pdf") == []
+    assert service._source_locks == {}
+
+
+def test_delete_endpoint_waits_for_an_ingest_of_the_same_file(service, make_pdf, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app import main
+
+    monkeypatch.setattr(main, "ai_service", service)
+    path = make_pdf("a.pdf", lease_pages("a", 2))
+    service.ingest_documents([path])
+
+    # One event loop for every request, as in the server
+    with TestClient(main.app) as client, service._source_lock("a.pdf"):
+        deleting = threading.Thread(target=client.delete, args=("/documents/a.pdf",))
+        deleting.start()
+        health = []
+        checking = threading.Thread(target=lambda: health.append(client.get("/health").json()))
+        checking.start()
+        checking.join(5)
+        assert service.registry.get("a.pdf") is not None
+        # The event loop stays free while the delete waits on the lock
+        assert health == [{"status": "up"}]
+    deleting.join(10)
+
+    assert service.registry.get("a.pdf") is None and not os.path.exists(path)
+
+
+def test_other_workers_pick_up_ingests_and_deletes(service_factory, make_pdf, monkeypatch):
+    # Worker processes of one server share Chroma; the flat index belongs to a single process
+    monkeypatch.setenv("VECTOR_STORE_BACKEND", "chroma")
+    writer, reader = service_factory(), service_factory()
+    assert "No documents" in reader.ask_question("What is the rent?")["answer"]
+
+    writer.ingest_documents([make_pdf("a.pdf", lease_pages("a", 2)), make_pdf("b.pdf", lease_pages("b", 2))])
+    reader.ask_question("What is the monthly rent?")
+    assert sorted(s for s, ids in reader.lexical_index._ids_by_source.items() if ids) == ["a.pdf", "b.pdf"]
+    assert sorted(reader.vector_store.get()["ids"]) == sorted(stored_ids(writer, "a.pdf") + stored_ids(writer, "b.pdf"))
+
+    writer.remove_document("a.pdf")
+    pages = lease_pages("b", 2)
+    pages[0] = "b lease now allows pets with a deposit. " + "pets " * 80
+    writer.ingest_documents([make_pdf("b.pdf", pages)])
+    reader.ask_question("Are pets allowed?")
+    assert sorted(s for s, ids in reader.lexical_index._ids_by_source.items() if ids) == ["b.pdf"]
+    assert lexical_ids(reader, "b.pdf") == stored_ids(writer, "b.pdf")
+    assert sorted(reader.vector_store.get()["ids"]) == stored_ids(writer, "b.pdf")
+    assert reader.vector_store.kind == "sharded" and reader.vector_store.shard("default").kind == "chroma"
+    assert reader.lexical_index.search("pets", 1)[0][0] == chunk_id("b.pdf", 0, 0)
@@ -0,0 +1,51 @@
+import time
+
+from app.ingest_jobs import IngestJobQueue
+
+
+def wait_until_finished(queue, job_ids, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = [queue.get_job(job_id) for job_id in job_ids]
+        if all(job["status"] in ("completed", "failed") for job in jobs):
+            return jobs
+        time.sleep(0.05)
+    raise AssertionError("jobs did not finish")
+
+
+def test_jobs_submitted_to_one_process_run_exactly_once_across_processes(tmp_path):
+    db_path = str(tmp_path / "documents.sqlite3")
+    runs = []
+
+    def process(file_paths, progress, namespace=None):
+        runs.append(tuple(file_paths))
+        progress(files_total=1, files_done=1)
+        return {"success": True, "files": {path: {"status": "processed"} for path in file_paths}}
+
+    queues = [IngestJobQueue(process, db_path=db_path, num_workers=2, poll_seconds=0.05)
+              for _ in range(2)]
+    jobs = [queues[0].submit([f"uploads/{n}.pdf"]) for n in range(8)]
+    for queue in queues:
+        queue.start()
+    try:
+        finished = wait_until_finished(queues[1], [job["job_id"] for job in jobs])
+    finally:
+        for queue in queues:
+            queue.stop()
+
+    assert all(job["status"] == "completed" for job in finished)
+    assert sorted(runs) == sorted((f"uploads/{n}.pdf",) for n in range(8))
+
+
+def test_running_job_of_a_dead_process_is_claimed_again(tmp_path):
+    db_path = str(tmp_path / "documents.sqlite3")
+    dead = IngestJobQueue(lambda *a, **k: {"success": True}, db_path=db_path, heartbeat_seconds=0.01)
+    job = dead.submit(["uploads/a.pdf"])
+    assert dead._claim()["job_id"] == job["job_id"]
+
+    time.sleep(0.1)
+    alive = IngestJobQueue(lambda *a, **k: {"success": True}, db_path=db_path, heartbeat_seconds=0.01)
+    claimed = alive._claim()
+
+    assert claimed["job_id"] == job["job_id"]
+    assert alive._claim() is None
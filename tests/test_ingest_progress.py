@@ -0,0 +1,59 @@
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.ingest_jobs import IngestJobQueue, IngestProgress
+from tests.helpers import events, lease_pages
+
+
+def test_snapshot_estimates_the_remaining_time_from_page_throughput():
+    progress = IngestProgress()
+    progress._started = time.perf_counter() - 10
+
+    progress.add(files_total=1, pages_total=8)
+    progress.add(current_file="lease.pdf", pages_parsed=2)
+    snapshot = progress.snapshot()
+
+    assert snapshot["seq"] == 2
+    assert snapshot["current_file"] == "lease.pdf"
+    assert snapshot["elapsed_seconds"] == pytest.approx(10, abs=0.2)
+    assert snapshot["eta_seconds"] == pytest.approx(30, abs=0.5)
+
+
+@pytest.fixture
+def queue(service, tmp_path, monkeypatch):
+    queue = IngestJobQueue(service.ingest_documents, db_path=os.path.join(str(tmp_path), "jobs.sqlite3"),
+                           num_workers=1, poll_seconds=0.05)
+    monkeypatch.setattr(main, "ai_service", service)
+    monkeypatch.setattr(main, "ingest_queue", queue)
+    monkeypatch.setattr(main, "INGEST_PROGRESS_INTERVAL", 0.01)
+    yield queue
+    queue.stop()
+
+
+def test_events_stream_progress_then_the_finished_job(queue, make_pdf):
+    paths = [make_pdf("a.pdf", lease_pages("alpha", 3)), make_pdf("b.pdf", lease_pages("beta", 2))]
+    job = queue.submit(paths)
+    queue.start()
+
+    streamed = events(TestClient(main.app).get(f"/ingest/jobs/{job['job_id']}/events"))
+
+    names = [event for event, _ in streamed]
+    assert names[-1] == "done" and set(names[:-1]) == {"progress"}
+    done = streamed[-1][1]
+    assert done["status"] == "completed"
+    assert "file_paths" not in done
+    final = done["progress"]
+    assert final["files_total"] == final["files_done"] == 2
+    assert final["pages_total"] == final["pages_parsed"] == 5
+    assert final["chunks_produced"] == final["chunks_embedded"] == final["chunks_upserted"] == done["stats"]["total_chunks"]
+    # Each progress event carries a newer snapshot than the one before it
+    seqs = [data["progress"]["seq"] for event, data in streamed[:-1] if data["progress"]]
+    assert seqs == sorted(seqs)
+
+
+def test_unknown_job_is_404(queue):
+    assert TestClient(main.app).get("/ingest/jobs/missing/events").status_code == 404
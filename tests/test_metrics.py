@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from app import main
+from tests.helpers import lease_pages
+
+
+def scrape(client):
+    """Sample values of /metrics keyed by (name, sorted labels)"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def test_ingest_and_ask_are_counted(service, make_pdf, monkeypatch):
+    monkeypatch.setattr(main, "ai_service", service)
+    client = TestClient(main.app)
+    before = scrape(client)
+
+    result = service.ingest_documents([make_pdf("lease.pdf", lease_pages("alpha", 3))])
+    for _ in range(2):
+        assert client.post("/ask", json={"question": "What is the monthly rent?"}).status_code == 200
+    after = scrape(client)
+
+    def delta(name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        return after.get(key, 0) - before.get(key, 0)
+
+    assert delta("documind_ingested_pages_total") == 3
+    assert delta("documind_ingested_chunks_total") == result["total_chunks"]
+    for stage in ("load", "split", "embed", "upsert"):
+        assert delta("documind_ingest_stage_seconds_count", stage=stage) >= 1
+    # The second ask is answered from the cache and skips the pipeline
+    assert delta("documind_answer_cache_lookups_total", result="miss") == 1
+    assert delta("documind_answer_cache_lookups_total", result="hit") == 1
+    for stage in ("retrieve", "rerank", "prompt_build", "llm"):
+        assert delta("documind_ask_stage_seconds_count", stage=stage) == 1
+    assert delta("documind_llm_tokens_total", kind="context") > 0
+
+
+def test_rejected_uploads_count_as_preflight_errors(service, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "ai_service", service)
+    client = TestClient(main.app)
+    before = scrape(client)
+    broken = tmp_path / "uploads" / "broken.pdf"
+    broken.parent.mkdir(parents=True, exist_ok=True)
+    broken.write_bytes(b"not a pdf")
+
+    result = service.ingest_documents([str(broken)])
+
+    assert result["files"]["broken.pdf"]["status"] != "ingested"
+    key = ("documind_errors_total", (("operation", "preflight"),))
+    assert scrape(client).get(key, 0) - before.get(key, 0) == 1
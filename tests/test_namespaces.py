@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from app.document_registry import DEFAULT_NAMESPACE, document_key, split_document_key
+from tests.helpers import lease_pages
+
+
+def shard_sources(service, namespace):
+    return {metadata["source"] for metadata in service.vector_store.shard(namespace).get()["metadatas"]}
+
+
+@pytest.fixture
+def tenants(service, make_pdf):
+    """The same filename uploaded by two tenants, with different content"""
+    for namespace, name in (("acme", "alpha"), ("globex", "bravo")):
+        path = make_pdf(document_key(namespace, "lease.pdf"), lease_pages(name, 2))
+        assert service.ingest_documents([path], namespace=namespace)["success"]
+    return service
+
+
+def test_document_keys_leave_the_default_namespace_unprefixed():
+    assert document_key(DEFAULT_NAMESPACE, "lease.pdf") == "lease.pdf"
+    assert split_document_key("lease.pdf") == (DEFAULT_NAMESPACE, "lease.pdf")
+    assert split_document_key(document_key("acme", "lease.pdf")) == ("acme", "lease.pdf")
+
+
+def test_same_filename_in_two_namespaces_are_separate_documents(tenants):
+    service = tenants
+
+    assert service.registry.get("lease.pdf", "acme")["namespace"] == "acme"
+    assert service.registry.get("lease.pdf", "globex")["namespace"] == "globex"
+    assert service.registry.get("lease.pdf") is None
+    assert shard_sources(service, "acme") == {"acme/lease.pdf"}
+    assert shard_sources(service, "globex") == {"globex/lease.pdf"}
+    assert os.path.exists(os.path.join("uploads", "acme", "lease.pdf"))
+
+
+def test_deleting_one_tenants_file_keeps_the_other(tenants):
+    service = tenants
+
+    service.remove_document("lease.pdf", "acme")
+
+    assert service.registry.get("lease.pdf", "acme") is None
+    assert service.vector_store.shard("acme").count() == 0
+    assert shard_sources(service, "globex") == {"globex/lease.pdf"}
+    assert service.lexical_index._ids_by_source.get("globex/lease.pdf")
+
+
+def test_listing_filters_by_namespace(tenants):
+    listing = tenants.get_documents(namespace="globex")
+
+    assert [(doc["namespace"], doc["filename"]) for doc in listing["documents"]] == [("globex", "lease.pdf")]
+    assert tenants.get_documents()["total"] == 2
+
+
+def test_selected_documents_only_search_their_shard(tenants, monkeypatch):
+    service = tenants
+
+    def untouchable(*args, **kwargs):
+        raise AssertionError("searched a shard that holds none of the selected documents")
+
+    monkeypatch.setattr(service.vector_store.shard("acme"), "search_many", untouchable)
+    retriever = service._build_retriever(top_k=4, selected_documents=service._selected_sources(["lease.pdf"], "globex"))
+    docs = retriever.get_relevant_documents("monthly rent")
+
+    assert docs and {doc.metadata["source"] for doc in docs} == {"globex/lease.pdf"}
+
+
+def test_unselected_questions_merge_every_shard(tenants):
+    hits = tenants.vector_store.search(tenants.embeddings.embed_query("lease page monthly rent"), 8)
+
+    assert {doc.metadata["source"] for doc, _ in hits} == {"acme/lease.pdf", "globex/lease.pdf"}
+    assert [distance for _, distance in hits] == sorted(distance for _, distance in hits)
@@ -0,0 +1,88 @@
+import os
+import shutil
+
+import pytest
+
+from app.page_store import PageArtifactWriter, read_pages
+from app.pdf_parsing import page_texts
+from tests.helpers import lease_pages
+
+
+def artifacts(service):
+    return sorted(name for name in os.listdir(service.page_store.root_dir) if name.endswith(".pages"))
+
+
+def test_artifact_round_trip_and_abort(tmp_path):
+    path = str(tmp_path / "doc.pages")
+    writer = PageArtifactWriter(path)
+    for text in ["first page", "", "Prämie 1.200 € — zweite Seite"]:
+        writer.add(text)
+    assert not os.path.exists(path)
+    writer.close()
+
+    assert list(read_pages(path)) == ["first page", "", "Prämie 1.200 € — zweite Seite"]
+
+    aborted = PageArtifactWriter(str(tmp_path / "other.pages"))
+    aborted.add("partial")
+    aborted.abort()
+    assert os.listdir(str(tmp_path)) == ["doc.pages"]
+
+    (tmp_path / "bogus.pages").write_bytes(b"not an artifact")
+    with pytest.raises(ValueError):
+        list(read_pages(str(tmp_path / "bogus.pages")))
+
+
+def test_abandoned_extraction_leaves_no_artifact(make_pdf, tmp_path):
+    pdf = make_pdf("lease.pdf", lease_pages("alpha", 3))
+    artifact = str(tmp_path / "lease.pages")
+
+    pages = page_texts(pdf, artifact)
+    next(pages)
+    pages.close()
+    assert not os.path.exists(artifact)
+
+    texts = list(page_texts(pdf, artifact))
+    assert list(read_pages(artifact)) == texts
+
+
+def test_same_content_reuses_the_artifact(service, make_pdf):
+    first = make_pdf("a.pdf", lease_pages("alpha", 2))
+    service.ingest_documents([first])
+    (name,) = artifacts(service)
+
+    # Replace the stored text: an ingest that reads the artifact instead of the PDF indexes the marker
+    writer = PageArtifactWriter(os.path.join(service.page_store.root_dir, name))
+    writer.add("artifact marker text for the first page")
+    writer.add("artifact marker text for the second page")
+    writer.close()
+    second = os.path.join(os.path.dirname(first), "b.pdf")
+    shutil.copyfile(first, second)
+    service.ingest_documents([second])
+
+    texts = [service.lexical_index.get(key)[0] for key in service.lexical_index._ids_by_source["b.pdf"]]
+    assert texts and all("artifact marker" in text for text in texts)
+    assert artifacts(service) == [name]
+
+
+def test_artifact_is_released_with_its_last_document(service, make_pdf):
+    first = make_pdf("a.pdf", lease_pages("alpha", 2))
+    second = os.path.join(os.path.dirname(first), "b.pdf")
+    shutil.copyfile(first, second)
+    service.ingest_documents([first, second])
+    assert len(artifacts(service)) == 1
+
+    service.remove_document("a.pdf")
+    assert len(artifacts(service)) == 1
+    service.remove_document("b.pdf")
+    assert artifacts(service) == []
+
+
+def test_changed_upload_replaces_its_artifact(service, make_pdf):
+    service.ingest_documents([make_pdf("a.pdf", lease_pages("alpha", 2))])
+    (old,) = artifacts(service)
+
+    service.ingest_documents([make_pdf("a.pdf", lease_pages("beta", 2))])
+
+    (new,) = artifacts(service)
+    assert new != old
+    assert service.registry.get("a.pdf")["content_hash"] == new[:-len(".pages")]
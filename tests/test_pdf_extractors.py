@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+from pypdf import PdfWriter
+
+from app.pdf_extractors import (
+    ExtractionTimeoutError, PDFRejectedError, extract_pages, extraction_config, get_extractor, preflight,
+)
+from app.pdf_parsing import PDFParsePool
+from benchmarks.synthetic_leases import write_pdf
+from tests.helpers import lease_pages
+
+SPLITTER = {"chunk_size": 300, "chunk_overlap": 30, "separators": ["\n\n", "\n", ". ", " ", ""]}
+
+
+@pytest.fixture
+def pdfs(tmp_path):
+    paths = {name: str(tmp_path / f"{name}.pdf") for name in ("text", "blank", "locked", "garbage")}
+    write_pdf(paths["text"], lease_pages("alpha", 3))
+    writer = PdfWriter()
+    writer.add_blank_page(612, 792)
+    writer.write(paths["blank"])
+    writer.encrypt("secret")
+    writer.write(paths["locked"])
+    with open(paths["garbage"], "wb") as f:
+        f.write(b"not a pdf")
+    return paths
+
+
+def test_preflight_reports_structure_of_a_text_pdf(pdfs):
+    result = preflight(pdfs["text"], extraction_config("pypdf"))
+
+    assert result["pages"] == 3 and result["has_text"] and not result["encrypted"]
+
+
+@pytest.mark.parametrize("name, reason", [
+    ("blank", "no text layer"), ("locked", "password protected"), ("garbage", "Not a readable PDF"),
+])
+def test_preflight_rejects_unusable_uploads(pdfs, name, reason):
+    with pytest.raises(PDFRejectedError, match=reason):
+        preflight(pdfs[name], extraction_config("pypdf"))
+
+
+def test_preflight_enforces_the_page_limit(pdfs):
+    config = {**extraction_config("pypdf"), "max_pages": 2}
+    with pytest.raises(PDFRejectedError, match="limit is 2"):
+        preflight(pdfs["text"], config)
+
+
+def test_extractor_selection(monkeypatch):
+    assert get_extractor("pypdf").name == "pypdf"
+    monkeypatch.setenv("PDF_EXTRACTOR", "PyPDF")
+    assert extraction_config()["extractor"] == "pypdf"
+    with pytest.raises(ValueError, match="Unknown PDF_EXTRACTOR"):
+        get_extractor("ocr")
+
+
+def test_document_time_budget_stops_extraction(pdfs):
+    config = {**extraction_config("pypdf"), "document_timeout": 1e-9}
+    with pytest.raises(ExtractionTimeoutError):
+        list(extract_pages(pdfs["text"], config))
+
+
+def test_timed_out_preflight_is_killed_without_breaking_parses_or_leaking_processes(pdfs, tmp_path):
+    big = str(tmp_path / "big.pdf")
+    write_pdf(big, lease_pages("bravo", 60, words=300))
+    pool = PDFParsePool(SPLITTER, num_workers=2, extraction=extraction_config("pypdf"), preflight_workers=1)
+    try:
+        assert pool.preflight(pdfs["text"])["pages"] == 3
+        children = len(multiprocessing.active_children())
+        parsed = []
+        parser = threading.Thread(target=lambda: parsed.extend(pool.iter_pages(big)))
+        parser.start()
+
+        # Opening a FIFO nobody writes to blocks the worker, like a parser stuck in native code
+        stuck = str(tmp_path / "stuck.pdf")
+        os.mkfifo(stuck)
+        pool.extraction["preflight_timeout"] = 0.5
+        with pytest.raises(PDFRejectedError, match="took longer"):
+            pool.preflight(stuck)
+        pool.extraction["preflight_timeout"] = 30
+        parser.join(60)
+
+        assert parsed and [page["page"] for page in parsed] == list(range(len(parsed)))
+        # The killed worker was replaced by a fresh one, and no extra manager was started
+        assert pool.preflight(pdfs["text"])["pages"] == 3
+        assert len(multiprocessing.active_children()) <= children + 2
+    finally:
+        pool.shutdown()
+
+
+def test_preflight_does_not_wait_behind_parses(pdfs, tmp_path):
+    pool = PDFParsePool(SPLITTER, num_workers=2, extraction=extraction_config("pypdf"), preflight_workers=1)
+    try:
+        pool.warm_up()
+        parses = []
+        for name in ("charlie", "delta"):
+            path = str(tmp_path / f"{name}.pdf")
+            write_pdf(path, lease_pages(name, 40, words=300))
+            pages = pool.iter_pages(path)
+            next(pages)  # both parse workers are now busy
+            parses.append(pages)
+        assert pool.preflight(pdfs["text"])["seconds"] < 5
+        for pages in parses:
+            pages.close()
+    finally:
+        pool.shutdown()
@@ -0,0 +1,47 @@
+import pytest
+
+from app.pdf_parsing import PDFParsePool, chunk_source, iter_pages
+from benchmarks.synthetic_leases import write_pdf
+from tests.helpers import lease_pages
+
+SPLITTER = {"chunk_size": 300, "chunk_overlap": 30, "separators": ["\n\n", "\n", ". ", " ", ""]}
+
+
+def _summary(pages):
+    return [(page["page"], page["hash"], [(c.page_content, c.metadata) for c in page["chunks"]]) for page in pages]
+
+
+def test_worker_pool_parses_like_the_inline_parser(tmp_path):
+    paths = []
+    for name in ("alpha", "bravo"):
+        paths.append(str(tmp_path / f"{name}.pdf"))
+        write_pdf(paths[-1], lease_pages(name, 4))
+    pool = PDFParsePool(SPLITTER, num_workers=2)
+    try:
+        for path in paths:
+            pooled = list(pool.iter_pages(path))
+            assert _summary(pooled) == _summary(iter_pages(path, SPLITTER))
+            assert [page["page"] for page in pooled] == [0, 1, 2, 3]
+    finally:
+        pool.shutdown()
+
+
+def test_chunk_ids_are_stable_per_page(tmp_path):
+    path = str(tmp_path / "lease.pdf")
+    write_pdf(path, lease_pages("charlie", 2))
+
+    chunks = [chunk for page in iter_pages(path, SPLITTER) for chunk in page["chunks"]]
+
+    assert chunks[0].metadata["chunk_id"] == "lease.pdf::p0::c0"
+    assert {chunk_source(c.metadata["chunk_id"]) for c in chunks} == {"lease.pdf"}
+
+
+def test_parse_errors_are_raised_to_the_consumer(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    pool = PDFParsePool(SPLITTER, num_workers=2)
+    try:
+        with pytest.raises(RuntimeError):
+            list(pool.iter_pages(str(path)))
+    finally:
+        pool.shutdown()
@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+
+from app import main
+from app.lazy_components import LazyComponent
+
+
+def test_ready_once_every_component_is_loaded(service, monkeypatch):
+    monkeypatch.setattr(main, "ai_service", service)
+    client = TestClient(main.app)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert {name: c["status"] for name, c in response.json()["components"].items()} == {
+        "llm": "pending", "embeddings": "pending", "vector_store": "pending", "tokenizer": "pending"
+    }
+
+    service.warm_up()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    components = response.json()["components"]
+    assert all(c["status"] == "ready" and c["load_seconds"] is not None for c in components.values())
+    # Liveness never depended on the components
+    assert client.get("/health").json() == {"status": "up"}
+
+
+def test_failed_component_reports_its_error_and_retries(service, monkeypatch):
+    monkeypatch.setattr(main, "ai_service", service)
+    attempts = []
+
+    def build():
+        attempts.append(True)
+        if len(attempts) == 1:
+            raise RuntimeError("model download failed")
+        return object()
+
+    service.components.append(LazyComponent("flaky", build))
+    client = TestClient(main.app)
+
+    service.warm_up()
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["components"]["flaky"]["status"] == "failed"
+    assert response.json()["components"]["flaky"]["error"] == "model download failed"
+
+    service.warm_up()
+    assert client.get("/ready").status_code == 200
+    assert len(attempts) == 2
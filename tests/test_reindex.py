@@ -0,0 +1,53 @@
+import os
+import time
+
+from tests.helpers import lease_pages
+
+
+def wait_for(service, timeout=60):
+    deadline = time.monotonic() + timeout
+    while service.reindexer.status()["state"] == "running":
+        assert time.monotonic() < deadline, "reindex did not finish"
+        time.sleep(0.05)
+    return service.reindexer.status()
+
+
+def documents(service):
+    return {doc["filename"]: doc["chunks"] for doc in service.registry.list()["documents"]}
+
+
+def test_swap_keeps_every_document(service, make_pdf):
+    service.ingest_documents([make_pdf(f"lease{n}.pdf", lease_pages(f"tenant{n}", 3)) for n in range(3)])
+    old_collection = service.index["collection"]
+
+    service.start_reindex(chunk_size=300, chunk_overlap=30)
+    status = wait_for(service)
+
+    assert status["state"] == "completed", status
+    assert service.index["collection"] != old_collection
+    assert service.index["splitter_config"]["chunk_size"] == 300
+    chunks = documents(service)
+    assert sorted(chunks) == ["lease0.pdf", "lease1.pdf", "lease2.pdf"]
+    assert service.vector_store.count() == sum(chunks.values())
+    assert len(service.lexical_index) == sum(chunks.values())
+    citations = service.ask_question("What rent does tenant1 pay?")["citations"]
+    assert citations and all(c["source"] in chunks for c in citations)
+
+
+def test_failed_rebuild_leaves_the_active_index_in_place(service, make_pdf):
+    service.ingest_documents([make_pdf(f"lease{n}.pdf", lease_pages(f"tenant{n}", 2)) for n in range(3)])
+    old_collection, before = service.index["collection"], documents(service)
+    # Neither the page artifact nor the upload can be read any more
+    broken = service.registry.get("lease1.pdf")
+    os.remove(service.page_store.path(broken["content_hash"]))
+    with open(os.path.join("uploads", "lease1.pdf"), "wb") as f:
+        f.write(b"not a pdf")
+
+    service.start_reindex(chunk_size=300, chunk_overlap=30)
+    status = wait_for(service)
+
+    assert status["state"] == "failed"
+    assert [f["filename"] for f in status["failed_files"]] == ["lease1.pdf"]
+    assert service.index["collection"] == old_collection
+    assert documents(service) == before
+    assert service.vector_store.count() == sum(before.values())
@@ -0,0 +1,98 @@
+import time
+
+from langchain.schema import Document
+
+from app.lazy_components import LazyComponent
+from app.reranker import CrossEncoderReranker
+from tests.helpers import lease_pages
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how often the question's words appear in the chunk"""
+
+    def __init__(self, seconds_per_pair: float = 0.0, fail: bool = False):
+        self.seconds_per_pair = seconds_per_pair
+        self.fail = fail
+        self.pairs = []
+
+    def predict(self, pairs):
+        if self.fail:
+            raise RuntimeError("model crashed")
+        time.sleep(self.seconds_per_pair * len(pairs))
+        self.pairs.extend(pairs)
+        return [sum(text.count(word) for word in question.split()) for question, text in pairs]
+
+
+def ready_model(model):
+    component = LazyComponent("reranker", lambda: model)
+    component.set(model)
+    return component
+
+
+def chunks(*texts):
+    return [Document(page_content=text, metadata={"source": "lease.pdf", "chunk_id": f"c{i}"}, id=f"c{i}")
+            for i, text in enumerate(texts)]
+
+
+def test_orders_by_score_and_caches_pairs():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(ready_model(model), budget_ms=10000, batch_size=2)
+    docs = chunks("parking", "rent rent", "rent", "utilities")
+
+    first = reranker.rerank("rent", docs, top_k=2)
+    second = reranker.rerank("rent", docs, top_k=2)
+
+    assert [doc.id for doc in first["docs"]] == ["c1", "c2"]
+    assert first["scores"] == [2.0, 1.0]
+    assert first["cache_hits"] == 0 and second["cache_hits"] == 4
+    assert len(model.pairs) == 4
+
+
+def test_falls_back_while_the_model_loads():
+    started = []
+    component = LazyComponent("reranker", lambda: started.append(True) or FakeCrossEncoder())
+    reranker = CrossEncoderReranker(component, budget_ms=10000)
+
+    assert reranker.rerank("rent", chunks("rent"), top_k=1) is None
+    reranker._loading.join(5)
+    assert started and component.ready
+    assert reranker.rerank("rent", chunks("rent"), top_k=1) is not None
+
+
+def test_falls_back_once_the_budget_would_run_out_and_keeps_scored_pairs():
+    model = FakeCrossEncoder(seconds_per_pair=0.02)
+    reranker = CrossEncoderReranker(ready_model(model), budget_ms=60, batch_size=2)
+    docs = chunks("rent", "deposit", "rent term", "parking", "pets", "notice")
+
+    # The first batch measures the speed; the next batch would not fit in what is left
+    assert reranker.rerank("rent", docs, top_k=3) is None
+    assert len(model.pairs) == 2
+
+    reranker.budget_ms = 10000
+    result = reranker.rerank("rent", docs, top_k=3)
+    assert result["cache_hits"] == 2
+    assert len(model.pairs) == 6
+
+
+def test_model_errors_fall_back():
+    reranker = CrossEncoderReranker(ready_model(FakeCrossEncoder(fail=True)), budget_ms=10000)
+
+    assert reranker.rerank("rent", chunks("rent"), top_k=1) is None
+
+
+def test_ask_reports_rerank_and_fallback(service_factory, make_pdf, monkeypatch):
+    monkeypatch.setenv("RERANK_ENABLED", "true")
+    monkeypatch.setenv("RERANK_CANDIDATES", "6")
+    service = service_factory()
+    service.ingest_documents([make_pdf("lease.pdf", lease_pages("alpha", 4))])
+
+    service.reranker.model = ready_model(FakeCrossEncoder())
+    reranked = service.ask_question("What is the monthly rent?", top_k=2)
+    assert reranked["retrieval_timings"]["rerank"]["candidates"] > 2
+    assert len(reranked["retrieval_timings"]["rerank"]["scores"]) == 2
+
+    # A new question: pairs scored above are served from the score cache
+    service.reranker.model = ready_model(FakeCrossEncoder(fail=True))
+    fallback = service.ask_question("When does the lease end?", top_k=2)
+    assert fallback["retrieval_timings"]["rerank"] == {"fallback": True}
+    assert len(fallback["citations"]) == 2
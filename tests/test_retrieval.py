@@ -0,0 +1,91 @@
+from langchain.schema import Document
+
+from app.lexical_index import BM25Index
+from app.retrieval import HybridRetriever
+
+
+class FixedVectorStore:
+    """Returns the same (chunk id, distance) hits for every query"""
+
+    def __init__(self, hits, scale: float = 1.0):
+        self.hits = hits
+        self.scale = scale
+
+    def search(self, query_embedding, k, sources=None):
+        return [
+            (Document(page_content=f"text of {key}", metadata={"source": "lease.pdf", "chunk_id": key}, id=key), distance)
+            for key, distance in self.hits[:k]
+        ]
+
+
+def lexical(*texts):
+    index = BM25Index()
+    index.add_many((key, text, {"source": "lease.pdf", "chunk_id": key}) for key, text in texts)
+    return index
+
+
+def retriever(store, index, **kwargs):
+    kwargs.setdefault("top_k", 10)
+    return HybridRetriever(store, index, **kwargs)
+
+
+UNIT = [1.0, 0.0]
+
+
+def test_rrf_sums_reciprocal_ranks_of_both_legs():
+    store = FixedVectorStore([("a", 0.1), ("b", 0.2), ("c", 0.3)])
+    index = lexical(("c", "security deposit refund"), ("d", "security deposit"), ("a", "parking"))
+    r = retriever(store, index, rrf_k=60)
+
+    docs = r.get_relevant_documents("security deposit", query_embedding=UNIT)
+
+    # c: vector rank 3 + lexical rank 1 or 2; a: vector rank 1 only; d: lexical only
+    fused = {score["chunk_id"]: score["fused"] for score in r.timings["scores"]}
+    assert fused["a"] == round(1 / 61, 5)
+    assert fused["c"] > fused["a"] > fused["b"]
+    assert [doc.id or doc.metadata["chunk_id"] for doc in docs][0] == "c"
+    assert set(fused) == {"a", "b", "c", "d"}
+
+
+def test_fused_order_follows_scores_and_is_cut_to_top_k():
+    store = FixedVectorStore([("a", 0.1), ("b", 0.2), ("c", 0.3), ("d", 0.4)])
+    r = retriever(store, lexical(), top_k=2)
+
+    docs = r.get_relevant_documents("anything", query_embedding=UNIT)
+
+    assert [doc.id for doc in docs] == ["a", "b"]
+    assert r.timings["dropped"]["top_k"] == 2
+    scores = [score["fused"] for score in r.timings["scores"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_lexical_only_hits_come_from_the_lexical_index():
+    r = retriever(FixedVectorStore([]), lexical(("x", "holdover tenancy penalty")))
+
+    docs = r.get_relevant_documents("holdover", query_embedding=UNIT)
+
+    assert [doc.id for doc in docs] == ["x"]
+    assert docs[0].page_content == "holdover tenancy penalty"
+
+
+def test_distance_cuts_apply_to_normalized_embeddings_only():
+    hits = [("a", 0.5), ("b", 0.6), ("c", 1.4), ("d", 1.5)]
+    normalized = retriever(FixedVectorStore(hits), lexical(), max_distance=1.3, min_k=1)
+    normalized.get_relevant_documents("q", query_embedding=UNIT)
+    assert normalized.timings["dropped"]["threshold"] == 2
+
+    raw = retriever(FixedVectorStore(hits), lexical(), max_distance=1.3, score_gap=0.05, min_k=1)
+    docs = raw.get_relevant_documents("q", query_embedding=[3.0, 4.0])
+    assert len(docs) == 4
+    assert raw.timings["dropped"]["threshold"] == raw.timings["dropped"]["gap"] == 0
+
+
+def test_score_gap_keeps_min_k_hits():
+    store = FixedVectorStore([("a", 0.1), ("b", 0.9), ("c", 0.95)])
+    r = retriever(store, lexical(), score_gap=0.2, min_k=2)
+
+    docs = r.get_relevant_documents("q", query_embedding=UNIT)
+
+    assert [doc.id for doc in docs] == ["a", "b", "c"]
+    r = retriever(store, lexical(), score_gap=0.2, min_k=1)
+    assert [doc.id for doc in r.get_relevant_documents("q", query_embedding=UNIT)] == ["a"]
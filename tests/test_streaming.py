@@ -0,0 +1,54 @@
+import asyncio
+
+from app.ai_service import _StreamingAnswerFormatter
+from tests.helpers import lease_pages
+
+
+def rebuild(events):
+    """The answer text a client shows after applying token and replace events, as useAsk does"""
+    text = ""
+    for event in events:
+        if event["event"] == "token":
+            text += event["data"]["text"]
+        elif event["event"] == "replace":
+            text = event["data"]["text"]
+    return text
+
+
+class Uppercasing:
+    """Formatting where a later "!" line rewrites every line before it, so emitted text has to be replaced"""
+
+    def _post_process_answer(self, answer, citations):
+        lines = answer.split("\n")
+        shout = max((i for i, line in enumerate(lines) if line.startswith("!")), default=0)
+        return "\n".join(line.upper() if i < shout else line for i, line in enumerate(lines))
+
+
+def test_token_and_replace_events_rebuild_the_final_answer():
+    formatter = _StreamingAnswerFormatter(Uppercasing(), [])
+    events = []
+    for piece in ["first li", "ne\nsecond", " line\n", "!shout\nthird\n", "tail"]:
+        events.extend(formatter.feed(piece))
+    final = Uppercasing()._post_process_answer(formatter.raw_answer, [])
+    events.extend(formatter.finish(final))
+
+    assert {event["event"] for event in events} == {"token", "replace"}
+    assert rebuild(events) == final
+
+
+def test_streamed_answer_matches_the_final_event(service, make_pdf):
+    service.ingest_documents([make_pdf("lease.pdf", lease_pages("alpha", 3))])
+
+    async def collect():
+        return [event async for event in service.aask_question_stream("What is the monthly rent?")]
+
+    events = asyncio.run(collect())
+
+    assert events[0]["event"] == "citations"
+    assert events[-1]["event"] == "final" and events[-1]["data"]["cached"] is False
+    assert rebuild(events) == events[-1]["data"]["answer"]
+    assert events[-1]["data"]["answer"]
+
+    cached = asyncio.run(collect())
+    assert cached[-1]["data"]["cached"] is True
+    assert rebuild(cached) == events[-1]["data"]["answer"]
@@ -0,0 +1,134 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from app.vector_stores import FlatVectorStore, VectorStoreFactory
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def add(store, ids, source="lease.pdf"):
+    vectors = [unit(i + 1, 1.0, 0.5) for i in range(len(ids))]
+    store.upsert(ids, vectors, [f"text {doc_id}" for doc_id in ids], [{"source": source, "chunk_id": doc_id} for doc_id in ids])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FlatVectorStore("test", None, str(tmp_path / "flat"))
+    yield store
+    store.close()
+
+
+def test_add_then_search_finds_nearest_first(store):
+    add(store, ["a", "b", "c"])
+
+    hits = store.search(unit(2, 1.0, 0.5), k=3)
+
+    assert hits[0][0].id == "b"
+    assert sorted(doc.id for doc, _ in hits) == ["a", "b", "c"]
+    assert [distance for _, distance in hits] == sorted(distance for _, distance in hits)
+    assert hits[0][1] == pytest.approx(0.0, abs=1e-3)
+    assert hits[0][0].page_content == "text b"
+    assert store.count() == 3
+
+
+def test_upsert_of_an_existing_id_keeps_its_row(store):
+    add(store, ["a", "b"])
+    row = store._rows["a"]
+
+    store.upsert(["a"], [unit(0, 0, 1)], ["new text"], [{"source": "lease.pdf"}])
+
+    assert store._rows["a"] == row
+    assert store.count() == 2
+    assert store.get(ids=["a"])["documents"] == ["new text"]
+
+
+def test_delete_by_id_and_by_source(store):
+    add(store, ["a", "b"], source="one.pdf")
+    add(store, ["c"], source="two.pdf")
+
+    store.delete(ids=["a"])
+    assert sorted(store.get()["ids"]) == ["b", "c"]
+
+    store.delete(source="one.pdf")
+    assert store.get()["ids"] == ["c"]
+    assert [doc.id for doc, _ in store.search(unit(1, 1, 0.5), k=5)] == ["c"]
+
+
+def test_rows_of_deleted_chunks_are_reused(store):
+    add(store, ["a", "b", "c"])
+    freed = {store._rows["a"], store._rows["b"]}
+    capacity = len(store._row_ids)
+
+    store.delete(ids=["a", "b"])
+    add(store, ["d", "e"])
+
+    assert {store._rows["d"], store._rows["e"]} == freed
+    assert len(store._row_ids) == capacity
+
+
+def test_matrix_grows_past_its_capacity(store, monkeypatch):
+    monkeypatch.setattr(FlatVectorStore, "GROW_ROWS", 4)
+    ids = [f"chunk-{i}" for i in range(11)]
+
+    for start in range(0, len(ids), 3):
+        add(store, ids[start:start + 3])
+
+    assert store.count() == 11
+    assert len(store._row_ids) >= 11
+    assert sorted(store.get()["ids"]) == sorted(ids)
+    assert len(store.search(unit(1, 1, 0.5), k=20)) == 11
+
+
+def test_reopened_store_keeps_rows_and_free_list(tmp_path):
+    directory = str(tmp_path / "flat")
+    store = FlatVectorStore("test", None, directory)
+    add(store, ["a", "b", "c"])
+    store.delete(ids=["b"])
+    store.close()
+
+    reopened = FlatVectorStore("test", None, directory)
+    assert sorted(reopened.get()["ids"]) == ["a", "c"]
+    freed = reopened._free[-1]
+    add(reopened, ["d"])
+    assert reopened._rows["d"] == freed
+    reopened.close()
+
+
+def test_get_with_no_ids_is_empty(store):
+    add(store, ["a"])
+    assert store.get(ids=[])["ids"] == []
+
+
+def test_flat_backends_refuse_several_server_processes(tmp_path):
+    for backend in ("auto", "flat"):
+        with pytest.raises(ValueError, match="WEB_CONCURRENCY"):
+            VectorStoreFactory(str(tmp_path / "chroma"), str(tmp_path / "flat"), backend=backend, processes=2)
+    VectorStoreFactory(str(tmp_path / "chroma"), str(tmp_path / "flat"), backend="chroma", processes=2)
+
+
+def open_in_another_process(directory):
+    """Exit status and stderr of a separate Python process opening the flat collection"""
+    code = f"from app.vector_stores import FlatVectorStore; FlatVectorStore('test', None, {directory!r})"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    return result.returncode, result.stderr
+
+
+def test_flat_collection_is_locked_to_the_process_that_opened_it(tmp_path):
+    directory = str(tmp_path / "flat")
+    store = FlatVectorStore("test", None, directory)
+    add(store, ["a"])
+
+    status, error = open_in_another_process(directory)
+    assert status != 0 and "FlatIndexLockedError" in error and str(os.getpid()) in error
+
+    store.close()
+    assert open_in_another_process(directory) == (0, "")